@@ -0,0 +1,12 @@
+# Description: Entry point for running the game from a checkout, e.g. "python othello-pygame"
+#               or "python . --headless --frames 60 --timing" from inside it. Takes the same
+#               options as main.py.
+import os
+import sys
+
+# make the modules next to this file importable however the directory was run
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import main
+
+main()
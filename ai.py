@@ -0,0 +1,526 @@
+# Description: Computer opponent for Reversi. AlphaBetaPlayer searches positions from the
+#               bitboard engine with negamax alpha-beta, iterative deepening and static move
+#               ordering, and stops deepening when its per-move time budget runs out. Boards
+#               of other sizes (engine.Variant) are searched with weights scaled to the board.
+import random
+import time
+
+from endgame import EndgameSolver
+from engine import BLACK, STANDARD, move_mask, popcount, squares
+from player import Player
+from transposition import EXACT, LOWER, MAX_SQUARES, UPPER, TranspositionTable, ZobristHasher
+
+# Classic square weights: corners are worth the most, and the squares next to an
+# empty corner are worth the least because they give the corner away
+SQUARE_WEIGHTS = (
+    100, -20, 10, 5, 5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    10, -2, -1, -1, -1, -1, -2, 10,
+    5, -2, -1, -1, -1, -1, -2, 5,
+    5, -2, -1, -1, -1, -1, -2, 5,
+    10, -2, -1, -1, -1, -1, -2, 10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10, 5, 5, 10, -20, 100,
+)
+MOBILITY_WEIGHT = 5
+
+
+def weight_masks(weights):
+    """
+    Represents a function that returns one (weight, bitboard) pair per distinct
+    weight in a table of square weights, best squares first.
+    """
+    return tuple(
+        (weight, sum(1 << square for square in range(len(weights)) if weights[square] == weight))
+        for weight in sorted(set(weights), reverse=True)
+    )
+
+
+# one bitboard per distinct weight, best squares first; used both to evaluate and to
+# try the most promising moves first
+WEIGHT_MASKS = weight_masks(SQUARE_WEIGHTS)
+ORDER_MASKS = tuple(mask for weight, mask in WEIGHT_MASKS)
+
+# a finished game is scored by disc difference, scaled to outweigh any heuristic score
+DISC_SCORE = 10000
+INFINITY = 64 * DISC_SCORE + 1
+
+
+def evaluate(own, opp):
+    """
+    Represents a function that scores a position for the player to move, using
+    the weights of the squares each side holds and the difference in mobility.
+    """
+    score = 0
+    for weight, mask in WEIGHT_MASKS:
+        score += weight * (popcount(own & mask) - popcount(opp & mask))
+
+    mobility = popcount(move_mask(own, opp)) - popcount(move_mask(opp, own))
+    return score + MOBILITY_WEIGHT * mobility
+
+
+def make_evaluate(variant):
+    """
+    Represents a function that returns an evaluation function like evaluate for
+    the board size of an engine.Variant, using its scaled square weights.
+    """
+    if variant is STANDARD:
+        return evaluate
+
+    masks = weight_masks(variant.square_weights)
+    variant_move_mask = variant.move_mask
+
+    def evaluate_variant(own, opp):
+        score = 0
+        for weight, mask in masks:
+            score += weight * (popcount(own & mask) - popcount(opp & mask))
+        mobility = popcount(variant_move_mask(own, opp)) - popcount(variant_move_mask(opp, own))
+        return score + MOBILITY_WEIGHT * mobility
+
+    return evaluate_variant
+
+
+def final_score(own, opp):
+    """
+    Represents a function that scores a finished game for the player to move.
+    """
+    return (popcount(own) - popcount(opp)) * DISC_SCORE
+
+
+def ordered_moves(moves, first=None, order_masks=ORDER_MASKS):
+    """
+    Represents a generator that yields the squares in a move bitboard, starting
+    with first (if given) and then from the best weighted squares to the worst,
+    by default those of the 8x8 board.
+    """
+    if first is not None and moves & (1 << first):
+        yield first
+        moves &= ~(1 << first)
+
+    for mask in order_masks:
+        for square in squares(moves & mask):
+            yield square
+
+
+class SearchTimeout(Exception):
+    """
+    Represents the exception raised inside the search when the time budget runs out.
+    """
+    pass
+
+
+class SearchResult:
+    """
+    Represents the outcome of a search: the best square found (or None if there
+    were no legal moves), its score, the deepest fully searched depth, the number
+    of nodes visited and the time taken in seconds.
+    """
+
+    def __init__(self, move, score, depth, nodes, elapsed):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "SearchResult(move=%r, score=%r, depth=%r, nodes=%r, elapsed=%.3f)" % (
+            self.move, self.score, self.depth, self.nodes, self.elapsed)
+
+
+class AlphaBetaSearch:
+    """
+    Represents a negamax alpha-beta search over (own, opp) bitboard pairs.
+
+    The search deepens one ply at a time, searching the best move of the last
+    completed depth first, and returns the result of the deepest depth that
+    finished inside the time limit. Given a TranspositionTable, positions are
+    Zobrist hashed as the search moves through them, and stored results are used
+    both to cut off repeated positions and to try their best move first.
+
+    Bitboards are for the 8x8 board unless another engine.Variant is given.
+
+    An evaluation that keeps its own state from move to move, such as
+    patterns.PatternEvaluator, can offer new_state(own, opp, color), returning
+    an object with make(color, square, flips) and unmake(color, square, flips)
+    and a score(own, opp, color) for the leaves. The search then creates the
+    state at the root, makes and unmakes every move it searches on it, and
+    scores leaves with it instead of calling the evaluation.
+
+    While a search runs in another thread, progress returns what it has found so
+    far and stop ends it early, as if its time had run out.
+    """
+
+    def __init__(self, time_limit=1.0, max_depth=60, evaluate=None, table=None, hasher=None, variant=None):
+        """
+        Represents an init method that takes the time budget per search in seconds,
+        the deepest depth to try, the evaluation function to use at the leaves (by
+        default the square weights and mobility of the board), an optional
+        transposition table (with the hasher its keys come from) and the board variant.
+
+        Raises ValueError for a table on a board with more than
+        transposition.MAX_SQUARES squares, whose moves do not fit in its entries.
+        """
+        self.variant = variant or STANDARD
+        if table is not None and self.variant.cells > MAX_SQUARES:
+            raise ValueError("a transposition table holds moves for boards of up to %d squares, not %d" % (
+                MAX_SQUARES, self.variant.cells))
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.evaluate = evaluate or make_evaluate(self.variant)
+        self._new_state = getattr(self.evaluate, "new_state", None)
+        self._state = None
+        self.table = table
+        self.hasher = hasher or (ZobristHasher(squares=self.variant.cells) if table is not None else None)
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_move = None
+        self.best_score = 0
+        self._start = 0.0
+        self._deadline = 0.0
+        self.root_shift = 0  # rotates the root moves after the first, so parallel helpers start apart
+
+        self._move_mask = self.variant.move_mask
+        self._flip_mask = self.variant.flip_mask
+        self._order_masks = ORDER_MASKS if self.variant is STANDARD else \
+            tuple(mask for weight, mask in weight_masks(self.variant.square_weights))
+        self._infinity = self.variant.cells * DISC_SCORE + 1
+
+    def search(self, own, opp, color=0, depths=None):
+        """
+        Represents a method that takes the bitboards of the player to move and the
+        opponent, and the color to move (0 for black, 1 for white, which only
+        matters for hashing), and returns a SearchResult for the best move found.
+        Iterative deepening goes through depths, by default every depth from 1 to
+        max_depth; the helpers of a parallel search skip some of them.
+        """
+        start = time.perf_counter()
+        self._start = start
+        self._deadline = start + self.time_limit
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_move = None
+
+        moves = self._move_mask(own, opp)
+        if not moves:
+            return SearchResult(None, self.evaluate(own, opp), 0, 0, time.perf_counter() - start)
+
+        key = self.hasher.hash_bitboards(own, opp, color) if self.table is not None else 0
+        best_move = next(ordered_moves(moves, None, self._order_masks))
+        if self.table is not None:
+            entry = self.table.probe(key)
+            if entry is not None and entry[3] is not None:
+                best_move = entry[3]
+
+        best_score = self.evaluate(own, opp)
+        completed_depth = 0
+        if self._new_state is not None:
+            self._state = self._new_state(own, opp, color)
+        self.best_move, self.best_score = best_move, best_score
+
+        # a single legal move needs no search
+        if popcount(moves) > 1:
+            empties = self.variant.cells - popcount(own | opp)
+
+            for depth in depths or range(1, self.max_depth + 1):
+                try:
+                    best_score, best_move = self._search_root(own, opp, moves, depth, best_move, key, color)
+                except SearchTimeout:
+                    break
+                completed_depth = depth
+                self.best_move, self.best_score, self.completed_depth = best_move, best_score, depth
+
+                # one ply past the empty squares every line ends in a final score; at
+                # depth == empties the full boards at the leaves were only evaluated
+                if depth > empties:
+                    break
+
+        return SearchResult(best_move, best_score, completed_depth, self.nodes, time.perf_counter() - start)
+
+    def progress(self):
+        """
+        Represents a method that returns a SearchResult for the search running now
+        (or the last one): the best move and score of the deepest completed depth
+        and the nodes visited so far. It is safe to call from another thread.
+        """
+        return SearchResult(self.best_move, self.best_score, self.completed_depth, self.nodes,
+                            time.perf_counter() - self._start)
+
+    def stop(self):
+        """
+        Represents a method that another thread can call to end the running search
+        within the next thousand or so nodes. search then returns the best move of
+        the deepest completed depth.
+        """
+        self._deadline = 0.0
+
+    def score_move(self, own, opp, square, depth, color=0, time_limit=None):
+        """
+        Represents a method that returns (score, nodes) for playing square in the
+        given position, searched with a full window to the given total depth. It is
+        what parallel searches run for each root move. Raises SearchTimeout if
+        time_limit seconds (by default the search's own limit) run out first.
+        """
+        self._deadline = time.perf_counter() + (self.time_limit if time_limit is None else time_limit)
+        self.nodes = 0
+
+        flips = self._flip_mask(own, opp, square)
+        key = 0
+        if self.table is not None:
+            key = self.hasher.update(self.hasher.hash_bitboards(own, opp, color), color, square, flips)
+
+        if self._new_state is not None:
+            self._state = self._new_state(own, opp, color)
+            self._state.make(color, square, flips)
+
+        infinity = self._infinity
+        score = -self._negamax(opp & ~flips, own | flips | (1 << square), depth - 1, -infinity, infinity, False,
+                               key, 1 - color)
+        return score, self.nodes
+
+    def _search_root(self, own, opp, moves, depth, first, key, color):
+        """
+        Represents a method that searches every root move to the given depth,
+        starting with first, and returns the best (score, move).
+        """
+        infinity = self._infinity
+        alpha = -infinity
+        best_move = first
+        table = self.table
+        flip_mask = self._flip_mask
+        state = self._state
+
+        order = list(ordered_moves(moves, first, self._order_masks))
+        if self.root_shift and len(order) > 2:
+            shift = self.root_shift % (len(order) - 1)
+            order[1:] = order[1 + shift:] + order[1:1 + shift]
+
+        for square in order:
+            flips = flip_mask(own, opp, square)
+            child_key = self.hasher.update(key, color, square, flips) if table is not None else 0
+            if state is not None:
+                state.make(color, square, flips)
+            score = -self._negamax(opp & ~flips, own | flips | (1 << square), depth - 1, -infinity, -alpha, False,
+                                   child_key, 1 - color)
+            if state is not None:
+                state.unmake(color, square, flips)
+            if score > alpha:
+                alpha = score
+                best_move = square
+
+        if table is not None:
+            table.store(key, depth, EXACT, alpha, best_move)
+        return alpha, best_move
+
+    def _negamax(self, own, opp, depth, alpha, beta, passed, key, color):
+        """
+        Represents a recursive method that returns the score of a position for the
+        player to move, searched to the given depth within the (alpha, beta) window.
+        key is the position's hash and color the side to move, both used only when
+        there is a transposition table.
+        """
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+        if depth <= 0:
+            state = self._state
+            return self.evaluate(own, opp) if state is None else state.score(own, opp, color)
+
+        table = self.table
+        hash_move = None
+        if table is not None:
+            entry = table.probe(key)
+            if entry is not None:
+                entry_depth, bound, score, hash_move = entry
+                if entry_depth >= depth:
+                    if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                        return score
+
+        moves = self._move_mask(own, opp)
+        if not moves:
+            # two passes in a row end the game
+            if passed:
+                return final_score(own, opp)
+            pass_key = self.hasher.pass_turn(key) if table is not None else 0
+            return -self._negamax(opp, own, depth, -beta, -alpha, True, pass_key, 1 - color)
+
+        original_alpha = alpha
+        best_score = -self._infinity
+        best_move = None
+        flip_mask = self._flip_mask
+        state = self._state
+
+        for square in ordered_moves(moves, hash_move, self._order_masks):
+            flips = flip_mask(own, opp, square)
+            child_key = self.hasher.update(key, color, square, flips) if table is not None else 0
+            if state is not None:
+                state.make(color, square, flips)
+            score = -self._negamax(opp & ~flips, own | flips | (1 << square), depth - 1, -beta, -alpha, False,
+                                   child_key, 1 - color)
+            if state is not None:
+                state.unmake(color, square, flips)
+            if score > best_score:
+                best_score = score
+                best_move = square
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if table is not None:
+            if best_score <= original_alpha:
+                bound = UPPER
+            elif best_score >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            table.store(key, depth, bound, best_score, best_move)
+
+        return best_score
+
+
+class AlphaBetaPlayer(Player):
+    """
+    Represents a computer player that Reversi can seat as either color. Instead of
+    waiting for clicks, Reversi asks it for a move with choose_move.
+    """
+
+    def __init__(self, player, color, time_limit=1.0, max_depth=60, table_mb=16, endgame_empties=10, book=None,
+                 evaluate=None):
+        """
+        Represents an init method that takes the player name and color like Player,
+        plus the time budget per move in seconds, the deepest depth to search and
+        the memory in megabytes for the transposition table (0 to search without one).
+        The table is kept from move to move.
+
+        Once endgame_empties or fewer squares are empty, the move is found by solving
+        the endgame exactly instead (0 to always search). If book (a book.OpeningBook)
+        is given, positions it covers are played from the book without searching.
+        evaluate replaces the square weights at the leaves of the 8x8 search, for
+        example with a patterns.PatternEvaluator. The endgame solver, book and
+        evaluate only cover the 8x8 board; on other sizes every move is searched.
+        """
+        super().__init__(player, color)
+        table = TranspositionTable(table_mb) if table_mb else None
+        self.searcher = AlphaBetaSearch(time_limit, max_depth, evaluate, table=table)
+        self.standard_searcher = self.searcher  # kept, with its evaluate, for when play is back on 8x8
+        self.endgame = EndgameSolver(endgame_empties) if endgame_empties else None
+        self.book = book
+        self.last_result = None
+        self.thinking = None  # the search choose_move is running, if any
+
+    def is_computer(self):
+        """
+        Represents a method that tells Reversi this player chooses its own moves.
+
+        Returns – True
+        """
+        return True
+
+    def thinks_in_background(self):
+        """
+        Represents a method that tells Reversi to run choose_move off the main
+        thread, since a search takes up to the whole time budget.
+
+        Returns – True
+        """
+        return True
+
+    def stop_thinking(self):
+        """
+        Represents a method that another thread can call while choose_move runs to
+        make it return the best move found so far.
+        """
+        searcher = self.thinking
+        if searcher is not None:
+            searcher.stop()
+
+    def thinking_progress(self):
+        """
+        Represents a method that returns a SearchResult with the depth, nodes and
+        best move so far of the search choose_move is running, or None when it is
+        not searching (or is solving the endgame).
+        """
+        searcher = self.thinking
+        return None if searcher is None else searcher.progress()
+
+    def _search(self, own, opp, turn):
+        """
+        Represents a method that runs the searcher on a position, keeping it in
+        thinking meanwhile so other threads can follow and stop it.
+        """
+        self.thinking = self.searcher
+        try:
+            return self.searcher.search(own, opp, 0 if turn == BLACK else 1)
+        finally:
+            self.thinking = None
+
+    def choose_move(self, position):
+        """
+        Represents a method that takes an engine.Position with this player to move
+        and returns the square (0-63 on the 8x8 board) to play, or None if there is
+        no legal move.
+        """
+        own, opp = position.bitboards(position.turn)
+        if position.variant is not self.searcher.variant:
+            # the first move on a board of another size sets the search up for it, sharing
+            # the table; back on the 8x8 board the original search and evaluation return
+            searcher = self.searcher
+            table = getattr(self.standard_searcher, "table", None)
+            if table is not None:
+                table.clear()
+            if position.variant is STANDARD:
+                self.searcher = self.standard_searcher
+            else:
+                # boards too large for the table's move field are searched without it
+                if position.variant.cells > MAX_SQUARES:
+                    table = None
+                self.searcher = AlphaBetaSearch(searcher.time_limit, searcher.max_depth, table=table,
+                                                variant=position.variant)
+        if position.variant is not STANDARD:
+            self.last_result = self._search(own, opp, position.turn)
+            return self.last_result.move
+
+        if self.book is not None:
+            move = self.book.best_move(own, opp)
+            if move is not None:
+                self.last_result = SearchResult(move, 0, 0, 0, 0.0)
+                return move
+
+        if self.endgame is not None and self.endgame.should_solve(own, opp):
+            self.last_result = self.endgame.solve(own, opp)
+        else:
+            self.last_result = self._search(own, opp, position.turn)
+        return self.last_result.move
+
+
+class RandomPlayer(Player):
+    """
+    Represents a computer player that plays a random legal move, useful as a
+    baseline opponent.
+    """
+
+    def __init__(self, player, color, seed=None):
+        """
+        Represents an init method that takes the player name and color like Player,
+        plus an optional seed so the moves can be repeated.
+        """
+        super().__init__(player, color)
+        self.random = random.Random(seed)
+
+    def is_computer(self):
+        """
+        Represents a method that tells Reversi this player chooses its own moves.
+
+        Returns – True
+        """
+        return True
+
+    def choose_move(self, position):
+        """
+        Represents a method that takes an engine.Position with this player to move
+        and returns a random legal square, or None if there is no legal move.
+        """
+        moves = list(squares(position.legal_moves()))
+        return self.random.choice(moves) if moves else None
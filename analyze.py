@@ -0,0 +1,229 @@
+# Description: Command line analyzer for files of Reversi positions. Positions are read one per
+#               line in the compact text form of engine.Position.to_text, as a stream from a file
+#               or stdin, searched to a fixed depth by a pool of worker processes, and written out
+#               as JSON lines in input order, with only a bounded number of positions in flight.
+#               Forced positions (one legal move, or a pass) are searched to the same depth and
+#               marked "forced".
+#
+# Example:      python analyze.py positions.txt --depth 6 --workers 4 > analysis.jsonl
+#               some_tool | python analyze.py - --depth 4
+#
+# Input:        ...........................OX......XO........................... X
+#               (64 squares in row-major order from a1 to h8: "X", "O", and "." or "-" for
+#               empty, then the color to move; blank lines and lines starting with "#" are skipped)
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import AlphaBetaSearch, final_score
+from engine import BLACK, Position, popcount, squares
+from transposition import TranspositionTable
+
+DEFAULT_BATCH = 64
+
+
+# the searches of the current worker process by board variant, and the settings they are made with
+_worker_searches = {}
+_worker_settings = None
+
+
+def _init_worker(depth, table_mb, weights):
+    """
+    Represents a function that runs once in each worker process and keeps the
+    search settings; a search is made for each board size the worker meets.
+    """
+    global _worker_settings
+    _worker_settings = (depth, table_mb, weights)
+    _worker_searches.clear()
+
+
+def _search_for(position):
+    """
+    Represents a function that returns this process's search for the board size of
+    position, creating it on first use.
+    """
+    search = _worker_searches.get(position.variant)
+    if search is None:
+        depth, table_mb, weights = _worker_settings
+        evaluate = None
+        if weights and position.variant.size == 8:
+            from patterns import PatternEvaluator
+            evaluate = PatternEvaluator.load(weights)
+        table = TranspositionTable(table_mb) if table_mb else None
+        # no time limit: every position is searched to the full depth
+        search = AlphaBetaSearch(float("inf"), depth, evaluate, table, variant=position.variant)
+        _worker_searches[position.variant] = search
+    return search
+
+
+def search_position(search, own, opp, color):
+    """
+    Represents a function that searches a position to the full depth of search and
+    returns (best move, score, depth, nodes, forced).
+
+    AlphaBetaSearch.search plays a forced move without searching it, which is
+    right in a game but would report a static score here, so the only legal move
+    is scored to the full depth with score_move and a pass is searched from the
+    opponent's side. forced is True for both, and for a finished game, which is
+    scored by its final disc count.
+    """
+    moves = search.variant.move_mask(own, opp)
+    if popcount(moves) > 1:
+        result = search.search(own, opp, color)
+        return result.move, result.score, result.depth, result.nodes, False
+    if moves:
+        square = next(squares(moves))
+        score, nodes = search.score_move(own, opp, square, search.max_depth, color)
+        return square, score, search.max_depth, nodes, True
+    if not search.variant.move_mask(opp, own):
+        return None, final_score(own, opp), 0, 0, True
+    _, score, depth, nodes, _ = search_position(search, opp, own, 1 - color)
+    return None, -score, depth, nodes, True
+
+
+def analyze_line(number, line):
+    """
+    Represents a function that analyzes one input line and returns its result as a
+    dictionary: the line number, the position, the color to move, its legal moves,
+    the best move and its score, the depth searched, the nodes visited and whether
+    the move was forced, or an "error" for a line that could not be parsed.
+    """
+    try:
+        position = Position.from_text(line)
+    except ValueError as error:
+        return {"line": number, "error": str(error)}
+
+    own, opp = position.bitboards(position.turn)
+    square_name = position.variant.square_name
+    move, score, depth, nodes, forced = search_position(_search_for(position), own, opp,
+                                                        0 if position.turn == BLACK else 1)
+    return {
+        "line": number,
+        "position": line.split()[0],
+        "turn": position.turn,
+        "moves": [square_name(square) for square in squares(position.legal_moves())],
+        "best": None if move is None else square_name(move),
+        "score": score,
+        "depth": depth,
+        "nodes": nodes,
+        "forced": forced,
+        "game_over": position.is_game_over(),
+    }
+
+
+def analyze_batch(batch):
+    """
+    Represents a function that runs in a worker process and returns the JSON line
+    for each (line number, line) pair of a batch.
+    """
+    return [json.dumps(analyze_line(number, line), separators=(",", ":")) for number, line in batch]
+
+
+def read_batches(source, batch_size):
+    """
+    Represents a generator that reads position lines from a file object one at a
+    time and yields them in lists of up to batch_size (line number, line) pairs,
+    so no more than one batch of the input is held at once.
+    """
+    batch = []
+    for number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        batch.append((number, line))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(source, output, depth=4, workers=1, batch_size=DEFAULT_BATCH, max_pending=None, table_mb=16,
+        weights=None, report_interval=None):
+    """
+    Represents a function that analyzes every position from source and writes the
+    results to output in input order.
+
+    With more than one worker, batches are sent to a process pool and at most
+    max_pending batches (by default four per worker) are in flight or waiting to
+    be written, so memory stays bounded however long the input is. The batch at
+    the front is written as soon as it is done; batches finished behind it wait.
+
+    Returns -- (positions analyzed, seconds taken).
+    """
+    start = time.perf_counter()
+    last_report = start
+    count = 0
+    batches = read_batches(source, batch_size)
+
+    def written(lines):
+        nonlocal count, last_report
+        output.write("\n".join(lines) + "\n")
+        count += len(lines)
+        now = time.perf_counter()
+        if report_interval and now - last_report >= report_interval:
+            print("%d positions, %.1f positions/s" % (count, count / (now - start)), file=sys.stderr)
+            last_report = now
+
+    if workers <= 1:
+        _init_worker(depth, table_mb, weights)
+        for batch in batches:
+            written(analyze_batch(batch))
+        return count, time.perf_counter() - start
+
+    max_pending = max_pending or 4 * workers
+    pending = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(depth, table_mb, weights)) as pool:
+        for batch in batches:
+            if len(pending) >= max_pending:
+                written(pending.popleft().result())
+            pending.append(pool.submit(analyze_batch, batch))
+        while pending:
+            written(pending.popleft().result())
+
+    return count, time.perf_counter() - start
+
+
+def main():
+    """
+    Represents the command line entry point. Results go to stdout (or --output)
+    and the positions per second to stderr.
+    """
+    parser = argparse.ArgumentParser(description="Analyze a stream of Reversi positions.")
+    parser.add_argument("input", nargs="?", default="-", help="file of positions, one per line, or - for stdin")
+    parser.add_argument("--output", help="JSON lines file to write (default stdout)")
+    parser.add_argument("--depth", type=int, default=4, help="search depth in plies (default 4)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH,
+                        help="positions sent to a worker at a time (default %d)" % DEFAULT_BATCH)
+    parser.add_argument("--max-pending", type=int,
+                        help="most batches in flight or waiting to be written (default 4 per worker)")
+    parser.add_argument("--table", type=int, default=16,
+                        help="transposition table megabytes per worker, 0 for none, which makes every result "
+                             "independent of the positions searched before it (default 16)")
+    parser.add_argument("--weights", help="pattern weights file (see patterns.py) instead of the square weights")
+    parser.add_argument("--report", type=float, help="print progress every this many seconds")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        count, elapsed = run(source, output, args.depth, args.workers, args.batch, args.max_pending, args.table,
+                             args.weights, args.report)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print("analyzed %d positions in %.2f s: %.1f positions/s" % (count, elapsed, count / elapsed if elapsed else 0.0),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# Description: Headless self-play arena for Reversi. Two configurable computer players play
+#               a batch of games from random or book openings with colors swapped, spread
+#               over a process pool, and the results are streamed to disk as JSON lines.
+#               No display is needed, so it runs on CI machines without one.
+#
+# Example:      python arena.py alphabeta:time=0.05 random --games 200 --output results.jsonl
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai import AlphaBetaPlayer, RandomPlayer
+from mcts import MCTSPlayer
+from engine import BLACK, WHITE, Position, squares
+
+# option names accepted in a player spec, with the keyword argument and type they map to
+PLAYER_OPTIONS = {
+    "alphabeta": {
+        "time": ("time_limit", float),
+        "depth": ("max_depth", int),
+        "table": ("table_mb", int),
+        "endgame": ("endgame_empties", int),
+        "book": ("book", str),
+        "weights": ("evaluate", str),
+    },
+    "mcts": {
+        "time": ("time_limit", float),
+        "playouts": ("playouts", int),
+        "c": ("exploration", float),
+        "bias": ("bias", float),
+        "reuse": ("reuse", lambda value: value not in ("0", "no", "false")),
+    },
+    "random": {},
+}
+
+
+def parse_spec(spec):
+    """
+    Represents a function that splits a player spec such as "alphabeta:time=0.1,depth=4"
+    into the player type and a dictionary of keyword arguments.
+
+    Raises ValueError for an unknown player type or option.
+    """
+    kind, _, options = spec.partition(":")
+    if kind not in PLAYER_OPTIONS:
+        raise ValueError("unknown player type %r (expected one of %s)" % (kind, ", ".join(PLAYER_OPTIONS)))
+
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        name, _, value = option.partition("=")
+        if name not in PLAYER_OPTIONS[kind]:
+            raise ValueError("unknown option %r for %s player" % (name, kind))
+        keyword, convert = PLAYER_OPTIONS[kind][name]
+        kwargs[keyword] = convert(value)
+    return kind, kwargs
+
+
+def make_player(spec, color, seed=None):
+    """
+    Represents a function that builds a computer player from a spec for the given
+    color ("purple" or "rose").
+    """
+    kind, kwargs = parse_spec(spec)
+    if kind == "random":
+        return RandomPlayer(color, color, seed)
+    if kind == "mcts":
+        return MCTSPlayer(color, color, seed=seed, **kwargs)
+
+    if "book" in kwargs:
+        from book import OpeningBook
+        kwargs["book"] = OpeningBook(kwargs["book"])
+    if "evaluate" in kwargs:
+        from patterns import PatternEvaluator
+        kwargs["evaluate"] = PatternEvaluator.load(kwargs["evaluate"])
+    return AlphaBetaPlayer(color, color, **kwargs)
+
+
+def random_opening(rng, plies):
+    """
+    Represents a function that returns a list of plies random legal moves from the
+    starting position, stopping early if the game ends.
+    """
+    position = Position()
+    moves = []
+    while len(moves) < plies and not position.is_game_over():
+        legal = list(squares(position.legal_moves()))
+        if not legal:
+            position.pass_turn()
+            continue
+        move = rng.choice(legal)
+        position.make_move(move)
+        moves.append(move)
+    return moves
+
+
+def book_opening(rng, opening_book, plies):
+    """
+    Represents a function that walks an opening book from the starting position for
+    up to plies moves, picking each book move with probability in proportion to how
+    often it was played, and returns the moves.
+    """
+    position = Position()
+    moves = []
+    while len(moves) < plies:
+        if not position.legal_moves():
+            if position.is_game_over():
+                break
+            position.pass_turn()
+        own, opp = position.bitboards(position.turn)
+        entries = opening_book.lookup(own, opp)
+        if not entries:
+            break
+        move = rng.choices([move for move, score, count in entries],
+                           weights=[count for move, score, count in entries])[0]
+        position.make_move(move)
+        moves.append(move)
+    return moves
+
+
+def play_game(index, black_spec, white_spec, opening, seed):
+    """
+    Represents a function that plays one game between two player specs from the
+    given opening moves and returns its result as a dictionary. It is what each
+    pool worker runs.
+    """
+    start = time.perf_counter()
+    players = {BLACK: make_player(black_spec, "purple", seed), WHITE: make_player(white_spec, "rose", seed + 1)}
+
+    position = Position()
+    for move in opening:
+        if not position.legal_moves():
+            position.pass_turn()
+        position.make_move(move)
+    moves = list(opening)
+
+    while True:
+        if not position.legal_moves():
+            if position.is_game_over():
+                break
+            position.pass_turn()
+            continue
+        move = players[position.turn].choose_move(position.copy())
+        position.make_move(move)
+        moves.append(move)
+
+    black, white = position.counts()
+    return {
+        "game": index,
+        "black": black_spec,
+        "white": white_spec,
+        "opening": "".join("abcdefgh"[move % 8] + str(move // 8 + 1) for move in opening),
+        "moves": "".join("abcdefgh"[move % 8] + str(move // 8 + 1) for move in moves),
+        "black_discs": black,
+        "white_discs": white,
+        "plies": len(moves),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def score_interval(scores, z=1.96):
+    """
+    Represents a function that takes per-game scores (1 win, 0.5 draw, 0 loss) and
+    returns the mean score and the low and high ends of its confidence interval
+    (95% by default). The interval is the Wilson score interval, which, unlike the
+    normal approximation, stays wide when one player wins every game of a short
+    match.
+    """
+    n = len(scores)
+    if not n:
+        return 0.0, 0.0, 1.0
+    mean = sum(scores) / n
+    spread = z * z / n
+    center = (mean + spread / 2) / (1 + spread)
+    margin = z * math.sqrt(mean * (1 - mean) / n + spread / (4 * n)) / (1 + spread)
+    return mean, max(0.0, center - margin), min(1.0, center + margin)
+
+
+def main():
+    """
+    Represents the command line entry point of the arena.
+    """
+    parser = argparse.ArgumentParser(description="Play two Reversi players against each other without a display.")
+    parser.add_argument("player_a", help='player spec, e.g. "alphabeta:time=0.1,depth=6", "mcts:playouts=500" '
+                                         'or "random"')
+    parser.add_argument("player_b", help="player spec for the opponent")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default 100)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--opening-plies", type=int, default=4,
+                        help="random (or book) plies played before the players take over (default 4)")
+    parser.add_argument("--book", help="draw openings from this opening book instead of random moves")
+    parser.add_argument("--no-swap", action="store_true",
+                        help="give every game a new opening instead of replaying each one with colors swapped")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    parser.add_argument("--output", default="arena_results.jsonl", help="JSON lines file for per-game results")
+    args = parser.parse_args()
+
+    # check the specs here rather than failing inside every worker
+    for spec in (args.player_a, args.player_b):
+        try:
+            parse_spec(spec)
+        except ValueError as error:
+            parser.error(str(error))
+
+    rng = random.Random(args.seed)
+    opening_book = None
+    if args.book:
+        from book import OpeningBook
+        opening_book = OpeningBook(args.book)
+
+    # game i plays player A as black when i is even; with swapping, games 2k and 2k + 1 share an opening
+    games = []
+    for index in range(args.games):
+        if args.no_swap or index % 2 == 0:
+            if opening_book is not None:
+                opening = book_opening(rng, opening_book, args.opening_plies)
+            else:
+                opening = random_opening(rng, args.opening_plies)
+        if index % 2 == 0:
+            games.append((index, args.player_a, args.player_b, opening, args.seed + 2 * index))
+        else:
+            games.append((index, args.player_b, args.player_a, opening, args.seed + 2 * index))
+
+    start = time.perf_counter()
+    scores = []
+    plies = 0
+    wins = losses = draws = 0
+
+    with open(args.output, "w") as output, ProcessPoolExecutor(args.workers) as pool:
+        futures = [pool.submit(play_game, *game) for game in games]
+        for future in as_completed(futures):
+            result = future.result()
+
+            # score the game from player A's point of view
+            a_is_black = result["game"] % 2 == 0
+            lead = result["black_discs"] - result["white_discs"]
+            if not a_is_black:
+                lead = -lead
+            result["player_a_lead"] = lead
+
+            if lead > 0:
+                wins += 1
+                scores.append(1.0)
+            elif lead < 0:
+                losses += 1
+                scores.append(0.0)
+            else:
+                draws += 1
+                scores.append(0.5)
+            plies += result["plies"]
+
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+    elapsed = time.perf_counter() - start
+    mean, low, high = score_interval(scores)
+    print("%s vs %s: %d games" % (args.player_a, args.player_b, len(scores)))
+    print("  player A: %d wins, %d losses, %d draws" % (wins, losses, draws))
+    print("  player A score: %.1f%% (95%% confidence %.1f%% to %.1f%%)" % (100 * mean, 100 * low, 100 * high))
+    print("  %.2f games/s, %.1f plies/s over %.1f s with %d workers" % (
+        len(scores) / elapsed, plies / elapsed, elapsed, args.workers))
+    print("  results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
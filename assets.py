@@ -0,0 +1,95 @@
+# Description: Asset manager for the Reversi pygame window. Fonts and images are loaded
+#               from disk and scaled once, and rendered text surfaces are cached so the
+#               counters and messages are not re-rendered on every frame.
+import os
+from collections import OrderedDict
+
+import pygame
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = "fonts/Metropolis-Medium.otf"
+
+# Every font size and (image, size) pair drawn by Reversi, loaded up front by preload()
+FONT_SIZES = (15, 19, 25)
+IMAGES = (
+    ("images/right-arrow.png", (30, 30)),
+    ("images/left-arrow.png", (20, 20)),
+    ("images/help.png", (20, 20)),
+)
+
+
+class AssetManager:
+    """
+    Represents a shared store of fonts, pre-scaled images and rendered text
+    surfaces. Anything that is not preloaded is loaded on first use, and the
+    same surface is handed back on every later request.
+    """
+
+    def __init__(self, base_dir=ASSET_DIR, max_text_surfaces=256):
+        """
+        Represents an init method that takes the directory the asset paths are
+        relative to and the number of rendered text surfaces to keep around.
+        """
+        self.base_dir = base_dir
+        self.max_text_surfaces = max_text_surfaces
+        self._fonts = {}
+        self._images = {}
+        self._text = OrderedDict()
+
+    def preload(self, font_sizes=FONT_SIZES, images=IMAGES):
+        """
+        Represents a method that loads every given font size and image ahead of
+        time so that the first frame does not pay for disk access.
+        """
+        for size in font_sizes:
+            self.font(size)
+
+        for path, size in images:
+            self.image(path, size)
+
+    def font(self, size):
+        """
+        Represents a method that returns the Metropolis font at the given size.
+        """
+        font = self._fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(os.path.join(self.base_dir, FONT_PATH), size)
+            self._fonts[size] = font
+        return font
+
+    def image(self, path, size=None):
+        """
+        Represents a method that returns the image at the given path, scaled to
+        size (a (width, height) tuple) if one is given.
+        """
+        key = (path, size)
+        image = self._images.get(key)
+        if image is None:
+            image = pygame.image.load(os.path.join(self.base_dir, path))
+
+            # match the display format when a window exists so blits are not converted each frame
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+            self._images[key] = image
+        return image
+
+    def text(self, string, size, color):
+        """
+        Represents a method that returns an anti-aliased surface of string rendered
+        at the given font size and color.
+
+        The least recently used surfaces are dropped once more than max_text_surfaces
+        are cached, so a changing message cannot grow the cache without bound.
+        """
+        key = (string, size, color)
+        surface = self._text.get(key)
+        if surface is None:
+            surface = self.font(size).render(string, True, color)
+            self._text[key] = surface
+            if len(self._text) > self.max_text_surfaces:
+                self._text.popitem(last=False)
+        else:
+            self._text.move_to_end(key)
+        return surface
@@ -0,0 +1,314 @@
+# Description: Batched Othello move generation and evaluation with NumPy. Positions are held
+#               as (N, 2) arrays of uint64 bitboards (player to move, opponent), and legal
+#               moves, flips, counts and evaluations are computed for every board at once with
+#               the same shift-and-mask operations as engine.py. Large inputs are processed in
+#               fixed-size chunks so memory stays bounded for any number of boards.
+#
+# Example:      python batch.py --boards 1000000
+import argparse
+import random
+import time
+
+import numpy as np
+
+from ai import MOBILITY_WEIGHT, WEIGHT_MASKS
+from engine import BLACK, DIRECTIONS, INNER_FILES, WHITE, Position, squares
+
+DEFAULT_CHUNK = 65536
+
+_ONE = np.uint64(1)
+_INNER = np.uint64(INNER_FILES)
+_LINE_SHIFTS = ((np.uint64(1), True), (np.uint64(8), False), (np.uint64(7), True), (np.uint64(9), True))
+_DIRECTIONS = tuple((np.uint64(abs(shift)), shift > 0, np.uint64(mask)) for shift, mask in DIRECTIONS)
+_WEIGHT_MASKS = tuple((weight, np.uint64(mask)) for weight, mask in WEIGHT_MASKS)
+
+# bit n of a bitboard is cell n of a flattened (8, 8) array
+_SQUARE_BITS = np.left_shift(_ONE, np.arange(64, dtype=np.uint64))
+_BYTE_COUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def popcounts(bits):
+    """
+    Represents a function that returns the number of set bits of every bitboard
+    in a uint64 array, as an int32 array of the same shape.
+    """
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    # np.bitwise_count only exists on NumPy 2.0 and later
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).astype(np.int32)
+    return _BYTE_COUNTS[bits.view(np.uint8)].reshape(bits.shape + (8,)).sum(axis=-1, dtype=np.int32)
+
+
+def board_to_cells(board):
+    """
+    Represents a function that converts the 10x10 list of lists used by
+    Reversi._board into an (8, 8) int8 array with 1 for "X", -1 for "O" and 0 for
+    an empty square.
+    """
+    cells = np.zeros((8, 8), dtype=np.int8)
+    for row in range(1, 9):
+        for col in range(1, 9):
+            if board[row][col] == BLACK:
+                cells[row - 1, col - 1] = 1
+            elif board[row][col] == WHITE:
+                cells[row - 1, col - 1] = -1
+    return cells
+
+
+def from_cells(cells, turn=BLACK):
+    """
+    Represents a function that converts an (N, 8, 8) int8 array of cells (1 for
+    "X", -1 for "O", 0 empty) into an (N, 2) uint64 array of (own, opp) bitboards.
+    turn is the color to move, either one color for every board or an array of
+    N values that are 1 where "X" is to move and -1 where "O" is.
+    """
+    flat = np.asarray(cells, dtype=np.int8).reshape(-1, 64)
+    black = np.bitwise_or.reduce(np.where(flat == 1, _SQUARE_BITS, np.uint64(0)), axis=1)
+    white = np.bitwise_or.reduce(np.where(flat == -1, _SQUARE_BITS, np.uint64(0)), axis=1)
+
+    if isinstance(turn, str):
+        black_to_move = np.full(len(flat), turn == BLACK)
+    else:
+        black_to_move = np.asarray(turn) == 1
+    return np.stack((np.where(black_to_move, black, white), np.where(black_to_move, white, black)), axis=1)
+
+
+def to_cells(positions, turn=BLACK):
+    """
+    Represents a function that converts an (N, 2) array of (own, opp) bitboards
+    back into an (N, 8, 8) int8 array of cells, given the color to move in the
+    same form as from_cells.
+    """
+    positions = np.asarray(positions, dtype=np.uint64)
+    own = (positions[:, 0:1] & _SQUARE_BITS) != 0
+    opp = (positions[:, 1:2] & _SQUARE_BITS) != 0
+    cells = own.astype(np.int8) - opp.astype(np.int8)
+
+    if isinstance(turn, str):
+        if turn == WHITE:
+            cells = -cells
+    else:
+        cells *= np.where(np.asarray(turn) == 1, 1, -1).astype(np.int8)[:, None]
+    return cells.reshape(-1, 8, 8)
+
+
+def from_positions(positions):
+    """
+    Represents a function that converts a list of engine.Position objects into an
+    (N, 2) array of (own, opp) bitboards from the point of view of each side to move.
+    """
+    return np.array([position.bitboards(position.turn) for position in positions], dtype=np.uint64).reshape(-1, 2)
+
+
+def move_masks(own, opp):
+    """
+    Represents a function that takes uint64 arrays of own and opponent bitboards
+    and returns a uint64 array with the legal moves of every board set, using the
+    same flood fill as engine.move_mask.
+    """
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+
+    for shift, inner in _LINE_SHIFTS:
+        run = opp & _INNER if inner else opp
+
+        line = run & (own << shift)
+        for step in range(5):
+            line |= run & (line << shift)
+        moves |= empty & (line << shift)
+
+        line = run & (own >> shift)
+        for step in range(5):
+            line |= run & (line >> shift)
+        moves |= empty & (line >> shift)
+
+    return moves
+
+
+def flip_masks(own, opp, moves):
+    """
+    Represents a function that takes uint64 arrays of own and opponent bitboards
+    and an int array of the square played on each board, and returns a uint64
+    array of the discs each move flips. A negative square flips nothing.
+    """
+    moves = np.asarray(moves)
+    placed = np.where(moves >= 0, _ONE << np.clip(moves, 0, 63).astype(np.uint64), np.uint64(0))
+    flips = np.zeros_like(own)
+
+    for shift, forward, mask in _DIRECTIONS:
+        # grow the run of opponent discs out from the placed disc; it is at most six long
+        captured = ((placed << shift) if forward else (placed >> shift)) & mask & opp
+        for walk in range(5):
+            captured |= ((captured << shift) if forward else (captured >> shift)) & mask & opp
+
+        # keep a run only where the square past it holds one of the player's own discs
+        closed = ((captured << shift) if forward else (captured >> shift)) & mask & own
+        flips |= np.where(closed != 0, captured, np.uint64(0))
+
+    return flips
+
+
+def apply_moves(own, opp, moves):
+    """
+    Represents a function that plays one square on each board and returns the
+    resulting (own, opp) arrays from the point of view of the next player, plus
+    the flips. A negative square is a pass. Moves are not checked for legality;
+    use move_masks first.
+    """
+    flips = flip_masks(own, opp, moves)
+    moves = np.asarray(moves)
+    placed = np.where(moves >= 0, _ONE << np.clip(moves, 0, 63).astype(np.uint64), np.uint64(0))
+    return opp & ~flips, own | flips | placed, flips
+
+
+def expand(own, opp):
+    """
+    Represents a function that generates every position reachable in one move
+    from every board. Returns (parents, moves, child_own, child_opp) arrays, where
+    parents holds the index of the board each child came from, and the children
+    are given from the point of view of the opponent, who moves next. Boards
+    without a legal move have no children.
+    """
+    legal = move_masks(own, opp)
+    parents = []
+    moves = []
+    for square in range(64):
+        index = np.flatnonzero(legal & _SQUARE_BITS[square])
+        if len(index):
+            parents.append(index)
+            moves.append(np.full(len(index), square, dtype=np.int8))
+
+    if not parents:
+        empty = np.zeros(0, dtype=np.uint64)
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int8), empty, empty
+
+    parents = np.concatenate(parents)
+    moves = np.concatenate(moves)
+    order = np.argsort(parents, kind="stable")
+    parents, moves = parents[order], moves[order]
+    child_own, child_opp, flips = apply_moves(own[parents], opp[parents], moves)
+    return parents, moves, child_own, child_opp
+
+
+def evaluate(own, opp, moves=None, replies=None):
+    """
+    Represents a function that scores every board for the player to move with the
+    same weighted squares and mobility term as ai.evaluate. The move masks of
+    both sides may be passed in if they were already computed.
+    """
+    if moves is None:
+        moves = move_masks(own, opp)
+    if replies is None:
+        replies = move_masks(opp, own)
+
+    score = np.zeros(own.shape, dtype=np.int32)
+    for weight, mask in _WEIGHT_MASKS:
+        score += weight * (popcounts(own & mask) - popcounts(opp & mask))
+    return score + MOBILITY_WEIGHT * (popcounts(moves) - popcounts(replies))
+
+
+def analyze(positions):
+    """
+    Represents a function that takes an (N, 2) array of (own, opp) bitboards and
+    returns a dictionary of per-board arrays: the legal "moves" mask, "mobility"
+    of each side, "own_discs" and "opp_discs" (what count_grid reports),
+    "game_over", the "result" for the player to move once the game is over (1,
+    0 or -1, as return_winner decides it, and 0 otherwise) and the "score" from
+    evaluate.
+    """
+    positions = np.asarray(positions, dtype=np.uint64)
+    own = positions[:, 0]
+    opp = positions[:, 1]
+
+    moves = move_masks(own, opp)
+    replies = move_masks(opp, own)
+    own_discs = popcounts(own)
+    opp_discs = popcounts(opp)
+    game_over = (moves == 0) & (replies == 0)
+
+    return {
+        "moves": moves,
+        "mobility": popcounts(moves),
+        "opp_mobility": popcounts(replies),
+        "own_discs": own_discs,
+        "opp_discs": opp_discs,
+        "game_over": game_over,
+        "result": np.where(game_over, np.sign(own_discs - opp_discs), 0).astype(np.int8),
+        "score": evaluate(own, opp, moves, replies),
+    }
+
+
+def analyze_chunks(positions, chunk_size=DEFAULT_CHUNK):
+    """
+    Represents a generator that runs analyze over an (N, 2) array one chunk at a
+    time and yields (start, results) pairs. The input may be a memory-mapped
+    array (np.load(path, mmap_mode="r")), so only one chunk is ever in memory.
+    """
+    for start in range(0, len(positions), chunk_size):
+        yield start, analyze(positions[start:start + chunk_size])
+
+
+def random_positions(count, seed=1):
+    """
+    Represents a function that returns an (N, 2) array of positions reached by
+    playing random legal moves from the starting position, for benchmarking.
+    """
+    rng = random.Random(seed)
+    positions = []
+    position = Position()
+    while len(positions) < count:
+        legal = list(squares(position.legal_moves()))
+        if not legal:
+            position.pass_turn()
+            if not position.legal_moves():
+                position = Position()
+            continue
+        position.make_move(rng.choice(legal))
+        positions.append(position.copy())
+    return from_positions(positions)
+
+
+def main():
+    """
+    Represents the command line entry point that analyzes positions in chunks and
+    reports boards per second.
+    """
+    parser = argparse.ArgumentParser(description="Batch analyze Othello positions with NumPy.")
+    parser.add_argument("--input", help=".npy file of (N, 2) uint64 (own, opp) bitboards; random positions if omitted")
+    parser.add_argument("--boards", type=int, default=1000000, help="number of random boards (default 1000000)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK,
+                        help="boards per chunk (default %d)" % DEFAULT_CHUNK)
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    args = parser.parse_args()
+
+    if args.input:
+        positions = np.load(args.input, mmap_mode="r")
+        count = len(positions)
+
+        def chunks():
+            return analyze_chunks(positions, args.chunk)
+    else:
+        # a pool of random games, sampled from chunk by chunk so memory stays bounded
+        pool = random_positions(min(args.boards, 20000), args.seed)
+        sampler = np.random.default_rng(args.seed)
+        count = args.boards
+
+        def chunks():
+            for start in range(0, count, args.chunk):
+                size = min(args.chunk, count - start)
+                yield start, analyze(pool[sampler.integers(0, len(pool), size)])
+
+    start = time.perf_counter()
+    moves = 0
+    finished = 0
+    for offset, results in chunks():
+        moves += int(results["mobility"].sum())
+        finished += int(results["game_over"].sum())
+    elapsed = time.perf_counter() - start
+
+    print("analyzed %d boards in %.2f s: %.0f boards/s" % (count, elapsed, count / elapsed if elapsed else 0.0))
+    print("  %.2f legal moves per board, %d finished games" % (moves / count if count else 0.0, finished))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Description: Benchmark suite for the Reversi rules engine and renderer. Times move
+#               generation, flipping, counting, pattern evaluation, perft, fixed-depth parallel
+#               search with 1, 2, 4 and 8 workers, full-frame rendering (under the SDL dummy
+#               video driver, so no display is needed) and process startup, writes the results
+#               as JSON and flags any benchmark that got slower than a stored baseline.
+#
+# Example:      python bench.py --save-baseline      (on the commit to compare against)
+#               python bench.py                      (later; exits with 1 on a regression)
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from engine import BLACK, Position, move_mask, flip_mask, popcount, squares
+from perft import perft
+
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_OUTPUT = "bench_results.json"
+
+
+def sample_positions(count=1000, seed=1):
+    """
+    Represents a function that returns a list of positions from random games,
+    the same list every time for the same seed.
+    """
+    rng = random.Random(seed)
+    positions = []
+    position = Position()
+    while len(positions) < count:
+        legal = list(squares(position.legal_moves()))
+        if not legal:
+            position.pass_turn()
+            if not position.legal_moves():
+                position = Position()
+            continue
+        position.make_move(rng.choice(legal))
+        positions.append(position.copy())
+    return positions
+
+
+def bench_movegen(positions):
+    """
+    Represents a benchmark that generates the legal moves of every position.
+
+    Returns -- a function that runs the benchmark once and returns the number of
+    operations it did.
+    """
+    pairs = [position.bitboards(position.turn) for position in positions]
+
+    def run():
+        for own, opp in pairs:
+            move_mask(own, opp)
+        return len(pairs)
+    return run
+
+
+def bench_flips(positions):
+    """
+    Represents a benchmark that computes the flips of every legal move of every
+    position.
+    """
+    moves = []
+    for position in positions:
+        own, opp = position.bitboards(position.turn)
+        moves.extend((own, opp, square) for square in squares(move_mask(own, opp)))
+
+    def run():
+        for own, opp, square in moves:
+            flip_mask(own, opp, square)
+        return len(moves)
+    return run
+
+
+def bench_counts(positions):
+    """
+    Represents a benchmark that counts the discs of every position, the work
+    count_grid and return_winner do.
+    """
+    def run():
+        for position in positions:
+            position.counts()
+        return len(positions)
+    return run
+
+
+def bench_evaluate(positions):
+    """
+    Represents a benchmark that scores every position with the pattern-table
+    evaluation (all-zero weights, which take the same time as fitted ones).
+    """
+    from patterns import PatternEvaluator
+
+    evaluate = PatternEvaluator().evaluate
+    pairs = [position.bitboards(position.turn) for position in positions]
+
+    def run():
+        for own, opp in pairs:
+            evaluate(own, opp)
+        return len(pairs)
+    return run
+
+
+def bench_perft(positions):
+    """
+    Represents a benchmark that runs perft to depth 6 from the starting position
+    and counts leaves.
+    """
+    start = Position()
+
+    def run():
+        return perft(start.black, start.white, 6)
+    return run
+
+
+def bench_search(workers, depth=6, count=4):
+    """
+    Represents a function that returns a benchmark that searches a few midgame
+    positions to a fixed depth with a ParallelSearch of the given number of
+    workers, each search starting from an empty table. The searches per second of
+    the search benchmarks, side by side, show how the parallel search scales.
+    """
+    def setup(positions):
+        from parallel import ParallelSearch
+
+        search = ParallelSearch(workers, float("inf"), depth)
+        atexit.register(search.close)
+        midgame = [position.bitboards(position.turn) + (0 if position.turn == BLACK else 1,)
+                   for position in positions
+                   if 28 <= popcount(position.black | position.white) <= 36 and popcount(position.legal_moves()) > 1]
+        midgame = midgame[:count]
+
+        def run():
+            for own, opp, color in midgame:
+                search.clear()
+                search.search(own, opp, color)
+            return len(midgame)
+        return run
+    return setup
+
+
+def bench_render(positions):
+    """
+    Represents a benchmark that draws full frames of the grid screen, with every
+    cell marked dirty, under the SDL dummy video driver.
+    """
+    from main import Reversi
+
+    game = Reversi(headless=True)
+    game.state = "grid"
+    game.draw_frame()
+
+    def run():
+        for frame in range(20):
+            game.renderer.mark_all()
+            game.draw_grid()
+        return 20
+    return run
+
+
+def bench_import(positions):
+    """
+    Represents a benchmark that starts a fresh interpreter and imports main, the
+    cost every worker that reuses the game logic pays.
+    """
+    command = [sys.executable, "-c", "import main"]
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run():
+        subprocess.run(command, cwd=here, check=True)
+        return 1
+    return run
+
+
+def bench_first_frame(positions):
+    """
+    Represents a benchmark that starts the game headless in a fresh interpreter
+    and quits once the first frame of the grid screen is drawn.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, "main.py"), "--headless", "--state", "grid", "--frames", "1"]
+
+    def run():
+        subprocess.run(command, cwd=here, check=True, stdout=subprocess.DEVNULL)
+        return 1
+    return run
+
+
+# name, setup function and what one operation is
+BENCHMARKS = (
+    ("movegen", bench_movegen, "positions"),
+    ("flips", bench_flips, "moves"),
+    ("counts", bench_counts, "positions"),
+    ("pattern_eval", bench_evaluate, "evaluations"),
+    ("perft", bench_perft, "leaves"),
+    ("search_1_worker", bench_search(1), "searches"),
+    ("search_2_workers", bench_search(2), "searches"),
+    ("search_4_workers", bench_search(4), "searches"),
+    ("search_8_workers", bench_search(8), "searches"),
+    ("render_full_frame", bench_render, "frames"),
+    ("import_main", bench_import, "processes"),
+    ("first_frame", bench_first_frame, "processes"),
+)
+
+
+def time_benchmark(run, repeat=5, min_time=0.2):
+    """
+    Represents a function that runs a benchmark repeat times, looping each run
+    until it has taken at least min_time seconds, and returns (operations,
+    seconds) for the fastest run.
+    """
+    best = None
+    for attempt in range(repeat):
+        operations = 0
+        start = time.perf_counter()
+        while True:
+            operations += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        if best is None or operations / elapsed > best[0] / best[1]:
+            best = (operations, elapsed)
+    return best
+
+
+def speedups(results):
+    """
+    Represents a function that returns (name, speedup) for every parallel search
+    benchmark that ran, against the one-worker search.
+    """
+    benchmarks = results["benchmarks"]
+    single = benchmarks.get("search_1_worker")
+    if single is None:
+        return []
+    return [(name, result["ops_per_second"] / single["ops_per_second"])
+            for name, result in benchmarks.items() if name.startswith("search_") and result is not single]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Represents a function that returns a list of (name, current, baseline) for
+    every benchmark that runs more than tolerance (a fraction) slower than the
+    baseline.
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        reference = baseline.get("benchmarks", {}).get(name)
+        if reference and result["ops_per_second"] < reference["ops_per_second"] * (1 - tolerance):
+            regressions.append((name, result["ops_per_second"], reference["ops_per_second"]))
+    return regressions
+
+
+def main():
+    """
+    Represents the command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Reversi engine and renderer.")
+    parser.add_argument("--only", action="append", choices=[name for name, setup, unit in BENCHMARKS],
+                        help="run only this benchmark (may be repeated)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark, the best counts (default 5)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results (default %s)" % DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against (default %s)" % DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="slowdown allowed before a benchmark is flagged (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    positions = sample_positions()
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": {},
+    }
+
+    for name, setup, unit in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        operations, elapsed = time_benchmark(setup(positions), args.repeat)
+        rate = operations / elapsed
+        results["benchmarks"][name] = {"ops": operations, "seconds": elapsed, "ops_per_second": rate, "unit": unit}
+        print("%-18s %14.0f %s/s" % (name, rate, unit))
+    for name, speedup in speedups(results):
+        print("%-18s %13.2fx the 1-worker search (%d CPUs)" % (name, speedup, os.cpu_count() or 1))
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print("results written to %s" % args.output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print("baseline saved to %s" % args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        # timings depend on the machine, so no baseline is kept in the repository
+        print("WARNING: no baseline at %s, so nothing was checked for regressions; run with --save-baseline "
+              "on the commit to compare against first" % args.baseline, file=sys.stderr)
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, current, reference in regressions:
+        print("REGRESSION %s: %.0f/s vs %.0f/s baseline (%.1f%% slower)" % (
+            name, current, reference, 100 * (1 - current / reference)))
+    if regressions:
+        sys.exit(1)
+    print("no regressions against %s" % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
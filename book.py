@@ -0,0 +1,306 @@
+# Description: Opening book for Reversi. A builder collects positions from game records or
+#               search results, reduces each one to a canonical form under the 8 symmetries
+#               of the board and writes them to a sorted fixed-width binary file, which is
+#               opened with mmap and binary searched, so nothing is parsed at startup.
+import argparse
+import mmap
+import struct
+
+from engine import START_BLACK, START_WHITE, move_mask, flip_mask, popcount
+
+MAGIC = b"OTHBOOK1"
+HEADER = struct.Struct(">8sII")  # magic, record size, number of records
+# own and opp bitboards of the canonical position (big-endian, so byte order is sort
+# order), move square, padding, score, count
+RECORD = struct.Struct(">QQBxhI")
+KEY_SIZE = 16
+
+_K1 = 0x5555555555555555
+_K2 = 0x3333333333333333
+_K4 = 0x0F0F0F0F0F0F0F0F
+
+
+def flip_vertical(bits):
+    """
+    Represents a function that mirrors a bitboard top to bottom.
+    """
+    return int.from_bytes(bits.to_bytes(8, "little"), "big")
+
+
+def mirror_horizontal(bits):
+    """
+    Represents a function that mirrors a bitboard left to right.
+    """
+    bits = ((bits >> 1) & _K1) | ((bits & _K1) << 1)
+    bits = ((bits >> 2) & _K2) | ((bits & _K2) << 2)
+    return ((bits >> 4) & _K4) | ((bits & _K4) << 4)
+
+
+def flip_diagonal(bits):
+    """
+    Represents a function that mirrors a bitboard across the main diagonal, so
+    row r, column c moves to row c, column r.
+    """
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    return bits ^ t ^ (t >> 7)
+
+
+def transform(bits, symmetry):
+    """
+    Represents a function that applies one of the 8 board symmetries (0-7) to a
+    bitboard. Bit 0 flips vertically, bit 1 mirrors horizontally and bit 2 then
+    mirrors across the diagonal; 0 leaves the board as it is.
+    """
+    if symmetry & 1:
+        bits = flip_vertical(bits)
+    if symmetry & 2:
+        bits = mirror_horizontal(bits)
+    if symmetry & 4:
+        bits = flip_diagonal(bits)
+    return bits
+
+
+# where each square goes under each symmetry, and back again
+SQUARE_MAPS = tuple(
+    tuple(transform(1 << square, symmetry).bit_length() - 1 for square in range(64))
+    for symmetry in range(8)
+)
+INVERSE_SQUARE_MAPS = tuple(
+    tuple(square_map.index(square) for square in range(64)) for square_map in SQUARE_MAPS
+)
+
+
+def canonical(own, opp):
+    """
+    Represents a function that returns (own, opp, symmetry) for the smallest of the
+    8 symmetric forms of a position, along with the symmetry that produces it.
+    """
+    best = None
+    for symmetry in range(8):
+        form = (transform(own, symmetry), transform(opp, symmetry), symmetry)
+        if best is None or form < best:
+            best = form
+    return best
+
+
+def parse_moves(text):
+    """
+    Represents a function that turns a game record such as "f5d6c3" into a list of
+    squares. Columns are a-h and rows 1-8, as in standard Othello notation.
+
+    Raises ValueError for a record that is not a whole number of moves or holds a
+    square off the board.
+    """
+    text = text.strip().lower()
+    if len(text) % 2:
+        raise ValueError("game record %r ends in the middle of a move" % text)
+    moves = []
+    for i in range(0, len(text), 2):
+        col = ord(text[i]) - ord("a")
+        row = int(text[i + 1]) - 1
+        if not (0 <= col < 8 and 0 <= row < 8):
+            raise ValueError("invalid move %r in game record" % text[i:i + 2])
+        moves.append(row * 8 + col)
+    return moves
+
+
+class BookBuilder:
+    """
+    Represents a builder that collects (position, move) statistics and writes them
+    out as a book file. Each entry keeps how often the move was seen and the
+    average score for the player to move: the final disc difference for game
+    records that reached the end, or the score given to add_result.
+    """
+
+    def __init__(self, max_plies=20):
+        """
+        Represents an init method that takes how many plies of each game to record.
+        """
+        self.max_plies = max_plies
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_result(self, own, opp, move, score=0, count=1, scored=True):
+        """
+        Represents a method that records playing move in the position (own to move
+        against opp), with the score it led to for the player to move.
+        """
+        canon_own, canon_opp, symmetry = canonical(own, opp)
+        key = (canon_own, canon_opp, SQUARE_MAPS[symmetry][move])
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [0, 0, 0]
+        entry[0] += count
+        if scored:
+            entry[1] += score * count
+            entry[2] += count
+
+    def add_game(self, moves):
+        """
+        Represents a method that replays a game from the starting position, given as
+        a list of squares or a record string like "f5d6c3", and records its first
+        max_plies moves. Passes are inferred when the player to move has no move.
+
+        Raises ValueError if the record contains an illegal move.
+        """
+        if isinstance(moves, str):
+            moves = parse_moves(moves)
+
+        own, opp = START_BLACK, START_WHITE
+        played = []  # (own, opp, move, mover is black)
+        black_to_move = True
+
+        for move in moves:
+            if not move_mask(own, opp):
+                own, opp = opp, own
+                black_to_move = not black_to_move
+
+            flips = flip_mask(own, opp, move)
+            if not flips or (own | opp) & (1 << move):
+                raise ValueError("illegal move %d in game record" % move)
+
+            if len(played) < self.max_plies:
+                played.append((own, opp, move, black_to_move))
+            own, opp = opp & ~flips, own | flips | (1 << move)
+            black_to_move = not black_to_move
+
+        # score the recorded positions with the final result if the game was finished
+        finished = not move_mask(own, opp) and not move_mask(opp, own)
+        black_lead = 0
+        if finished:
+            black_lead = popcount(own) - popcount(opp)
+            if not black_to_move:
+                black_lead = -black_lead
+
+        for position_own, position_opp, move, black in played:
+            self.add_result(position_own, position_opp, move, black_lead if black else -black_lead,
+                            scored=finished)
+
+    def write(self, path):
+        """
+        Represents a method that writes the collected entries to path, sorted by
+        canonical position and then move.
+        """
+        with open(path, "wb") as book_file:
+            book_file.write(HEADER.pack(MAGIC, RECORD.size, len(self._entries)))
+            for (own, opp, move) in sorted(self._entries):
+                count, score_total, scored = self._entries[(own, opp, move)]
+                score = round(score_total / scored) if scored else 0
+                book_file.write(RECORD.pack(own, opp, move, max(-32768, min(32767, score)), min(count, 0xFFFFFFFF)))
+
+
+class OpeningBook:
+    """
+    Represents a book file opened for lookups. The file is memory mapped and binary
+    searched in place, so opening it costs the same for any number of entries.
+    """
+
+    def __init__(self, path):
+        """
+        Represents an init method that takes the path of a book written by BookBuilder.
+        """
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, record_size, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError("%s is not an opening book" % path)
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Represents a method that unmaps and closes the book file.
+        """
+        self._map.close()
+        self._file.close()
+
+    def _key_at(self, index):
+        """
+        Represents a method that returns the 16 key bytes of the record at index.
+        """
+        offset = HEADER.size + index * RECORD.size
+        return self._map[offset:offset + KEY_SIZE]
+
+    def lookup(self, own, opp):
+        """
+        Represents a method that returns a list of (move, score, count) for every
+        book move in the position (own to move against opp), with moves given in the
+        position's own orientation.
+        """
+        canon_own, canon_opp, symmetry = canonical(own, opp)
+        target = canon_own.to_bytes(8, "big") + canon_opp.to_bytes(8, "big")
+
+        # find the first record whose key is not less than the target
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        inverse = INVERSE_SQUARE_MAPS[symmetry]
+        moves = []
+        while low < self.count and self._key_at(low) == target:
+            own_bits, opp_bits, move, score, count = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)
+            moves.append((inverse[move], score, count))
+            low += 1
+        return moves
+
+    def best_move(self, own, opp, min_count=1):
+        """
+        Represents a method that returns the book move with the best score (the most
+        played on ties), or None if the position has no move seen at least min_count
+        times.
+        """
+        best = None
+        for move, score, count in self.lookup(own, opp):
+            if count >= min_count and (best is None or (score, count) > best[1:]):
+                best = (move, score, count)
+        return None if best is None else best[0]
+
+
+def main():
+    """
+    Represents the command line entry point that builds a book from a file of
+    game records, one game per line.
+    """
+    parser = argparse.ArgumentParser(description="Build a Reversi opening book from game records.")
+    parser.add_argument("games", help="text file with one game per line, e.g. f5d6c3d3c4")
+    parser.add_argument("output", help="path of the book file to write")
+    parser.add_argument("--plies", type=int, default=20, help="plies of each game to record (default 20)")
+    args = parser.parse_args()
+
+    builder = BookBuilder(args.plies)
+    skipped = 0
+    with open(args.games) as games:
+        for line in games:
+            if line.strip():
+                try:
+                    builder.add_game(line.split()[0])
+                except ValueError:
+                    skipped += 1
+
+    builder.write(args.output)
+    print("wrote %d entries to %s (%d games skipped)" % (len(builder), args.output, skipped))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Description: Client side of networked Reversi. GameClient talks to server.py over a plain
+#               socket with a background reader thread, and RemotePlayer seats the opponent
+#               on the other end of the connection in the pygame game like any computer player.
+import queue
+import socket
+import threading
+
+from engine import BLACK, WHITE
+from eventlog import EventLog
+from player import Player
+from server import HEADER, MAX_MESSAGE, ProtocolError, decode_payload, encode_message
+
+
+class GameClient:
+    """
+    Represents a connection to a game server. Messages from the server are read
+    on a background thread and put on the messages queue, and an optional notify
+    callback is called after each one, for example to wake the pygame loop.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, timeout=10.0, notify=None):
+        """
+        Represents an init method that connects to the server at host and port.
+        """
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.settimeout(None)
+        self.messages = queue.Queue()
+        self.notify = notify
+        self.closed = False
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _recv_exactly(self, size):
+        """
+        Represents a method that reads exactly size bytes, or returns None if the
+        connection closes first.
+        """
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _read_loop(self):
+        """
+        Represents the background thread that reads framed messages until the
+        connection closes, which is reported as a {"type": "closed"} message.
+        """
+        try:
+            while True:
+                header = self._recv_exactly(HEADER.size)
+                if header is None:
+                    break
+                (size,) = HEADER.unpack(header)
+                if size > MAX_MESSAGE:
+                    break
+                payload = self._recv_exactly(size)
+                if payload is None:
+                    break
+                self.messages.put(decode_payload(payload))
+                if self.notify is not None:
+                    self.notify()
+        except (OSError, ProtocolError):
+            pass
+        self.closed = True
+        self.messages.put({"type": "closed"})
+        if self.notify is not None:
+            self.notify()
+
+    def send(self, message):
+        """
+        Represents a method that sends one message to the server.
+        """
+        with self._send_lock:
+            self.sock.sendall(encode_message(message))
+
+    def join(self, game=None):
+        """
+        Represents a method that asks to be seated, in the named game if given.
+        """
+        self.send({"type": "join"} if game is None else {"type": "join", "game": game})
+
+    def wait_for(self, kind, timeout=None):
+        """
+        Represents a method that waits for the next message of the given type and
+        returns it. Other messages that arrive first are dropped.
+
+        Raises ConnectionError if the server closes the connection or sends an
+        error, and queue.Empty on timeout.
+        """
+        while True:
+            message = self.messages.get(timeout=timeout)
+            if message["type"] == kind:
+                return message
+            if message["type"] == "closed":
+                raise ConnectionError("the server closed the connection")
+            if message["type"] == "error":
+                raise ConnectionError(message["message"])
+
+    def close(self):
+        """
+        Represents a method that closes the connection.
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class RemotePlayer(Player):
+    """
+    Represents the player on the other end of a GameClient connection. Reversi
+    treats it as a computer player: choose_move returns the opponent's move once
+    the server has relayed it (and None until then), and the local player's moves
+    are sent to the server as Reversi plays them. If the opponent leaves or the
+    connection drops, status says why and report hands it to Reversi, which ends
+    the game instead of waiting on a move that will never come.
+    """
+
+    def __init__(self, player, color, client, events=None):
+        """
+        Represents an init method that takes the player name and color like Player,
+        plus the connected GameClient and the EventLog to record its notices in.
+        """
+        super().__init__(player, color)
+        self.client = client
+        self.events = events or EventLog()
+        self.piece = WHITE if color == "rose" else BLACK
+        self.pending = []
+        self.status = None
+        self.notices = []  # (message, left) pairs that report has not handed out yet
+
+    def is_computer(self):
+        """
+        Represents a method that tells Reversi this player chooses its own moves.
+
+        Returns – True
+        """
+        return True
+
+    def allows_takeback(self):
+        """
+        Represents a method that tells Reversi moves cannot be undone, since the
+        server has already relayed them.
+
+        Returns – False
+        """
+        return False
+
+    def _poll(self):
+        """
+        Represents a method that takes every message waiting on the client and
+        keeps the remote player's moves.
+        """
+        while True:
+            try:
+                message = self.client.messages.get_nowait()
+            except queue.Empty:
+                return
+            kind = message["type"]
+            if kind == "state" and message["mover"] == self.piece:
+                self.pending.append(message["last"])
+            elif kind == "over" and "reason" in message:
+                self.status = "The other player left the game."
+                self.notices.append((self.status, True))
+                self.events.warning("remote", "%s left: %s", self.get_color(), message["reason"])
+            elif kind == "closed" and self.status is None:
+                self.status = "Lost the connection to the server."
+                self.notices.append((self.status, True))
+                self.events.warning("remote", "connection to the server closed")
+            elif kind == "error":
+                self.notices.append(("Server error: %s" % message["message"], False))
+                self.events.error("remote", "server error: %s", message["message"])
+
+    def report(self):
+        """
+        Represents a method that Reversi calls every frame. It reads the messages
+        waiting on the client and returns the next notice for the user.
+
+        Returns – None, or a (message, left) pair where left is True once the
+        opponent has left the game or the connection is lost
+        """
+        self._poll()
+        if self.notices:
+            return self.notices.pop(0)
+        return None
+
+    def choose_move(self, position):
+        """
+        Represents a method that returns the remote player's next move, or None if
+        it has not arrived yet.
+        """
+        self._poll()
+        if self.pending:
+            return self.pending.pop(0)
+        return None
+
+    def observe_move(self, piece, square):
+        """
+        Represents a method that Reversi calls after every move; the local player's
+        moves are sent on to the server.
+        """
+        if piece != self.piece and not self.client.closed:
+            self.client.send({"type": "move", "square": square})
@@ -0,0 +1,220 @@
+# Description: Perfect-play endgame solver for Reversi. Once few squares are left empty it
+#               searches every line to the end of the game and returns the exact final disc
+#               difference, or only whether the game is won, drawn or lost.
+import time
+
+from engine import FULL, Position, move_mask, flip_mask, popcount, squares, square_to_cell
+
+# The four 4x4 quadrants of the board. A quadrant with an odd number of empty squares
+# is where the player to move can hope to take the last square, so it is tried first.
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+
+# with this many empties or more, moves are ordered fastest-first (fewest replies for the
+# opponent); below it the cheaper parity ordering is used
+FASTEST_FIRST_EMPTIES = 7
+
+INFINITY = 65
+
+
+class EndgameResult:
+    """
+    Represents the outcome of an endgame solve: the best square (or None if there
+    is no legal move), the (row, col) of that square on Reversi's board, the exact
+    final disc difference for the player to move (or -1, 0, 1 in win/draw/loss
+    mode), the nodes searched, the time taken and the nodes searched per second.
+    """
+
+    def __init__(self, move, score, nodes, elapsed):
+        self.move = move
+        self.cell = None if move is None else square_to_cell(move)
+        self.score = score
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.nodes_per_second = nodes / elapsed if elapsed else 0.0
+
+    def __repr__(self):
+        return "EndgameResult(move=%r, score=%r, nodes=%r, elapsed=%.3f, nodes_per_second=%.0f)" % (
+            self.move, self.score, self.nodes, self.elapsed, self.nodes_per_second)
+
+
+def parity_order(moves, empty):
+    """
+    Represents a generator that yields the squares of a move bitboard, those in
+    quadrants with an odd number of empties first.
+    """
+    odd = 0
+    for quadrant in QUADRANTS:
+        if popcount(empty & quadrant) & 1:
+            odd |= quadrant
+
+    for square in squares(moves & odd):
+        yield square
+    for square in squares(moves & ~odd):
+        yield square
+
+
+def last1(own, opp, square):
+    """
+    Represents a function that returns the final disc difference for the player to
+    move when only the given square is empty. If the player cannot play it, the
+    opponent may; if neither can, the game ends as it stands.
+    """
+    flipped = popcount(flip_mask(own, opp, square))
+    if flipped:
+        return popcount(own) - popcount(opp) + 2 * flipped + 1
+
+    flipped = popcount(flip_mask(opp, own, square))
+    if flipped:
+        return popcount(own) - popcount(opp) - 2 * flipped - 1
+
+    return popcount(own) - popcount(opp)
+
+
+def last2(own, opp, first, second, beta):
+    """
+    Represents a function that returns the final disc difference for the player to
+    move when only the squares first and second are empty, stopping early once a
+    score of at least beta is found.
+    """
+    best = -INFINITY
+    for square, other in ((first, second), (second, first)):
+        flips = flip_mask(own, opp, square)
+        if flips:
+            score = -last1(opp & ~flips, own | flips | (1 << square), other)
+            if score > best:
+                best = score
+                if best >= beta:
+                    return best
+
+    if best != -INFINITY:
+        return best
+
+    # the player to move passes and the opponent picks the square that is worst for them
+    worst = INFINITY
+    for square, other in ((first, second), (second, first)):
+        flips = flip_mask(opp, own, square)
+        if flips:
+            worst = min(worst, last1(own & ~flips, opp | flips | (1 << square), other))
+
+    if worst != INFINITY:
+        return worst
+
+    return popcount(own) - popcount(opp)
+
+
+class EndgameSolver:
+    """
+    Represents an exact endgame solver. Scores are the final difference in discs
+    for the player to move, counted the same way Reversi.return_winner counts them.
+
+    In win/draw/loss mode the search runs with a (-1, 1) window, which only proves
+    the sign of the result and is much faster than the exact score.
+    """
+
+    def __init__(self, empties_threshold=14):
+        """
+        Represents an init method that takes the largest number of empty squares
+        the solver should be used for; see should_solve.
+        """
+        self.empties_threshold = empties_threshold
+        self.nodes = 0
+
+    def should_solve(self, own, opp):
+        """
+        Represents a method that returns True if the position has few enough empty
+        squares to be solved exactly.
+        """
+        return 64 - popcount(own | opp) <= self.empties_threshold
+
+    def solve(self, own, opp, wld=False):
+        """
+        Represents a method that takes the bitboards of the player to move and the
+        opponent and returns an EndgameResult with the best move. If wld is True,
+        the score is only 1 (win), 0 (draw) or -1 (loss).
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+
+        alpha, beta = (-1, 1) if wld else (-INFINITY, INFINITY)
+        moves = move_mask(own, opp)
+        best_move = None
+
+        if not moves:
+            score = self._solve(own, opp, alpha, beta, False)
+        else:
+            score = -INFINITY
+            for square in self._order(own, opp, moves):
+                flips = flip_mask(own, opp, square)
+                value = -self._solve(opp & ~flips, own | flips | (1 << square), -beta, -max(alpha, score), False)
+                if value > score:
+                    score = value
+                    best_move = square
+                    if score >= beta:
+                        break
+
+        if wld:
+            score = (score > 0) - (score < 0)
+
+        return EndgameResult(best_move, score, self.nodes, time.perf_counter() - start)
+
+    def solve_board(self, board, turn, wld=False):
+        """
+        Represents a method that solves a position exported from Reversi._board with
+        turn ("X" or "O") to move. The result's cell is the (row, col) to play.
+        """
+        position = Position.from_board(board, turn)
+        own, opp = position.bitboards(turn)
+        return self.solve(own, opp, wld)
+
+    def _order(self, own, opp, moves):
+        """
+        Represents a method that returns the moves in the order to search them:
+        fastest-first while many squares are empty, by parity after that.
+        """
+        empty = ~(own | opp) & FULL
+        if popcount(empty) < FASTEST_FIRST_EMPTIES:
+            return parity_order(moves, empty)
+
+        # fastest-first: the move that leaves the opponent the fewest replies goes first
+        replies = []
+        for square in parity_order(moves, empty):
+            flips = flip_mask(own, opp, square)
+            replies.append((popcount(move_mask(opp & ~flips, own | flips | (1 << square))), square))
+        replies.sort(key=lambda item: item[0])
+        return [square for count, square in replies]
+
+    def _solve(self, own, opp, alpha, beta, passed):
+        """
+        Represents a recursive method that returns the final disc difference for the
+        player to move within the (alpha, beta) window.
+        """
+        self.nodes += 1
+        empty = ~(own | opp) & FULL
+
+        if not empty & (empty - 1):
+            if not empty:
+                return popcount(own) - popcount(opp)
+            return last1(own, opp, empty.bit_length() - 1)
+
+        remaining = empty & (empty - 1)
+        if not remaining & (remaining - 1):
+            return last2(own, opp, (empty & -empty).bit_length() - 1, remaining.bit_length() - 1, beta)
+
+        moves = move_mask(own, opp)
+        if not moves:
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self._solve(opp, own, -beta, -alpha, True)
+
+        best = -INFINITY
+        for square in self._order(own, opp, moves):
+            flips = flip_mask(own, opp, square)
+            score = -self._solve(opp & ~flips, own | flips | (1 << square), -beta, -alpha, False)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best
@@ -0,0 +1,654 @@
+# Description: Headless bitboard rules engine for Othello. A position is stored as two
+#               64-bit integers (one per color) covering the 8x8 playable area, and legal
+#               moves and flips are computed with shift-and-mask operations. Other even board
+#               sizes use the same layout in Python's arbitrary-length integers (see Variant).
+#               Nothing in this module depends on pygame, so it can be used without a display.
+from functools import lru_cache
+
+BLACK = "X"  # player 1 (purple), moves first
+WHITE = "O"  # player 2 (rose)
+EMPTY = "."
+BORDER = "*"
+
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # every column except the leftmost
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # every column except the rightmost
+INNER_FILES = 0x7E7E7E7E7E7E7E7E  # columns that a horizontal or diagonal line can pass through
+
+# Starting discs, matching the layout Reversi has always used:
+# X on d5/e4 and O on d4/e5 in 8x8 terms
+START_BLACK = (1 << 28) | (1 << 35)
+START_WHITE = (1 << 27) | (1 << 36)
+
+# (shift, mask) pairs for walking one step in each direction.
+# Positive shifts move towards higher squares (down the board), negative towards lower squares.
+DIRECTIONS = (
+    (1, NOT_A_FILE),    # right
+    (-1, NOT_H_FILE),   # left
+    (8, FULL),          # down
+    (-8, FULL),         # up
+    (9, NOT_A_FILE),    # down-right
+    (7, NOT_H_FILE),    # down-left
+    (-7, NOT_A_FILE),   # up-right
+    (-9, NOT_H_FILE),   # up-left
+)
+
+
+def _popcount(bits):
+    """
+    Represents a function that returns the number of discs set in a bitboard.
+    """
+    return bin(bits).count("1")
+
+
+# int.bit_count is much faster but only exists on Python 3.10 and later
+popcount = getattr(int, "bit_count", _popcount)
+
+
+def squares(bits):
+    """
+    Represents a generator that yields the square index (0-63) of every set bit
+    in a bitboard, lowest square first.
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def cell_to_square(row, col):
+    """
+    Represents a function that converts a (row, col) position on the 10x10 board
+    used by Reversi (with its "*" sentinel ring) into a square index from 0 to 63.
+    """
+    return (row - 1) * 8 + (col - 1)
+
+
+def square_to_cell(square):
+    """
+    Represents a function that converts a square index from 0 to 63 back into the
+    (row, col) position used by the 10x10 board in Reversi.
+    """
+    return square // 8 + 1, square % 8 + 1
+
+
+def move_mask(own, opp):
+    """
+    Represents a function that takes the bitboards of the player to move and of the
+    opponent and returns a bitboard with every legal move set.
+
+    Each direction is flood filled through opponent discs starting from the player's
+    own discs; an empty square directly past such a run is a legal move.
+    """
+    empty = ~(own | opp) & FULL
+    moves = 0
+
+    # a run of opponent discs is at most six long, so five extra fills cover it.
+    # horizontal and diagonal runs cannot include the edge files, which also stops
+    # the shifted bits from wrapping onto the next row
+    for shift, run in ((1, opp & INNER_FILES), (8, opp), (7, opp & INNER_FILES), (9, opp & INNER_FILES)):
+        line = run & (own << shift)
+        line |= run & (line << shift)
+        line |= run & (line << shift)
+        line |= run & (line << shift)
+        line |= run & (line << shift)
+        line |= run & (line << shift)
+        moves |= empty & (line << shift)
+
+        line = run & (own >> shift)
+        line |= run & (line >> shift)
+        line |= run & (line >> shift)
+        line |= run & (line >> shift)
+        line |= run & (line >> shift)
+        line |= run & (line >> shift)
+        moves |= empty & (line >> shift)
+
+    return moves
+
+
+def flip_mask(own, opp, square):
+    """
+    Represents a function that takes the bitboards of the player to move and of the
+    opponent, plus the square being played, and returns a bitboard of every opponent
+    disc that the move would flip. An empty result means the move captures nothing.
+    """
+    flips = 0
+    placed = 1 << square
+
+    for shift, mask in DIRECTIONS:
+        captured = 0
+        if shift > 0:
+            step = (placed << shift) & mask
+            while step & opp:
+                captured |= step
+                step = (step << shift) & mask
+        else:
+            step = (placed >> -shift) & mask
+            while step & opp:
+                captured |= step
+                step = (step >> -shift) & mask
+
+        # the run only counts if it is closed off by one of the player's own discs
+        if step & own:
+            flips |= captured
+
+    return flips
+
+
+class Variant:
+    """
+    Represents the rules geometry of an even size x size board. Bit n of a
+    bitboard is row n // size, column n % size, exactly as on the standard board,
+    so bitboards are Python integers of size * size bits.
+
+    Legal moves are flood filled with shifts like move_mask, stopping as soon as no
+    run grows, so they take one step per disc of the longest run of opponent discs
+    in each direction, which can grow with the board size. Flips are found with
+    precomputed rays: for each direction and square, the squares a line from it
+    passes through, which costs a fixed number of integer operations per
+    direction (on integers as wide as the board). The 8x8 variant uses the
+    unrolled move_mask and flip_mask functions above.
+    """
+
+    def __init__(self, size=8):
+        """
+        Represents an init method that takes the number of rows (and columns), an
+        even number of at least 4.
+
+        Raises ValueError for any other size.
+        """
+        if size < 4 or size % 2:
+            raise ValueError("board size must be an even number of at least 4, not %r" % (size,))
+
+        self.size = size
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        first_col = sum(1 << (row * size) for row in range(size))
+        last_col = first_col << (size - 1)
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~last_col
+        self.inner_cols = self.not_first_col & self.not_last_col
+
+        # the four center discs, placed like the standard board's d5/e4 and d4/e5
+        half = size // 2
+        self.start_black = (1 << ((half - 1) * size + half)) | (1 << (half * size + half - 1))
+        self.start_white = (1 << ((half - 1) * size + half - 1)) | (1 << (half * size + half))
+
+        self.corners = (1 << 0) | (1 << (size - 1)) | (1 << (self.cells - size)) | (1 << (self.cells - 1))
+        self.square_weights = tuple(self._weight(square // size, square % size) for square in range(self.cells))
+
+        if size == 8:
+            self.move_mask = move_mask
+            self.flip_mask = flip_mask
+        else:
+            self.move_mask = self._move_mask
+            self.flip_mask = self._flip_mask
+            self._rays = self._build_rays()
+
+    def __reduce__(self):
+        # unpickling goes through the cache instead of copying the ray tables
+        return variant, (self.size,)
+
+    def __repr__(self):
+        return "Variant(%d)" % self.size
+
+    def _weight(self, row, col):
+        """
+        Represents a method that returns the classic square weight of a square,
+        scaled to any board: corners are best, the squares touching an empty corner
+        worst, and edges better than the inside. On 8x8 this gives ai.SQUARE_WEIGHTS.
+        """
+        last = self.size - 1
+        row_edge = min(row, last - row)
+        col_edge = min(col, last - col)
+        if row_edge == 0 and col_edge == 0:
+            return 100
+        if row_edge + col_edge == 1:
+            return -20
+        if row_edge == 1 and col_edge == 1:
+            return -50
+        if row_edge == 0 or col_edge == 0:
+            return 10 if row_edge + col_edge == 2 else 5
+        if row_edge == 1 or col_edge == 1:
+            return -2
+        return -1
+
+    def _build_rays(self):
+        """
+        Represents a method that returns, for each of the 8 directions, a tuple with
+        the bitboard of the squares a line from each square passes through.
+        """
+        size = self.size
+        rays = []
+        for row_step, col_step in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            direction = []
+            for square in range(self.cells):
+                row, col = divmod(square, size)
+                ray = 0
+                row, col = row + row_step, col + col_step
+                while 0 <= row < size and 0 <= col < size:
+                    ray |= 1 << (row * size + col)
+                    row, col = row + row_step, col + col_step
+                direction.append(ray)
+            # directions that step towards higher squares find their first blocker at the lowest bit
+            rays.append((row_step * size + col_step > 0, tuple(direction)))
+        return tuple(rays)
+
+    def _move_mask(self, own, opp):
+        """
+        Represents a method that returns the legal move bitboard for any board size.
+        """
+        empty = ~(own | opp) & self.full
+        inner = opp & self.inner_cols
+        moves = 0
+
+        for shift, run in ((1, inner), (self.size, opp), (self.size - 1, inner), (self.size + 1, inner)):
+            line = run & (own << shift)
+            while True:
+                grown = line | (run & (line << shift))
+                if grown == line:
+                    break
+                line = grown
+            moves |= empty & (line << shift)
+
+            line = run & (own >> shift)
+            while True:
+                grown = line | (run & (line >> shift))
+                if grown == line:
+                    break
+                line = grown
+            moves |= empty & (line >> shift)
+
+        return moves
+
+    def _flip_mask(self, own, opp, square):
+        """
+        Represents a method that returns the discs flipped by playing square, for
+        any board size. Along each ray the first square that is not an opponent
+        disc closes the run if it holds one of the player's own discs.
+        """
+        flips = 0
+        for increasing, rays in self._rays:
+            ray = rays[square]
+            blockers = ray & ~opp
+            if not blockers:
+                continue
+            if increasing:
+                first = blockers & -blockers
+                if first & own:
+                    flips |= ray & (first - 1)
+            else:
+                first = 1 << (blockers.bit_length() - 1)
+                if first & own:
+                    flips |= ray & ~((first << 1) - 1)
+        return flips
+
+    def cell_to_square(self, row, col):
+        """
+        Represents a method that converts a (row, col) position on the board with its
+        "*" sentinel ring into a square index.
+        """
+        return (row - 1) * self.size + (col - 1)
+
+    def square_to_cell(self, square):
+        """
+        Represents a method that converts a square index into a (row, col) position on
+        the board with its "*" sentinel ring.
+        """
+        return square // self.size + 1, square % self.size + 1
+
+    def square_name(self, square):
+        """
+        Represents a method that names a square by its column letter and row number,
+        such as "d3". Boards wider than the alphabet name columns by number instead.
+        """
+        if self.size > 26:
+            return "%d-%d" % (square % self.size + 1, square // self.size + 1)
+        return "abcdefghijklmnopqrstuvwxyz"[square % self.size] + str(square // self.size + 1)
+
+
+@lru_cache(maxsize=None)
+def variant(size=8):
+    """
+    Represents a function that returns the shared Variant for a board size, built
+    the first time it is asked for.
+    """
+    return Variant(size)
+
+
+STANDARD = variant(8)
+
+
+class Position:
+    """
+    Represents an Othello position made up of a bitboard for each color, the
+    color whose turn it is and the board Variant (8x8 unless given). Bit n of a
+    bitboard is row n // 8, column n % 8 of the 8x8 playable area, so there is no
+    sentinel ring to maintain.
+    """
+
+    __slots__ = ("black", "white", "turn", "variant")
+
+    def __init__(self, black=None, white=None, turn=BLACK, variant=None):
+        """
+        Represents an init method that takes the bitboards for both colors, the color
+        to move and the board variant. With no bitboards, it creates the starting
+        position.
+        """
+        self.variant = variant or STANDARD
+        self.black = self.variant.start_black if black is None else black
+        self.white = self.variant.start_white if white is None else white
+        self.turn = turn
+
+    @classmethod
+    def from_board(cls, board, turn=BLACK):
+        """
+        Represents a method that builds a position from the list of lists of "X",
+        "O", "." and "*" strings used by Reversi._board (10x10 for the standard
+        board, with the "*" sentinel ring around the playable squares).
+        """
+        board_variant = variant(len(board) - 2)
+        black = 0
+        white = 0
+        for row in range(1, board_variant.size + 1):
+            for col in range(1, board_variant.size + 1):
+                if board[row][col] == BLACK:
+                    black |= 1 << board_variant.cell_to_square(row, col)
+                elif board[row][col] == WHITE:
+                    white |= 1 << board_variant.cell_to_square(row, col)
+        return cls(black, white, turn, board_variant)
+
+    def to_board(self):
+        """
+        Represents a method that exports the position as the list of lists used by
+        Reversi._board, including the "*" sentinel ring.
+        """
+        last = self.variant.size + 1
+        board = []
+        for row in range(last + 1):
+            this_list = []
+            for col in range(last + 1):
+                if row == 0 or row == last or col == 0 or col == last:
+                    this_list.append(BORDER)
+                else:
+                    this_list.append(self.piece_at(self.variant.cell_to_square(row, col)))
+            board.append(this_list)
+        return board
+
+    def copy(self):
+        """
+        Represents a method that returns an independent copy of the position.
+        """
+        return Position(self.black, self.white, self.turn, self.variant)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Represents a method that parses the compact text form written by to_text:
+        one character per square in row-major order ("X", "O", and "." or "-" for an
+        empty square, 64 of them on the standard board), a space and the color to
+        move ("X" or "O").
+
+        Raises ValueError if the text is not in that form.
+        """
+        fields = text.split()
+        if len(fields) != 2 or fields[1].upper() not in (BLACK, WHITE):
+            raise ValueError("expected a board string and the color to move (X or O)")
+        cells = fields[0].upper()
+        size = int(len(cells) ** 0.5)
+        if size * size != len(cells):
+            raise ValueError("a board string needs a square number of squares, not %d" % len(cells))
+
+        black = white = 0
+        for square, cell in enumerate(cells):
+            if cell == BLACK:
+                black |= 1 << square
+            elif cell == WHITE:
+                white |= 1 << square
+            elif cell not in (EMPTY, "-"):
+                raise ValueError("unexpected %r in a board string" % cell)
+        return cls(black, white, fields[1].upper(), variant(size))
+
+    def to_text(self):
+        """
+        Represents a method that returns the position in compact text form, for
+        example the starting position as 27 "."s, "OX", 6 "."s, "XO", 27 "."s and " X".
+        """
+        return "".join(self.piece_at(square) for square in range(self.variant.cells)) + " " + self.turn
+
+    def bitboards(self, color):
+        """
+        Represents a method that returns the (own, opponent) bitboards from the point
+        of view of the given color.
+        """
+        if color == BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
+    def piece_at(self, square):
+        """
+        Represents a method that returns "X", "O" or "." for the given square.
+        """
+        bit = 1 << square
+        if self.black & bit:
+            return BLACK
+        if self.white & bit:
+            return WHITE
+        return EMPTY
+
+    def legal_moves(self, color=None):
+        """
+        Represents a method that returns the legal move bitboard for the given color,
+        or for the color to move if none is given.
+        """
+        own, opp = self.bitboards(color or self.turn)
+        return self.variant.move_mask(own, opp)
+
+    def flips(self, square, color=None):
+        """
+        Represents a method that returns the bitboard of discs that playing the given
+        square would flip, for the given color or the color to move.
+        """
+        own, opp = self.bitboards(color or self.turn)
+        return self.variant.flip_mask(own, opp, square)
+
+    def counts(self):
+        """
+        Represents a method that returns the (black, white) disc counts.
+        """
+        return popcount(self.black), popcount(self.white)
+
+    def apply(self, color, square, flips):
+        """
+        Represents a method that places a disc of the given color on a square and flips
+        the discs in the given bitboard, without validating the move.
+        """
+        if color == BLACK:
+            self.black |= (1 << square) | flips
+            self.white &= ~flips
+        else:
+            self.white |= (1 << square) | flips
+            self.black &= ~flips
+
+    def make_move(self, square):
+        """
+        Represents a method that plays a square for the color to move, flips the captured
+        discs and hands the turn to the other color.
+
+        Returns -- the Move played, which unmake_move takes back. Raises ValueError if
+        the move is illegal.
+        """
+        own, opp = self.bitboards(self.turn)
+        if (own | opp) & (1 << square):
+            raise ValueError("square %d is already occupied" % square)
+        flips = self.variant.flip_mask(own, opp, square)
+        if not flips:
+            raise ValueError("square %d does not capture any discs" % square)
+        move = Move(self.turn, square, flips)
+        self.apply(self.turn, square, flips)
+        self.pass_turn()
+        return move
+
+    def unapply(self, color, square, flips):
+        """
+        Represents a method that undoes apply: it empties the square and flips the
+        discs in the given bitboard back to the other color.
+        """
+        if color == BLACK:
+            self.black &= ~((1 << square) | flips)
+            self.white |= flips
+        else:
+            self.white &= ~((1 << square) | flips)
+            self.black |= flips
+
+    def unmake_move(self, move):
+        """
+        Represents a method that takes back a Move returned by make_move or
+        pass_turn, giving the turn back to the color that made it.
+        """
+        if move.square is not None:
+            self.unapply(move.color, move.square, move.flips)
+        self.turn = move.color
+
+    def pass_turn(self):
+        """
+        Represents a method that hands the turn to the other color without moving.
+
+        Returns -- the pass as a Move, which unmake_move takes back.
+        """
+        move = Move(self.turn, None, 0)
+        self.turn = WHITE if self.turn == BLACK else BLACK
+        return move
+
+    def is_game_over(self):
+        """
+        Represents a method that returns True when neither color has a legal move.
+        """
+        move_mask = self.variant.move_mask
+        return not move_mask(self.black, self.white) and not move_mask(self.white, self.black)
+
+
+class Move:
+    """
+    Represents a move that was played: the color that played it, the square it was
+    played on (None for a pass) and the bitboard of the discs it flipped. That is
+    all unmake_move needs to take it back without copying the position.
+    """
+
+    __slots__ = ("color", "square", "flips")
+
+    def __init__(self, color, square, flips):
+        self.color = color
+        self.square = square
+        self.flips = flips
+
+    def __repr__(self):
+        return "Move(%r, %r, %#x)" % (self.color, self.square, self.flips)
+
+
+class MoveHistory:
+    """
+    Represents the moves of a game in the order they were played, plus the moves
+    taken back since, which can be redone until a new move is played.
+
+    encode turns the history into one byte per move (two on boards of more than
+    254 squares), and replay plays such a record back onto a new position.
+    """
+
+    def __init__(self, variant=None):
+        """
+        Represents an init method that takes the board variant (8x8 unless given).
+        """
+        self.variant = variant or STANDARD
+        self.played = []
+        self.undone = []
+
+    def __len__(self):
+        return len(self.played)
+
+    def push(self, move):
+        """
+        Represents a method that records a newly played Move. Anything that could
+        have been redone is dropped.
+        """
+        self.played.append(move)
+        self.undone.clear()
+
+    def undo(self):
+        """
+        Represents a method that takes the last played Move off the history and
+        keeps it for redo.
+
+        Returns -- the Move, or None if nothing has been played.
+        """
+        if not self.played:
+            return None
+        move = self.played.pop()
+        self.undone.append(move)
+        return move
+
+    def redo(self):
+        """
+        Represents a method that puts the last undone Move back on the history.
+
+        Returns -- the Move, or None if there is nothing to redo.
+        """
+        if not self.undone:
+            return None
+        move = self.undone.pop()
+        self.played.append(move)
+        return move
+
+    def last(self):
+        """
+        Represents a method that returns the last played Move, or None.
+        """
+        return self.played[-1] if self.played else None
+
+    def squares(self):
+        """
+        Represents a method that returns the squares played in order, with None for
+        each pass that was recorded.
+        """
+        return [move.square for move in self.played]
+
+    def encode(self):
+        """
+        Represents a method that returns the history as bytes: the board size, then
+        each square played (the largest code stands for a pass), in one byte each or
+        two big-endian bytes on boards of more than 254 squares.
+        """
+        width = 1 if self.variant.cells < 255 else 2
+        pass_code = (1 << (8 * width)) - 1
+        data = bytearray((self.variant.size,))
+        for move in self.played:
+            data += (pass_code if move.square is None else move.square).to_bytes(width, "big")
+        return bytes(data)
+
+    @classmethod
+    def replay(cls, data):
+        """
+        Represents a method that plays a record made by encode from the starting
+        position. A player with no legal move passes even where the record left the
+        pass out, as the pygame game does.
+
+        Returns -- (position, history) after the last move. Raises ValueError if the
+        record holds an illegal move.
+        """
+        board_variant = variant(data[0])
+        width = 1 if board_variant.cells < 255 else 2
+        pass_code = (1 << (8 * width)) - 1
+        position = Position(variant=board_variant)
+        history = cls(board_variant)
+
+        for offset in range(1, len(data), width):
+            square = int.from_bytes(data[offset:offset + width], "big")
+            if square == pass_code:
+                history.push(position.pass_turn())
+                continue
+            if not position.legal_moves() and position.legal_moves(WHITE if position.turn == BLACK else BLACK):
+                history.push(position.pass_turn())
+            history.push(position.make_move(square))
+
+        return position, history
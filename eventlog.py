@@ -0,0 +1,186 @@
+# Description: Leveled game event log for Reversi. Events go into a fixed-size in-memory ring
+#               buffer under a short lock, are only formatted into text when they are read or
+#               written out, and can be flushed to a file by a background thread, so logging in
+#               the main loop costs next to nothing and a disabled level costs one comparison.
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+def level_number(name):
+    """
+    Represents a function that returns the level for a name such as "info".
+
+    Raises ValueError for an unknown name.
+    """
+    for number, level_name in LEVEL_NAMES.items():
+        if level_name == name.upper():
+            return number
+    raise ValueError("unknown log level %r (expected one of %s)" % (name, ", ".join(
+        level_name.lower() for level_name in LEVEL_NAMES.values())))
+
+
+def format_event(event):
+    """
+    Represents a function that turns an event record into one line of text.
+    """
+    sequence, timestamp, level, kind, message, args = event
+    text = message % args if args else message
+    return "%s.%03d %-7s %s: %s" % (time.strftime("%H:%M:%S", time.localtime(timestamp)),
+                                    int(timestamp * 1000) % 1000, LEVEL_NAMES.get(level, level), kind, text)
+
+
+class EventLog:
+    """
+    Represents a log of game events such as moves, passes, invalid moves and the
+    end of a game.
+
+    Each event is a kind ("move", "pass", ...), a %-style message and its
+    arguments. Events below the log's level are dropped at once, and the message
+    is not formatted until the event is read or written out. The newest capacity
+    events are kept in a ring buffer. A writer takes the next sequence number,
+    stores the event in its slot and moves the end of the buffer on under one
+    lock, held only for those three steps, so with events coming from several
+    threads every slot before the end is filled by the time a reader sees it.
+
+    Given a path, a daemon thread appends new events to the file every
+    flush_interval seconds. Events overwritten before the thread got to them are
+    counted in dropped.
+    """
+
+    def __init__(self, level=INFO, capacity=4096, path=None, flush_interval=1.0):
+        """
+        Represents an init method that takes the lowest level to keep, the number of
+        events the ring buffer holds, an optional file to flush to and how often
+        to flush it in seconds.
+        """
+        self.level = level
+        self.capacity = capacity
+        self.dropped = 0
+        self._buffer = [None] * capacity
+        self._lock = threading.Lock()
+        self._next = 0  # one past the newest sequence number stored
+        self._flushed = 0  # the next sequence number to write to the file
+        self._file = None
+        self._stop = threading.Event()
+        self._flusher = None
+        if path is not None:
+            self._file = open(path, "a")
+            self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,), daemon=True)
+            self._flusher.start()
+
+    def enabled(self, level):
+        """
+        Represents a method that returns True if events of the given level are kept,
+        for callers that want to skip building the arguments too.
+        """
+        return level >= self.level
+
+    def log(self, level, kind, message, *args):
+        """
+        Represents a method that records an event if its level is enabled.
+        """
+        if level < self.level:
+            return
+        timestamp = time.time()
+        with self._lock:
+            sequence = self._next
+            self._buffer[sequence % self.capacity] = (sequence, timestamp, level, kind, message, args)
+            self._next = sequence + 1
+
+    def debug(self, kind, message, *args):
+        """
+        Represents a method that records an event at the DEBUG level.
+        """
+        if DEBUG >= self.level:
+            self.log(DEBUG, kind, message, *args)
+
+    def info(self, kind, message, *args):
+        """
+        Represents a method that records an event at the INFO level.
+        """
+        if INFO >= self.level:
+            self.log(INFO, kind, message, *args)
+
+    def warning(self, kind, message, *args):
+        """
+        Represents a method that records an event at the WARNING level.
+        """
+        if WARNING >= self.level:
+            self.log(WARNING, kind, message, *args)
+
+    def error(self, kind, message, *args):
+        """
+        Represents a method that records an event at the ERROR level.
+        """
+        if ERROR >= self.level:
+            self.log(ERROR, kind, message, *args)
+
+    def events(self, since=0, kind=None):
+        """
+        Represents a method that returns the buffered event records with sequence
+        numbers from since on, oldest first, optionally only those of one kind.
+        Each record is (sequence, time, level, kind, message, args).
+        """
+        end = self._next
+        found = []
+        for sequence in range(max(since, end - self.capacity), end):
+            event = self._buffer[sequence % self.capacity]
+            # a slot may be empty or already hold a newer event
+            if event is not None and event[0] == sequence and (kind is None or event[3] == kind):
+                found.append(event)
+        return found
+
+    def lines(self, since=0, kind=None):
+        """
+        Represents a method that returns the buffered events as formatted lines.
+        """
+        return [format_event(event) for event in self.events(since, kind)]
+
+    def flush(self):
+        """
+        Represents a method that appends the events not yet written to the file.
+        """
+        if self._file is None:
+            return
+        end = self._next
+        start = max(self._flushed, end - self.capacity)
+        self.dropped += start - self._flushed
+        lines = []
+        for sequence in range(start, end):
+            event = self._buffer[sequence % self.capacity]
+            if event[0] != sequence:
+                # overwritten by a newer event since end was read
+                self.dropped += 1
+                continue
+            lines.append(format_event(event) + "\n")
+        self._flushed = end
+        if lines:
+            self._file.writelines(lines)
+            self._file.flush()
+
+    def _flush_loop(self, interval):
+        """
+        Represents the background thread that flushes until the log is closed.
+        """
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def close(self):
+        """
+        Represents a method that stops the flushing thread, writes anything left
+        and closes the file.
+        """
+        if self._flusher is not None:
+            self._stop.set()
+            self._flusher.join()
+            self._flusher = None
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
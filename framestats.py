@@ -0,0 +1,71 @@
+# Description: Frame rate and CPU time statistics for the Reversi main loop, measured over
+#               a rolling interval so an idle window can be told apart from a busy one.
+import time
+
+
+class FrameStats:
+    """
+    Represents running statistics for the main loop. Frames drawn and the
+    process CPU time used are sampled over intervals of the given length, and
+    the most recent interval is kept in fps and cpu_percent.
+    """
+
+    def __init__(self, interval=1.0):
+        """
+        Represents an init method that takes the length in seconds of each
+        measurement interval.
+        """
+        self.interval = interval
+        self.fps = 0.0
+        self.cpu_percent = 0.0
+        self.total_frames = 0
+        self.total_loops = 0
+
+        self._frames = 0
+        self._start_time = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._first_time = self._start_time
+        self._first_cpu = self._start_cpu
+
+    def loop(self, drew_frame):
+        """
+        Represents a method that records one pass of the main loop, and whether a
+        frame was drawn during it.
+
+        Returns -- True when an interval has just finished and fps and cpu_percent
+        were updated.
+        """
+        self.total_loops += 1
+        if drew_frame:
+            self._frames += 1
+            self.total_frames += 1
+
+        now = time.perf_counter()
+        elapsed = now - self._start_time
+        if elapsed < self.interval:
+            return False
+
+        cpu = time.process_time()
+        self.fps = self._frames / elapsed
+        self.cpu_percent = 100 * (cpu - self._start_cpu) / elapsed
+        self._frames = 0
+        self._start_time = now
+        self._start_cpu = cpu
+        return True
+
+    def report(self):
+        """
+        Represents a method that returns the latest interval as a short string.
+        """
+        return "%.1f fps, %.1f%% cpu" % (self.fps, self.cpu_percent)
+
+    def summary(self):
+        """
+        Represents a method that returns the totals since the stats were created
+        as a short string.
+        """
+        elapsed = time.perf_counter() - self._first_time
+        cpu = time.process_time() - self._first_cpu
+        return "%d frames in %.1f s (%.1f fps), %.2f s cpu (%.1f%%)" % (
+            self.total_frames, elapsed, self.total_frames / elapsed if elapsed else 0.0,
+            cpu, 100 * cpu / elapsed if elapsed else 0.0)
@@ -0,0 +1,68 @@
+# Description: Fixed cell geometry for the Reversi grid. Every cell's center and rectangle
+#               is computed once from the grid dimensions, and a mouse position is mapped
+#               to a (row, col) cell with arithmetic instead of testing every cell rectangle.
+import pygame
+
+
+class BoardGeometry:
+    """
+    Represents the on-screen layout of the grid. Cells are circles of the given
+    radius laid out every (2 * radius + cell_padding) pixels, inside a frame of
+    outer_padding pixels that is centered in the window.
+    """
+
+    def __init__(self, grid_size, radius, cell_padding, outer_padding, window_width, window_height):
+        """
+        Represents an init method that takes the grid dimensions from Reversi and
+        builds the table of cell centers and rectangles.
+        """
+        self.grid_size = grid_size
+        self.radius = radius
+        self.cell_padding = cell_padding
+        self.outer_padding = outer_padding
+
+        # Calculate the total grid size with padding
+        self.pitch = 2 * radius + cell_padding
+        self.total_grid_size = grid_size * self.pitch - cell_padding
+        self.total_size = self.total_grid_size + 2 * outer_padding
+        self.start_x = (window_width - self.total_size) // 2
+        self.start_y = (window_height - self.total_size) // 2
+
+        # top-left corner of cell (0, 0)
+        self.origin_x = self.start_x + outer_padding
+        self.origin_y = self.start_y + outer_padding
+
+        self.centers = {}
+        self.rects = {}
+        for row in range(grid_size):
+            for col in range(grid_size):
+                center_x = self.origin_x + radius + col * self.pitch
+                center_y = self.origin_y + radius + row * self.pitch
+                self.centers[(row, col)] = (center_x, center_y)
+                self.rects[(row, col)] = pygame.Rect(center_x - radius, center_y - radius, 2 * radius, 2 * radius)
+
+    def board_rect(self):
+        """
+        Represents a method that returns the (x, y, width, height) of the rounded
+        frame drawn behind the cells.
+        """
+        return self.start_x, self.start_y, self.total_size, self.total_size
+
+    def cell_at(self, pos):
+        """
+        Represents a method that takes an (x, y) pixel position and returns the
+        (row, col) of the cell rectangle containing it, or None if the position
+        falls outside the grid or in the padding between cells.
+        """
+        x = pos[0] - self.origin_x
+        y = pos[1] - self.origin_y
+        if x < 0 or y < 0:
+            return None
+
+        col, offset_x = divmod(x, self.pitch)
+        row, offset_y = divmod(y, self.pitch)
+        size = 2 * self.radius
+        if row >= self.grid_size or col >= self.grid_size or offset_x >= size or offset_y >= size:
+            return None
+
+        return row, col
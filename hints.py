@@ -0,0 +1,308 @@
+# Description: Hint maps for the Reversi board: the moves open to each side, frontier discs
+#               (discs next to an empty square), stable discs (discs that can never be flipped)
+#               and a score for every legal move, kept up to date one engine.Move at a time.
+#               A disc that is stable stays stable for the rest of the game, so a move only
+#               has to look at the discs it placed and flipped, never at the whole board.
+from functools import lru_cache
+
+from engine import BLACK, Position, popcount, squares
+
+# the four lines through a square, as (row step, column step)
+AXES = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def line_tables(variant):
+    """
+    Represents a function that returns the square tables of a board variant, built
+    once per variant:
+
+    neighbours -- for each square, the bitboard of the squares around it.
+    steps -- for each square, a (before, after) pair per axis with the squares on
+        either side of it along that axis, or -1 past the edge of the board.
+    lines -- for each square, the bitboard of the whole line through it per axis.
+    """
+    size = variant.size
+    neighbours = []
+    steps = []
+    lines = []
+    for square in range(variant.cells):
+        row, col = divmod(square, size)
+        around = 0
+        square_steps = []
+        square_lines = []
+        for row_step, col_step in AXES:
+            pair = []
+            line = 1 << square
+            for sign in (-1, 1):
+                r, c = row + sign * row_step, col + sign * col_step
+                pair.append(r * size + c if 0 <= r < size and 0 <= c < size else -1)
+                while 0 <= r < size and 0 <= c < size:
+                    line |= 1 << (r * size + c)
+                    r, c = r + sign * row_step, c + sign * col_step
+            for neighbour in pair:
+                if neighbour >= 0:
+                    around |= 1 << neighbour
+            square_steps.append(tuple(pair))
+            square_lines.append(line)
+        neighbours.append(around)
+        steps.append(tuple(square_steps))
+        lines.append(tuple(square_lines))
+    return tuple(neighbours), tuple(steps), tuple(lines)
+
+
+class HintMaps:
+    """
+    Represents the hint maps of a position, updated move by move with play and
+    take_back.
+
+    A disc counts as stable when, along each of the four lines through it, the
+    line is full or the disc is next to the edge or to a stable disc of its own
+    color. This finds most stable discs (it misses some that are only safe for
+    more subtle reasons) and never marks a disc that can be flipped. Full lines
+    stay full and stable discs keep their color, so the stable discs of the last
+    position are still stable after a move; play checks only the placed and
+    flipped discs, the squares of lines the move filled and, each time a disc
+    turns out stable, its neighbours of the same color. take_back restores the
+    stable discs from a stack.
+
+    Frontier discs change only around the square that was filled or emptied. The
+    moves of each side and the move scores are worked out from the bitboards the
+    first time they are asked for after a move, and kept until the next one.
+    """
+
+    def __init__(self, position=None, evaluate=None):
+        """
+        Represents an init method that takes the engine.Position to start from (the
+        starting position if not given) and the evaluation function that scores
+        moves for the heatmap (by default ai.make_evaluate for the board).
+        """
+        position = position or Position()
+        self.variant = position.variant
+        self.black = position.black
+        self.white = position.white
+        self.version = 0  # counts the changes, for callers that cache what they draw
+        self._evaluate = evaluate
+        self._neighbours, self._steps, self._lines = line_tables(self.variant)
+
+        occupied = self.black | self.white
+        empty = self.variant.full & ~occupied
+        self.full_lines = [0] * len(AXES)  # per axis, the squares whose line along it is full
+        self.frontier_discs = 0
+        for square in squares(occupied):
+            for axis, line in enumerate(self._lines[square]):
+                if not line & empty:
+                    self.full_lines[axis] |= 1 << square
+            if self._neighbours[square] & empty:
+                self.frontier_discs |= 1 << square
+
+        self.stable_discs = 0
+        self._stable_history = []
+        self._grow_stable(squares(occupied))
+        self._mobility = {}
+        self._heatmaps = {}
+
+    def _grow_stable(self, candidates):
+        """
+        Represents a method that adds to the stable discs every candidate square
+        that has become stable, and then their neighbours of the same color that
+        have become stable through them, and so on.
+        """
+        black, white = self.black, self.white
+        stable = self.stable_discs
+        full_lines = self.full_lines
+        neighbours = self._neighbours
+        all_steps = self._steps
+
+        work = list(candidates)
+        while work:
+            square = work.pop()
+            bit = 1 << square
+            if stable & bit:
+                continue
+            own = black if black & bit else white if white & bit else 0
+            if not own:
+                continue
+
+            own_stable = own & stable
+            for axis, (before, after) in enumerate(all_steps[square]):
+                if full_lines[axis] & bit or before < 0 or after < 0:
+                    continue
+                if own_stable >> before & 1 or own_stable >> after & 1:
+                    continue
+                break
+            else:
+                stable |= bit
+                work.extend(squares(neighbours[square] & own & ~stable))
+
+        self.stable_discs = stable
+
+    def _update_frontier(self, square):
+        """
+        Represents a method that rechecks the frontier discs at square and around
+        it, after square was filled or emptied.
+        """
+        occupied = self.black | self.white
+        empty = self.variant.full & ~occupied
+        frontier = self.frontier_discs
+        for checked in [square, *squares(self._neighbours[square] & occupied)]:
+            bit = 1 << checked
+            if occupied & bit and self._neighbours[checked] & empty:
+                frontier |= bit
+            else:
+                frontier &= ~bit
+        self.frontier_discs = frontier
+
+    def play(self, move):
+        """
+        Represents a method that updates the maps for an engine.Move. A pass
+        changes nothing.
+        """
+        if move.square is None:
+            return
+        square = move.square
+        bit = 1 << square
+        if move.color == BLACK:
+            self.black |= bit | move.flips
+            self.white &= ~move.flips
+        else:
+            self.white |= bit | move.flips
+            self.black &= ~move.flips
+
+        # the lines through the new disc may have just filled up
+        candidates = [square, *squares(move.flips)]
+        empty = self.variant.full & ~(self.black | self.white)
+        for axis, line in enumerate(self._lines[square]):
+            if not line & empty:
+                self.full_lines[axis] |= line
+                candidates.extend(squares(line))
+
+        self._stable_history.append(self.stable_discs)
+        self._grow_stable(candidates)
+        self._update_frontier(square)
+        self._changed()
+
+    def take_back(self, move):
+        """
+        Represents a method that undoes play for the same engine.Move, which must be
+        the last one played.
+        """
+        if move.square is None:
+            return
+        square = move.square
+        bit = 1 << square
+        if move.color == BLACK:
+            self.black &= ~(bit | move.flips)
+            self.white |= move.flips
+        else:
+            self.white &= ~(bit | move.flips)
+            self.black |= move.flips
+
+        # none of the lines through the emptied square is full any more
+        for axis, line in enumerate(self._lines[square]):
+            self.full_lines[axis] &= ~line
+
+        self.stable_discs = self._stable_history.pop()
+        self._update_frontier(square)
+        self._changed()
+
+    def _changed(self):
+        """
+        Represents a method that drops the maps worked out for the last position.
+        """
+        self.version += 1
+        self._mobility = {}
+        self._heatmaps = {}
+
+    def discs(self, color):
+        """
+        Represents a method that returns the bitboard of color's discs ("X" or "O").
+        """
+        return self.black if color == BLACK else self.white
+
+    def mobility(self, color):
+        """
+        Represents a method that returns the bitboard of the squares color could
+        play, whoever is to move.
+        """
+        moves = self._mobility.get(color)
+        if moves is None:
+            own = self.discs(color)
+            opp = self.white if color == BLACK else self.black
+            moves = self._mobility[color] = self.variant.move_mask(own, opp)
+        return moves
+
+    def frontier(self, color=None):
+        """
+        Represents a method that returns the bitboard of the frontier discs, of one
+        color or, by default, of both.
+        """
+        if color is None:
+            return self.frontier_discs
+        return self.frontier_discs & self.discs(color)
+
+    def stable(self, color=None):
+        """
+        Represents a method that returns the bitboard of the stable discs, of one
+        color or, by default, of both.
+        """
+        if color is None:
+            return self.stable_discs
+        return self.stable_discs & self.discs(color)
+
+    def heatmap(self, color):
+        """
+        Represents a method that scores every move color could play by the
+        evaluation of the position it leads to, from color's point of view.
+
+        Returns -- a dictionary from square to score; higher is better.
+        """
+        scores = self._heatmaps.get(color)
+        if scores is None:
+            if self._evaluate is None:
+                from ai import make_evaluate
+                self._evaluate = make_evaluate(self.variant)
+            evaluate = self._evaluate
+            flip_mask = self.variant.flip_mask
+            own = self.discs(color)
+            opp = self.white if color == BLACK else self.black
+            scores = {}
+            for square in squares(self.mobility(color)):
+                flips = flip_mask(own, opp, square)
+                scores[square] = -evaluate(opp & ~flips, own | flips | (1 << square))
+            self._heatmaps[color] = scores
+        return scores
+
+    def counts(self, color):
+        """
+        Represents a method that returns a summary for color: its number of moves,
+        frontier discs and stable discs.
+        """
+        return popcount(self.mobility(color)), popcount(self.frontier(color)), popcount(self.stable(color))
+
+
+def stable_discs(position):
+    """
+    Represents a function that finds the stable discs of a position from scratch,
+    by the same rule as HintMaps, by marking discs until nothing changes.
+    """
+    neighbours, steps, lines = line_tables(position.variant)
+    occupied = position.black | position.white
+    empty = position.variant.full & ~occupied
+    stable = 0
+    changed = True
+    while changed:
+        changed = False
+        for square in squares(occupied & ~stable):
+            own = position.black if position.black >> square & 1 else position.white
+            for axis, (before, after) in enumerate(steps[square]):
+                if not lines[square][axis] & empty or before < 0 or after < 0:
+                    continue
+                if (own & stable) >> before & 1 or (own & stable) >> after & 1:
+                    continue
+                break
+            else:
+                stable |= 1 << square
+                changed = True
+    return stable
+
@@ -0,0 +1,119 @@
+# Description: Load generator for server.py. Opens many client connections at once, pairs them
+#               into games that play random legal moves as fast as the server answers, and
+#               reports games per second, moves per second and move round-trip latency.
+#
+# Example:      python server.py --port 8765 &
+#               python loadgen.py --port 8765 --games 2000 --concurrency 1000
+import argparse
+import asyncio
+import random
+import time
+
+from engine import squares
+from profiler import percentile
+from server import GameServer, encode_message, read_message
+
+
+class LoadStats:
+    """
+    Represents the totals collected by the bots: games finished, moves sent,
+    errors and the round-trip time of each move in seconds.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.errors = 0
+        self.latencies = []
+
+
+async def bot(host, port, stats, rng, games):
+    """
+    Represents a coroutine for one client that plays random legal moves in games
+    games, one after another, on a single connection.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for game in range(games):
+            writer.write(encode_message({"type": "join"}))
+            color = None
+            sent_at = None
+            while True:
+                message = await read_message(reader)
+                kind = message["type"]
+                if kind == "joined":
+                    color = message["color"]
+                elif kind == "state":
+                    if sent_at is not None and message["mover"] == color:
+                        stats.latencies.append(time.perf_counter() - sent_at)
+                        sent_at = None
+                    if message["turn"] == color and message["moves"]:
+                        square = rng.choice(list(squares(message["moves"])))
+                        sent_at = time.perf_counter()
+                        writer.write(encode_message({"type": "move", "square": square}))
+                        stats.moves += 1
+                elif kind == "over":
+                    if "reason" not in message and color == "X":
+                        stats.games += 1  # count each game once, from black's side
+                    break
+                elif kind == "error":
+                    stats.errors += 1
+                    return
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run(args):
+    """
+    Represents the coroutine run by main. Starts a server in this process when
+    no port is given.
+    """
+    server = None
+    port = args.port
+    if port is None:
+        server = GameServer(args.host, 0, max_games=args.concurrency)
+        await server.start()
+        port = server.port
+        print("started an in-process server on port %d" % port)
+
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    bots = args.concurrency * 2  # two clients per game
+    games_per_bot = max(1, args.games // args.concurrency)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bot(args.host, port, stats, random.Random(rng.random()), games_per_bot)
+                                     for index in range(bots)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    latencies = [1000 * latency for latency in stats.latencies]
+    print("%d games on %d connections (%d at once) in %.1f s" % (stats.games, bots, args.concurrency, elapsed))
+    print("  %.1f games/s, %.0f moves/s" % (stats.games / elapsed, stats.moves / elapsed))
+    print("  move round trip ms: p50 %.2f  p95 %.2f  p99 %.2f" % (
+        percentile(latencies, 0.5), percentile(latencies, 0.95), percentile(latencies, 0.99)))
+    if stats.errors or failures:
+        print("  %d server errors, %d failed connections%s" % (
+            stats.errors, len(failures), " (first: %r)" % failures[0] if failures else ""))
+
+    if server is not None:
+        server.close()
+
+
+def main():
+    """
+    Represents the command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Put load on a Reversi game server.")
+    parser.add_argument("--host", default="127.0.0.1", help="server address (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="server port; if omitted a server is started in this process")
+    parser.add_argument("--games", type=int, default=2000, help="total games to play (default 2000)")
+    parser.add_argument("--concurrency", type=int, default=500, help="games in progress at once (default 500)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
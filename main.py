@@ -3,44 +3,51 @@
 # Date: 6/21/2023
 # Description: Create a program that mimics the Reversi game (text-based Reversi) using
 #               several classes and several methods to recreate two players playing the game.
+import argparse
+import os
 import sys
-import pygame
-
-
-class Player:
+import time
+
+import engine
+from eventlog import EventLog, level_number
+from framestats import FrameStats
+from hints import HintMaps
+from player import Player
+from profiler import FrameProfiler
+from thinker import Thinker
+
+# how often, in milliseconds, the idle loop wakes up to show a thinking computer player's progress
+THINKING_POLL_MS = 100
+
+# the hint overlays that the H key steps through, with the message shown for each
+HINT_OVERLAYS = (
+    (None, "Hints off."),
+    ("heatmap", "Hints: moves shaded from weak (red) to strong (green)."),
+    ("discs", "Hints: stable discs dotted, frontier discs ringed."),
+    ("mobility", "Hints: the other player's moves ringed."),
+)
+HEATMAP_LEVELS = 5
+
+# pygame and the modules that draw with it are only imported once a Reversi window
+# is created (see load_pygame), so the game logic can be imported without SDL
+pygame = None
+
+
+def load_pygame(headless=False):
     """
-    Represents a Player class that is an implementation of the player name
-    and the player’s color piece. This class will be used in coordination with the
-    Reversi class.
+    Represents a function that imports pygame on first use and returns it. With
+    headless=True, SDL's dummy video and audio drivers are selected first, so
+    the game runs without a display.
     """
-
-    def __init__(self, player, color):
-        """
-        Represents an init method or a constructor that initializes private data members
-        player name and the color of the pieces. The player’s name along with the player’s
-        color piece are initialized as private data members.
-        """
-        self._player = player
-        self._color = color
-
-    def get_player(self):
-        """
-        Represents a get method that takes no parameters and is used in
-        conjunction with the Othello class to retrieve the current player name.
-
-        Returns – current value of the player name
-        """
-        return self._player
-
-    def get_color(self):
-        """
-        Represents a get method that takes no parameters and is used in
-        conjunction with the Othello class to retrieve the current player color
-        piece.
-
-        Returns – current value of the color
-        """
-        return self._color
+    global pygame
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    if pygame is None:
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        import pygame as pygame_module
+        pygame = pygame_module
+    return pygame
 
 
 class Reversi:
@@ -54,14 +61,32 @@ class Reversi:
     The game ends when no capturing move can be made on the board and the winner is
     the player that has the most pieces on the board.
     """
-    def __init__(self):
+    def __init__(self, player1=None, player2=None, headless=False, board_size=8, events=None):
         """
-        Represents an init method or a constructor that takes no parameters
-        and initializes all assets for a functional Reversi game. 
+        Represents an init method or a constructor that initializes all assets
+        for a functional Reversi game.
 
         This includes the pygame window, buttons, grid, colors, state of players,
-        flags, and player counts.
+        flags, and player counts. player1 (purple) and player2 (rose) default to
+        human players, and either can be a computer player such as ai.AlphaBetaPlayer;
+        players that search are asked for their moves on a background thread.
+        With headless=True the window is drawn with SDL's dummy driver and never shown.
+        board_size is the number of rows and columns of playable cells, any even
+        number from 4 up; the cells are sized to fit the window. Moves, passes,
+        invalid moves and the end of the game are recorded in events (an
+        eventlog.EventLog, by default an in-memory one at the INFO level).
+
+        self.hints (a hints.HintMaps) holds both sides' moves, the frontier and
+        stable discs and a score for each move, updated with every move, and the
+        H key draws them over the board.
         """
+        self.variant = engine.variant(board_size)
+        self.events = events or EventLog()
+        load_pygame(headless)
+        from assets import AssetManager
+        from geometry import BoardGeometry
+        from renderer import BoardRenderer
+
         pygame.init()
 
         self.window_width = 900
@@ -77,31 +102,38 @@ class Reversi:
         self.purple = (216, 219, 255)  # DBDBFFh
         self.beige = (255, 246, 239)  # FFF6EFh
         self.rose = (255, 217, 228)  # ebd3cb
+        self.weak_move = (240, 160, 160)  # heatmap colors for the worst and best moves
+        self.strong_move = (150, 215, 165)
+        self.hint_mark = (150, 150, 150)
         self.grid_color = (245, 231, 221)  # Color of the grid cells
         self.background_color = (245, 231, 221)  # Background color
         self.button_color = self.purple  # Color of the buttons
 
-        # Grid dimensions
-        self.grid_size = 10
-        self.cell_size = 55
-        self.padding = 10  # Decreased padding value of grid cells
-        self.radius = (self.cell_size - 2 * self.padding) // 2
-        self.cell_padding = 8
+        # Grid dimensions: the playable cells plus the boundary ring, fitted into the
+        # same share of the window whatever the board size (42 pixels a cell at 8x8)
+        self.grid_size = board_size + 2
+        board_pixels = min(self.window_width, self.window_height) * 420 // 900
+        self.cell_size = board_pixels // self.grid_size
+        self.cell_padding = max(1, self.cell_size * 8 // 42)
+        self.radius = (self.cell_size - self.cell_padding) // 2
         self.outer_padding = 20
         self.corner_radius = 20
 
+        # Cell centers and rectangles are fixed for the whole game, so compute them once
+        self.geometry = BoardGeometry(self.grid_size, self.radius, self.cell_padding, self.outer_padding,
+                                      self.window_width, self.window_height)
+
         # Set cell state
-        self.cell_rect = None
-        self.cells = []
         self.cell_clicked = False
         self.clicked_cell = None
+        self.hover_cell = None
         self.clicked_list = []
         self.piece_position = (0, 0)
         self.flipped = False
 
         # Initialize players
-        self.player1 = Player("purple", "purple")  # X
-        self.player2 = Player("rose", "rose")  # O
+        self.player1 = player1 or Player("purple", "purple")  # X
+        self.player2 = player2 or Player("rose", "rose")  # O
         self.current_player = self.player1
         self.player1_positions = True
         self.player2_positions = True
@@ -109,33 +141,63 @@ class Reversi:
         self.player2_count = 0
         self.grid_updated = False
 
-        # Initialize the board
-        self._board = []
+        # Initialize the board. The bitboard position is the source of truth for the
+        # rules and self._board mirrors it for drawing
+        self.position = engine.Position(variant=self.variant)
+        self._board = self.position.to_board()
+
+        # Hint maps follow the position move by move; the overlay drawn from them is
+        # rebuilt only when they, the turn or the overlay shown change
+        self.hints = HintMaps(self.position)
+        self.hint_overlay_index = 0
+        self._hint_overlay = (None, {})
+        self._overlay_surfaces = {}
+
+        # Every move played, so it can be taken back with Ctrl+Z and redone with Ctrl+Y
+        self.history = engine.MoveHistory(self.variant)
         self.check_both_player_positions = 0
+        self.game_over = False
 
-        for row in range(10):
-            this_list = []
-            for column in range(10):
-                if row != 0 and row != 9 and column != 0 and column != 9:
-                    this_list.append(".")
-                else:
-                    this_list.append("*")
-            self._board.append(this_list)
+        # Computer players that search think on the thinker's thread and their moves are
+        # picked up by play_game; Escape pauses them and Space makes them move at once
+        self.thinker = Thinker(notify=self.wake_up)
+        self.computer_paused = False
 
-        self._board[4][5] = "X"
-        self._board[5][5] = "O"
-        self._board[5][4] = "X"
-        self._board[4][4] = "O"
+        # Legal moves for the current position, keyed by piece. Each entry maps a
+        # (row, col) move to the bitboard of discs it flips and is only rebuilt
+        # after make_move or switch_players clears the cache
+        self._legal_moves = {}
 
         # Message handling
         self.out_of_bounds_error = False
         self.message = "Welcome to Othello!"
 
         # Load the cursor images
-        pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
         self.window = pygame.display.set_mode((self.window_width, self.window_height))
+        self.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
         pygame.display.set_caption("o t h e l l o")
 
+        # Load fonts and images once, now that the display exists to convert them for
+        self.assets = AssetManager()
+        self.assets.preload()
+
+        # Only redraw what changed on the grid screen, and track which screen is on
+        # the window so the intro and help screens are drawn once per visit
+        self.renderer = BoardRenderer(self)
+        self.drawn_state = None
+        self.frame_stats = None
+
+        # Phases timed while profiling is switched on with F3; F4 exports the histograms
+        self.profiler = FrameProfiler()
+        self.profiler.watch(self, "handle_event", "draw_frame", "draw_grid", "play_game", "display_board",
+                            "draw_cell", "handle_cell_interactions", "return_available_positions",
+                            "legal_moves", "flip_piece", "count_grid", "choose_computer_move",
+                            "draw_turn_indicator", "draw_message", "draw_counts", "hint_overlay")
+        self.profiler.watch(self.renderer, "draw", "draw_region", prefix="renderer.")
+        self.profile_overlay_rect = pygame.Rect(self.window_width - 350, 10, 340, 150)
+        self.profile_path = "frame_profile"
+        self._overlay_drawn = 0.0
+
     def draw_intro(self):
         """
         Represents.....
@@ -153,8 +215,7 @@ class Reversi:
         intro_start_button_rect = pygame.Rect(self.window_width // 2 - 25, self.window_height // 2 + 100, 50, 50)
         pygame.draw.rect(self.window, self.button_color, intro_start_button_rect, border_radius=16)
 
-        intro_start_button_image = pygame.image.load("images/right-arrow.png")
-        intro_start_button_image = pygame.transform.scale(intro_start_button_image, (30, 30))
+        intro_start_button_image = self.assets.image("images/right-arrow.png", (30, 30))
 
         intro_start_button_x = intro_start_button_rect.x + intro_start_button_rect.width // 2 - intro_start_button_image.get_width() // 2
         intro_start_button_y = intro_start_button_rect.y + intro_start_button_rect.height // 2 - intro_start_button_image.get_height() // 2
@@ -165,7 +226,24 @@ class Reversi:
 
     def draw_grid(self):
         """
-        Represents a method that draws initializes state of the entire board.
+        Represents a method that updates the state of the board and redraws the
+        parts of the grid screen that changed since the last frame.
+
+        Returns -- the list of rectangles that were updated on the display.
+        """
+        # Coming back from another screen means nothing on the window can be reused
+        if self.drawn_state != "grid":
+            self.renderer.mark_all()
+
+        available_positions = self.play_game()
+        return self.renderer.draw(available_positions, self.hint_overlay())
+
+    def draw_static_grid(self):
+        """
+        Represents a method that draws every part of the grid screen that does not
+        change during a game: the background, buttons, board, empty cells, labels
+        and the boxes behind the message and piece counts. The renderer keeps the
+        result as its static layer.
         """
         self.window.fill(self.background_color)
 
@@ -175,100 +253,114 @@ class Reversi:
         # Draw the help button
         grid_help_button_rect = pygame.Rect(self.window_width // 2 - 25, self.window_height // 2 + 250, 40, 40)
         pygame.draw.rect(self.window, self.button_color, grid_help_button_rect, border_radius=16)
-        grid_help_button_image = pygame.image.load("images/help.png")
-        grid_help_button_image = pygame.transform.scale(grid_help_button_image, (20, 20))
+        grid_help_button_image = self.assets.image("images/help.png", (20, 20))
         grid_help_button_x = grid_help_button_rect.x + grid_help_button_rect.width // 2 - grid_help_button_image.get_width() // 2
         grid_help_button_y = grid_help_button_rect.y + grid_help_button_rect.height // 2 - grid_help_button_image.get_height() // 2
         self.window.blit(grid_help_button_image, (grid_help_button_x, grid_help_button_y))
 
-        # Text
-        metropolis_font = "fonts/Metropolis-Medium.otf"  # Replace with the actual path to your font file
-        font = pygame.font.Font(metropolis_font, 25)  # Customize the font and size
-
-        # Draw the player's turns (TOP IMAGE)
-        if self.current_player == self.player1:
-            text = font.render("player 1", True, (255, 255, 255))  # Customize the text and color
-            text_rect = text.get_rect(center=(self.window_width // 2, 180))  # Customize the position of the text
-            self.window.blit(text, text_rect)
-
-            # Create a circle on top of the text
-            circle_radius = 25
-            circle_center = (text_rect.centerx, text_rect.centery - 50)  # Customize the position of the circle
-            pygame.draw.circle(self.window, self.purple, circle_center, circle_radius)
-
-        else:
-            text = font.render("player 2", True, (255, 255, 255))  # Customize the text and color
-            text_rect = text.get_rect(center=(self.window_width // 2, 180))  # Customize the position of the text
-            self.window.blit(text, text_rect)
-
-            # Create a circle on top of the text
-            circle_radius = 25
-            circle_center = (text_rect.centerx, text_rect.centery - 50)  # Customize the position of the circle
-            pygame.draw.circle(self.window, self.rose, circle_center, circle_radius)
-
-        self.play_game()
+        # Draw the board and its empty cells
+        self.display_board()
 
-        # Draw message box and text (bottom)
-        font = pygame.font.Font(metropolis_font, 19)
-        text_surface = font.render(self.message, True, (160, 160, 160))  # Customize the text and color
-        text_rect = text_surface.get_rect()
-        text_rect.center = ((self.window_width - 500) // 2 + 250, self.window_height - 110)
+        # Draw message box (bottom)
         pygame.draw.rect(self.window, self.beige, ((self.window_width - 500) // 2, self.window_height - 140, 500, 60),
                          border_radius=20)
-        self.window.blit(text_surface, text_rect)
 
         # Draw the label and instructions (right of grid)
-        box_width = 150
-        box_height = 200
-        box_x = self.window_width - box_width
-        box_y = (self.window_height - box_height) // 2
+        box_x, box_y = self.label_box_origin()
 
         # player 1 label
-        font = pygame.font.Font(metropolis_font, 15)
-        text_surface = font.render("player 1", True, (255, 255, 255))
+        text_surface = self.assets.text("player 1", 15, (255, 255, 255))
         text_rect = text_surface.get_rect()
         text_rect.center = (box_x + 40, box_y + 49)
-        self.window.blit(text_surface, text_rect)
         pygame.draw.circle(self.window, self.purple, (box_x - 15, box_y + 48), 10)
         self.window.blit(text_surface, text_rect)
 
         # player 2 label
-        font = pygame.font.Font(metropolis_font, 15)
-        text_surface = font.render("player 2", True, (255, 255, 255))
+        text_surface = self.assets.text("player 2", 15, (255, 255, 255))
         text_rect = text_surface.get_rect()
         text_rect.center = (box_x + 40, box_y + 81)
-        self.window.blit(text_surface, text_rect)
         pygame.draw.circle(self.window, self.rose, (box_x - 15, box_y + 80), 10)
         self.window.blit(text_surface, text_rect)
 
         # available positions label
-        font = pygame.font.Font(metropolis_font, 15)
-        text_surface = font.render("moves", True, (255, 255, 255))
+        text_surface = self.assets.text("moves", 15, (255, 255, 255))
         text_rect = text_surface.get_rect()
         text_rect.center = (box_x + 36, box_y + 111)
-        self.window.blit(text_surface, text_rect)
         pygame.draw.circle(self.window, (255, 255, 255), (box_x - 15, box_y + 112), 10)
         self.window.blit(text_surface, text_rect)
 
-        # player 1 COUNT
-        font = pygame.font.Font(metropolis_font, 15)
-        text_surface = font.render(str(self.player1_count), True, (160, 160, 160))
-        text_rect = text_surface.get_rect()
-        text_rect.center = (box_x - 660, box_y + 80)
-        self.window.blit(text_surface, text_rect)
+        # player 1 and player 2 COUNT circles
         pygame.draw.circle(self.window, self.purple, (box_x - 660, box_y + 48), 13)
-        self.window.blit(text_surface, text_rect)
+        pygame.draw.circle(self.window, self.rose, (box_x - 620, box_y + 48), 13)
 
-        # player 2 COUNT
-        font = pygame.font.Font(metropolis_font, 15)
-        text_surface = font.render(str(self.player2_count), True, (160, 160, 160))
+    def label_box_origin(self):
+        """
+        Represents a method that returns the (x, y) anchor that the labels and
+        piece counts beside the grid are positioned from.
+        """
+        box_width = 150
+        box_height = 200
+        return self.window_width - box_width, (self.window_height - box_height) // 2
+
+    def draw_turn_indicator(self):
+        """
+        Represents a method that draws whose turn it is above the grid.
+
+        Returns -- the rectangle covered by the text and circle.
+        """
+        # Draw the player's turns (TOP IMAGE)
+        if self.current_player == self.player1:
+            text = self.assets.text("player 1", 25, (255, 255, 255))  # Customize the text and color
+            circle_color = self.purple
+        else:
+            text = self.assets.text("player 2", 25, (255, 255, 255))  # Customize the text and color
+            circle_color = self.rose
+
+        text_rect = text.get_rect(center=(self.window_width // 2, 180))  # Customize the position of the text
+        self.window.blit(text, text_rect)
+
+        # Create a circle on top of the text
+        circle_radius = 25
+        circle_center = (text_rect.centerx, text_rect.centery - 50)  # Customize the position of the circle
+        circle_rect = pygame.draw.circle(self.window, circle_color, circle_center, circle_radius)
+
+        return text_rect.union(circle_rect)
+
+    def draw_message(self):
+        """
+        Represents a method that draws self.message inside the message box.
+
+        Returns -- the rectangle covered by the text.
+        """
+        text_surface = self.assets.text(self.message, 19, (160, 160, 160))  # Customize the text and color
         text_rect = text_surface.get_rect()
-        text_rect.center = (box_x - 620, box_y + 80)
-        self.window.blit(text_surface, text_rect)
-        pygame.draw.circle(self.window, self.rose, (box_x - 620, box_y + 48), 13)
+        text_rect.center = ((self.window_width - 500) // 2 + 250, self.window_height - 110)
         self.window.blit(text_surface, text_rect)
 
-        pygame.display.flip()
+        return text_rect
+
+    def draw_counts(self):
+        """
+        Represents a method that draws the piece count of each player below their
+        count circles.
+
+        Returns -- the rectangle covered by both counts.
+        """
+        box_x, box_y = self.label_box_origin()
+
+        # player 1 COUNT
+        text_surface = self.assets.text(str(self.player1_count), 15, (160, 160, 160))
+        player1_rect = text_surface.get_rect()
+        player1_rect.center = (box_x - 660, box_y + 80)
+        self.window.blit(text_surface, player1_rect)
+
+        # player 2 COUNT
+        text_surface = self.assets.text(str(self.player2_count), 15, (160, 160, 160))
+        player2_rect = text_surface.get_rect()
+        player2_rect.center = (box_x - 620, box_y + 80)
+        self.window.blit(text_surface, player2_rect)
+
+        return player1_rect.union(player2_rect)
 
     def draw_help(self):
         """
@@ -276,6 +368,7 @@ class Reversi:
         """
         self.window.fill(self.background_color)
         self.back_button()
+        pygame.display.flip()
 
     def switch_players(self, player):
         """
@@ -292,66 +385,211 @@ class Reversi:
         self.clicked_cell = None
         self.cell_clicked = False
         self.grid_updated = False
+        self.invalidate_legal_moves()
 
     def display_board(self):
         """
         Represents a method that takes no parameters and displays the
-        current progress of the board and boundaries. It returns the layout of
-        the board for the Reversi game to be played. Cells are centered based
-        on the window layout of pygame.
+        board frame and boundaries with every cell empty. It is drawn once into
+        the renderer's static layer, and the pieces are drawn over it by draw_cell.
+        Cells are centered based on the window layout of pygame.
         """
-        # Calculate the total grid size with padding
-        total_grid_size = self.grid_size * (2 * self.radius + self.cell_padding) - self.cell_padding
-        total_size = total_grid_size + 2 * self.outer_padding
-        start_x = (self.window_width - total_size) // 2
-        start_y = (self.window_height - total_size) // 2
-
         # Draw the padding around the grid with rounded corners
-        pygame.draw.rect(self.window, self.beige, (start_x, start_y, total_size, total_size), border_radius=self.corner_radius)
-
-        # Initialize the starting pieces of the board based on self._board
-        for row in range(len(self._board)):
-            for col in range(len(self._board[row])):
-                cell_value = self._board[row][col]
-                # Calculate the center point of each grid cell
-                center_x = start_x + self.outer_padding + self.radius + col * (2 * self.radius + self.cell_padding)
-                center_y = start_y + self.outer_padding + self.radius + row * (2 * self.radius + self.cell_padding)
-
-                # Create a rectangle around the grid cell
-                self.cell_rect = pygame.Rect(
-                    center_x - self.radius,
-                    center_y - self.radius,
-                    2 * self.radius,
-                    2 * self.radius
-                )
-                self.cells.append(self.cell_rect)
-
-                # Update the game board state based on cell interactions
-                self.handle_cell_interactions(row, col, self.cell_rect)
-
-                if cell_value == 'O':
-                    pygame.draw.circle(self.window, self.rose, (center_x, center_y), self.radius)
-                elif cell_value == 'X':
-                    pygame.draw.circle(self.window, self.purple, (center_x, center_y), self.radius)
-
-                # !!! ADDING THESE WILL DISABLE THE HOVER COLOR FOR PLAYER1 AND PLAYER2 !!!! #
-                elif cell_value == '.':
-                    pygame.draw.circle(self.window, self.grid_color, (center_x, center_y), self.radius)
-                else:
-                    pygame.draw.circle(self.window, self.beige, (center_x, center_y), self.radius)
+        pygame.draw.rect(self.window, self.beige, self.geometry.board_rect(), border_radius=self.corner_radius)
+
+        for (row, col), center in self.geometry.centers.items():
+            if self._board[row][col] == "*":
+                pygame.draw.circle(self.window, self.beige, center, self.radius)
+            else:
+                pygame.draw.circle(self.window, self.grid_color, center, self.radius)
 
-                    # this kind works but is lowkey brute force
-                    if self.cell_rect.collidepoint(pygame.mouse.get_pos()):
-                        pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+    def draw_cell(self, cell, cell_rect, available, marker=None):
+        """
+        Represents a method that draws the piece in a single cell, or a white circle
+        if the cell is an available position, and then the hint marker for the
+        cell, if any. Empty cells are left as drawn in the static layer.
+        """
+        row, col = cell
+        cell_value = self._board[row][col]
+
+        if cell_value == 'O':
+            pygame.draw.circle(self.window, self.rose, cell_rect.center, self.radius)
+        elif cell_value == 'X':
+            pygame.draw.circle(self.window, self.purple, cell_rect.center, self.radius)
+        elif available:
+            pygame.draw.circle(self.window, (255, 255, 255), cell_rect.center, self.radius)
+
+        if marker is not None:
+            surface = self.overlay_surface(marker)
+            self.window.blit(surface, surface.get_rect(center=cell_rect.center))
+
+    def hint_overlay(self):
+        """
+        Represents a method that returns the hint markers to draw for the overlay
+        chosen with the H key, as a dictionary from (row, col) to marker. The same
+        dictionary is returned until the hint maps or the turn change, so the
+        renderer can tell at once that no cell needs redrawing.
+        """
+        mode = HINT_OVERLAYS[self.hint_overlay_index][0]
+        piece = self.piece_for(self.current_player)
+        key = (mode, self.hints.version, piece, self.game_over)
+        if self._hint_overlay[0] == key:
+            return self._hint_overlay[1]
+
+        hints = self.hints
+        cell = self.variant.square_to_cell
+        overlay = {}
+        if mode == "heatmap" and not self.game_over:
+            scores = hints.heatmap(piece)
+            if scores:
+                low, high = min(scores.values()), max(scores.values())
+                for square, score in scores.items():
+                    level = (score - low) * (HEATMAP_LEVELS - 1) // (high - low) if high > low else HEATMAP_LEVELS - 1
+                    overlay[cell(square)] = ("heat", level)
+        elif mode == "discs":
+            for square in engine.squares(hints.frontier()):
+                overlay[cell(square)] = "frontier"
+            for square in engine.squares(hints.stable()):
+                overlay[cell(square)] = "stable"
+        elif mode == "mobility" and not self.game_over:
+            other = engine.WHITE if piece == engine.BLACK else engine.BLACK
+            for square in engine.squares(hints.mobility(other)):
+                overlay[cell(square)] = ("moves", other)
+
+        self._hint_overlay = (key, overlay)
+        return overlay
+
+    def overlay_surface(self, marker):
+        """
+        Represents a method that returns the transparent surface drawn over a cell
+        for a hint marker, drawing it the first time it is needed.
+        """
+        surface = self._overlay_surfaces.get(marker)
+        if surface is None:
+            radius = self.radius
+            surface = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+            center = (radius, radius)
+            if marker == "stable":
+                pygame.draw.circle(surface, self.hint_mark, center, max(2, radius // 3))
+            elif marker == "frontier":
+                pygame.draw.circle(surface, self.hint_mark, center, radius, max(1, radius // 8))
+            elif marker[0] == "heat":
+                share = marker[1] / (HEATMAP_LEVELS - 1)
+                color = [round(weak + (strong - weak) * share) for weak, strong in zip(self.weak_move, self.strong_move)]
+                pygame.draw.circle(surface, color, center, radius)
+            else:
+                color = self.purple if marker[1] == engine.BLACK else self.rose
+                pygame.draw.circle(surface, color, center, radius, max(2, radius // 4))
+            self._overlay_surfaces[marker] = surface
+        return surface
 
     def play_game(self):
-        """Represents a method that plays the game and calls several methods to assist in it."""
-        self.display_board()
-        self.return_available_positions(self.current_player)
+        """
+        Represents a method that plays the game and calls several methods to assist in it.
+
+        Returns -- the available positions of the player whose turn it now is.
+        """
+        # A remote player can leave or lose its connection at any time, which ends the game
+        for player in (self.player1, self.player2):
+            report = player.report()
+            if report is not None:
+                self.player_reported(player, *report)
+
+        # A computer player picks its move as if it had clicked the cell, and clicks
+        # made during its turn are ignored
+        if self.current_player.is_computer() and not self.game_over and self.legal_moves(self.current_player):
+            self.cell_clicked = False
+            self.choose_computer_move()
+
+        # Update the game board state based on the clicked cell
+        if self.cell_clicked and self.clicked_cell is not None and not self.game_over:
+            row, col = self.clicked_cell
+            self.handle_cell_interactions(row, col)
 
         if self.grid_updated:
             self.switch_players(self.current_player)
 
+        self.count_grid()
+
+        return self.return_available_positions(self.current_player)
+
+    def player_reported(self, player, message, left):
+        """
+        Represents a method that shows a player's report in the message box and,
+        if the player has left, ends the game without waiting for its moves.
+        """
+        self.message = message
+        if left and not self.game_over:
+            self.stop_thinking()
+            self.game_over = True
+            self.cell_clicked = False
+            self.events.warning("player_left", "%s: %s", player.get_color(), message)
+
+    def choose_computer_move(self):
+        """
+        Represents a method that asks the current (computer) player for its move and
+        records it as the clicked cell, so it is played like a human's click.
+
+        A player that thinks in the background is sent a request through the
+        thinker and its move is picked up on a later frame; until then the message
+        box shows how its search is going.
+        """
+        player = self.current_player
+        piece = self.piece_for(player)
+        position = engine.Position(self.position.black, self.position.white, piece, self.variant)
+
+        if not player.thinks_in_background():
+            square = player.choose_move(position)
+        elif self.computer_paused:
+            self.message = "Computer paused. Press space to let it move."
+            return
+        else:
+            if not self.thinker.busy():
+                self.thinker.request(player, position)
+            request = self.thinker.poll()
+            if request is None:
+                self.show_thinking()
+                return
+            square = request.move
+            self.events.debug("think", "%s chose %r in %.2f s%s", player.get_color(), square, request.elapsed,
+                              " (forced)" if request.forced else "")
+
+        if square is not None:
+            self.clicked_cell = self.variant.square_to_cell(square)
+            self.cell_clicked = True
+
+    def show_thinking(self):
+        """
+        Represents a method that puts the depth, nodes and best move so far of the
+        thinking computer player's search into the message box.
+        """
+        number = 1 if self.current_player == self.player1 else 2
+        progress = self.thinker.progress()
+        if progress is None or not progress.depth or progress.move is None:
+            self.message = "Player %d is thinking..." % number
+        else:
+            self.message = "Player %d: depth %d, %s nodes, best %s" % (
+                number, progress.depth, format(progress.nodes, ","), self.variant.square_name(progress.move))
+
+    def stop_thinking(self):
+        """
+        Represents a method that drops any move a computer player is thinking about,
+        for when the board changes or the game is left.
+        """
+        if self.thinker.busy():
+            self.thinker.cancel()
+            self.events.debug("think", "search cancelled")
+
+    def wake_up(self):
+        """
+        Represents a method that other threads call to wake up the main loop, by
+        posting a USEREVENT.
+        """
+        try:
+            pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+        except pygame.error:
+            pass  # the window has already been closed
+
     def return_winner(self):
         """
         Represents a method that takes no parameters and returns the
@@ -361,31 +599,15 @@ class Reversi:
         identified in the board.
         """
         # get the sum of purple and rose counts
-        purple = 0
-        rose = 0
-
-        # traverse through each row
-        for row in self._board:
-
-            # traverse through each index in row
-            for column in row:
-                if column == "X":
-                    purple += 1
-
-                if column == "O":
-                    rose += 1
+        purple, rose = self.position.counts()
 
         if purple > rose:
             self.message = "Game ended. Player 1 wins!"
-            print("Winner is player 1")
-
         elif rose > purple:
             self.message = "Game ended. Player 2 wins!"
-            print("Winner is player 2")
-
         else:
             self.message = "Game ended. It's a tie!"
-            print("It's a tie")
+        self.events.info("game_over", "%s (purple %d, rose %d)", self.message, purple, rose)
 
     def back_button(self):
         """
@@ -395,27 +617,19 @@ class Reversi:
         # Draw the back button
         grid_back_button_rect = pygame.Rect(25, 25, 40, 40)
         pygame.draw.rect(self.window, self.button_color, grid_back_button_rect, border_radius=16)
-        grid_back_button_image = pygame.image.load("images/left-arrow.png")
-        grid_back_button_image = pygame.transform.scale(grid_back_button_image, (20, 20))
+        grid_back_button_image = self.assets.image("images/left-arrow.png", (20, 20))
         grid_back_button_x = grid_back_button_rect.x + grid_back_button_rect.width // 2 - grid_back_button_image.get_width() // 2
         grid_back_button_y = grid_back_button_rect.y + grid_back_button_rect.height // 2 - grid_back_button_image.get_height() // 2
         self.window.blit(grid_back_button_image, (grid_back_button_x, grid_back_button_y))
 
-    def handle_cell_interactions(self, row, col, cell_rect):
+    def handle_cell_interactions(self, row, col):
         """
-        Represents a method that handles cell state between each player in the game.
-        :param row: The row index of the cell.
-        :param col: The column index of the cell.
-        :param cell_rect: The rectangle representing the cell.
+        Represents a method that handles a click on a cell for the player whose turn it is.
+        :param row: The row index of the clicked cell.
+        :param col: The column index of the clicked cell.
         """
-        mouse_pos = pygame.mouse.get_pos()
-        self.count_grid()
-
-        metropolis_font = "fonts/Metropolis-Medium.otf"  # Replace with the actual path to your font file
-        font = pygame.font.Font(metropolis_font, 25)  # Customize the font and size
-
         # handle player1
-        if self.cell_clicked and cell_rect.collidepoint(mouse_pos) and self.current_player == self.player1:
+        if self.current_player == self.player1:
             # check for boundaries
             if self.check_boundaries(self.current_player, (row, col)):
                 self.make_move(self.current_player.get_color(), (row, col))
@@ -427,7 +641,7 @@ class Reversi:
                 return
 
         # handle player2
-        if self.cell_clicked and cell_rect.collidepoint(mouse_pos) and self.current_player == self.player2:
+        elif self.current_player == self.player2:
             if self.check_boundaries(self.current_player, (row, col)):
                 self.make_move(self.current_player.get_color(), (row, col))  # Update the board state
                 self.grid_updated = True
@@ -437,25 +651,6 @@ class Reversi:
                 self.message = "Invalid move. Please try again."
                 return
 
-        # Draw the grid cell with the default color
-        if self._board[row][col] == 'X':
-            pygame.draw.circle(self.window, self.purple, cell_rect.center, self.radius)
-            self.player1_count += 1
-        elif self._board[row][col] == 'O':
-            pygame.draw.circle(self.window, self.rose, cell_rect.center, self.radius)
-        else:
-            pygame.draw.circle(self.window, self.grid_color, cell_rect.center, self.radius)
-
-        # Check if the mouse is hovering over the current cell for player 1
-        if cell_rect.collidepoint(mouse_pos) and self.current_player == self.player1:
-            pygame.draw.circle(self.window, self.purple, cell_rect.center, self.radius)
-            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-
-        # Check if the mouse is hovering over the current cell for player 2
-        elif cell_rect.collidepoint(mouse_pos) and self.current_player == self.player2:
-            pygame.draw.circle(self.window, self.rose, cell_rect.center, self.radius)
-            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-
     def check_boundaries(self, player, check_position):
         """
         Represents......
@@ -470,7 +665,8 @@ class Reversi:
 
             # position out of bounds
             if this_move == "*" or this_move == "O" or this_move == "X":
-                print("Out of bounds. Valid moves for", self.current_player.get_color(), ":", available_positions)
+                self.events.warning("invalid_move", "%s clicked occupied cell %s; valid moves: %s",
+                                    self.current_player.get_color(), check_position, available_positions)
                 self.cell_clicked = False
                 return False
 
@@ -480,7 +676,8 @@ class Reversi:
 
         # piece_position is not in available_positions
         else:
-            print("Unable to capture. Valid moves for", self.current_player.get_color(), ":", available_positions)
+            self.events.warning("invalid_move", "%s clicked %s, which captures nothing; valid moves: %s",
+                                self.current_player.get_color(), check_position, available_positions)
             self.cell_clicked = False
             return False
 
@@ -492,135 +689,37 @@ class Reversi:
         piece and calculates the available spots for a player to travel to for a
         capturing move based on which player it is.
 
-        An additional recursive method called “rec_validate_move” takes in four
-        parameters, the row, column, and x and y directions to validate possible
-        moves to capture within the board’s boundaries.
+        The moves themselves come from the bitboard move generator in engine.py,
+        which returns each capturing position exactly once.
         """
 
-        available_positions = []
-        row_length = len(self._board)
-        column_length = len(self._board[0])
-
-        if player.get_color() == "rose":
-            color_piece = "O"
-            opposing_piece = "X"
-        else:
-            color_piece = "X"
-            opposing_piece = "O"
-
-        # Find the positions of the player's pieces on the board
-        existing_positions = []
-        for row in range(row_length):
-            for column in range(column_length):
-
-                if self._board[row][column] == color_piece:
-                    existing_positions.append((row, column))
-
-        # iterate through the player's positions to calculate available capturing moves
-        def rec_validate_move(this_row, this_column, move_x, move_y):
-            """
-            Represents a recursive function......
-            """
-            # increment move directions to current position
-            x, y = this_row + move_x, this_column + move_y
-
-            # check if next position is within boundary
-            if row_length > x >= 0 and column_length > y >= 0:
-
-                check_position = self._board[x][y]
-
-                # check if move can be captured
-                if check_position == opposing_piece:
-                    capture_position = self._board[x + move_x][y + move_y]
-
-                    if capture_position == ".":
-                        available_positions.append((x + move_x, y + move_y))
-
-                    # check multiple pieces that can be captured
-                    elif capture_position == opposing_piece:
-
-                        # update the position and make a recursive call
-                        check_x, check_y = x + move_x, y + move_y
-
-                        # check that this position is in bounds and has more opponents to capture
-                        while row_length > check_x >= 0 and column_length > check_y >= 0 and \
-                                self._board[check_x][check_y] == opposing_piece:
-
-                            # increment neighboring directions to current position
-                            check_x += move_x
-                            check_y += move_y
+        # the game has already been decided, so there is nothing left to check
+        if self.game_over:
+            return []
 
-                            # check that there is an empty slot on the other side to capture
-                            if row_length > check_x >= 0 and column_length > check_y >= 0 and \
-                                    self._board[check_x][check_y] == ".":
-                                # append validated move into list
-                                validated_x, validated_y = check_x, check_y
-                                available_positions.append((validated_x, validated_y))
-
-                                # increment direction and make recursive call to check again
-                                rec_validate_move(validated_x, validated_y, move_x, move_y)
-
-        # check for capturing moves within current pieces in board
-        for position in existing_positions:
-            row, column = position
-
-            moves = [(0, 1), (0, -1), (-1, 0), (1, 0), (-1, 1), (-1, -1), (1, 1), (1, -1)]
-
-            # call validate_move for each direction (right, left, up, down, diagonal)
-            for x_direction, y_direction in moves:
-                rec_validate_move(row, column, x_direction, y_direction)
+        available_positions = list(self.legal_moves(player))
 
         # skip a turn if no available positions are available for a player
-        if not list(set(available_positions)):
+        if not available_positions:
 
             if player.get_color() == "purple":
-                print("no positions for purple")
                 self.message = "No moves for player 1. Player 2's turn"
                 self.player1_positions = False
 
             if player.get_color() == "rose":
-                print("no positions for rose")
                 self.message = "No moves for player 2. Player 1's turn"
                 self.player2_positions = False
 
             if not self.player1_positions and not self.player2_positions:
-                print("no positions for BOTH players, ending the game.")
+                self.events.debug("pass", "no moves for either player")
+                self.game_over = True
                 self.return_winner()
 
             else:
-                print("only one player has no positions available. switching players.")
+                self.events.info("pass", "%s has no moves and passes", player.get_color())
                 self.switch_players(self.current_player)
 
-            return
-
-        # Calculate the total grid size with padding
-        total_grid_size = self.grid_size * (2 * self.radius + self.cell_padding) - self.cell_padding
-        total_size = total_grid_size + 2 * self.outer_padding
-        start_x = (self.window_width - total_size) // 2
-        start_y = (self.window_height - total_size) // 2
-
-        # Initialize the starting pieces of the board based on self._board
-        for row in range(len(self._board)):
-            for col in range(len(self._board[row])):
-
-                # Draw circles on available positions
-                for position in available_positions:
-                    row, column = position
-
-                    # Calculate the center coordinates of the cell within the grid
-                    center_x = start_x + self.outer_padding + self.radius + column * (
-                                2 * self.radius + self.cell_padding)
-                    center_y = start_y + self.outer_padding + self.radius + row * (2 * self.radius + self.cell_padding)
-
-                    # Create a rectangle around the cell
-                    cell_rect = pygame.Rect(
-                        center_x - self.radius,
-                        center_y - self.radius,
-                        2 * self.radius,
-                        2 * self.radius
-                    )
-
-                    pygame.draw.circle(self.window, (255, 255, 255), cell_rect.center, self.radius)
+            return []
 
         # checks if there are still positions for either player
         if player.get_color() == "purple":
@@ -629,51 +728,62 @@ class Reversi:
         if player.get_color() == "rose":
             self.player2_positions = True
 
-        sort_positions = sorted(available_positions)
+        # squares are generated in row-major order, so the list is already sorted
+        return available_positions
+
+    def legal_moves(self, player):
+        """
+        Represents a method that takes a player and returns a dictionary mapping each
+        of their available (row, col) positions to the bitboard of pieces that move
+        would flip, in row-major order.
+
+        The result is computed once per position and cached until make_move or
+        switch_players changes the board or the turn.
+        """
+        piece = self.piece_for(player)
+
+        if piece not in self._legal_moves:
+            own, opp = self.position.bitboards(piece)
+            moves = {}
+            for square in engine.squares(self.variant.move_mask(own, opp)):
+                moves[self.variant.square_to_cell(square)] = self.variant.flip_mask(own, opp, square)
+            self._legal_moves[piece] = moves
 
-        return sort_positions
+        return self._legal_moves[piece]
+
+    def invalidate_legal_moves(self):
+        """
+        Represents a method that clears the cached legal moves so they are rebuilt
+        the next time they are needed.
+        """
+        self._legal_moves = {}
 
     def flip_piece(self, color, piece_position):
         """
         Represents a method that takes in the position of the player piece
         and will flip the piece at neighboring positions to the player piece and
         updates the progress of the board.
+
+        Returns -- the bitboard of the flipped pieces.
         """
         row, column = piece_position
+        piece = self.piece_for(color)
 
-        if color.get_color() == "rose":
-            player = "O"
-            opponent = "X"
-            player_color = self.rose
-        else:
-            player = "X"
-            opponent = "O"
-            player_color = self.purple
-
-        moves = [(0, 1), (0, -1), (-1, 0), (1, 0), (-1, 1), (-1, -1), (1, 1), (1, -1)]
+        # compute the captured pieces with the bitboard engine and apply them, along
+        # with the placed piece, to the position
+        flips = self._legal_moves.get(piece, {}).get(piece_position)
+        if flips is None:
+            own, opp = self.position.bitboards(piece)
+            flips = self.variant.flip_mask(own, opp, self.variant.cell_to_square(row, column))
+        self.position.apply(piece, self.variant.cell_to_square(row, column), flips)
 
-        for x_direction, y_direction in moves:
+        # mirror the flipped pieces onto the drawing board
+        for square in engine.squares(flips):
+            flip_row, flip_column = self.variant.square_to_cell(square)
+            self._board[flip_row][flip_column] = piece
+            self.renderer.mark_cell(flip_row, flip_column)
 
-            # traverse to neighboring areas with piece_position
-            x, y = row + x_direction, column + y_direction
-
-            flip_pieces = []
-            while self._board[x][y] == opponent:
-                # add captured pieces to the list
-                flip_pieces.append((x, y))
-
-                # iterate while loop to move again to flip multiple pieces
-                x += x_direction
-                y += y_direction
-
-            # if loop ends with a player's piece on other end
-            if self._board[x][y] == player:
-
-                # flip the captured pieces
-                for flip_piece in flip_pieces:
-                    flip_row, flip_column = flip_piece
-                    self._board[flip_row][flip_column] = player
-                    pygame.draw.circle(self.window, player_color, self.cell_rect.center, self.radius)
+        return flips
 
     def make_move(self, color, piece_position):
         """
@@ -690,98 +800,475 @@ class Reversi:
         else:
             player = "O"
 
-        # place current piece onto the board
+        # call this method to flip opposing pieces to player pieces, then place
+        # the current piece onto the board
+        flips = self.flip_piece(self.current_player, (row, col))
         self._board[row][col] = player
+        self.renderer.mark_cell(row, col)
+        self.invalidate_legal_moves()
 
-        # call this method to flip opposing pieces to player pieces
-        self.flip_piece(self.current_player, (row, col))
+        square = self.variant.cell_to_square(row, col)
+        move = engine.Move(player, square, flips)
+        self.history.push(move)
+        self.hints.play(move)
+        self.events.info("move", "%s played %s, flipping %#x", color, piece_position, flips)
+        self.player1.observe_move(player, square)
+        self.player2.observe_move(player, square)
 
         return row, col
 
+    def set_board_move(self, move, undo):
+        """
+        Represents a method that plays a recorded move onto the position and the
+        drawing board again, or takes it back if undo is True. Only the placed and
+        flipped pieces are touched.
+        """
+        row, col = self.variant.square_to_cell(move.square)
+        other = engine.WHITE if move.color == engine.BLACK else engine.BLACK
+
+        if undo:
+            self.hints.take_back(move)
+            self.position.unapply(move.color, move.square, move.flips)
+            self._board[row][col] = engine.EMPTY
+        else:
+            self.hints.play(move)
+            self.position.apply(move.color, move.square, move.flips)
+            self._board[row][col] = move.color
+        self.renderer.mark_cell(row, col)
+
+        flipped_piece = other if undo else move.color
+        for square in engine.squares(move.flips):
+            flip_row, flip_column = self.variant.square_to_cell(square)
+            self._board[flip_row][flip_column] = flipped_piece
+            self.renderer.mark_cell(flip_row, flip_column)
+
+        # whoever moves next gets a fresh look at their moves, and a finished game is open again
+        next_piece = move.color if undo else other
+        self.current_player = self.player1 if next_piece == engine.BLACK else self.player2
+        self.clicked_cell = None
+        self.cell_clicked = False
+        self.grid_updated = False
+        self.game_over = False
+        self.player1_positions = True
+        self.player2_positions = True
+        self.invalidate_legal_moves()
+
+    def takeback_allowed(self):
+        """
+        Represents a method that returns True if both seated players allow moves to
+        be undone and redone.
+        """
+        return self.player1.allows_takeback() and self.player2.allows_takeback()
+
+    def undo_move(self):
+        """
+        Represents a method that takes back the last move. Against a computer player,
+        its replies are taken back too, so the human is to move again.
+
+        Returns -- True if a move was taken back.
+        """
+        if not self.takeback_allowed():
+            self.message = "Moves cannot be taken back in this game."
+            return False
+
+        self.stop_thinking()
+        undone = 0
+        while True:
+            move = self.history.undo()
+            if move is None:
+                break
+            self.set_board_move(move, undo=True)
+            self.events.info("undo", "took back %r", move)
+            undone += 1
+            if not self.current_player.is_computer():
+                break
+
+        self.message = "Move taken back." if undone else "There is no move to take back."
+        return bool(undone)
+
+    def redo_move(self):
+        """
+        Represents a method that plays the last taken back move again, along with
+        any computer replies taken back with it.
+
+        Returns -- True if a move was redone.
+        """
+        if not self.takeback_allowed():
+            self.message = "Moves cannot be taken back in this game."
+            return False
+
+        self.stop_thinking()
+        redone = 0
+        while True:
+            move = self.history.redo()
+            if move is None:
+                break
+            self.set_board_move(move, undo=False)
+            self.events.info("redo", "played %r again", move)
+            redone += 1
+            if not self.current_player.is_computer():
+                break
+
+        self.message = "Move played again." if redone else "There is no move to redo."
+        return bool(redone)
+
     def count_grid(self):
         """
         Represents a method.......
         """
         # Initialize counts
-        self.player1_count = 0
-        self.player2_count = 0
-
-        for row in self._board:
-            for column in row:
-                if column == "X":
-                    self.player1_count += 1
+        self.player1_count, self.player2_count = self.position.counts()
 
-                if column == "O":
-                    self.player2_count += 1
+    def piece_for(self, player):
+        """
+        Represents a method that takes a Player and returns the board piece
+        ("X" for purple, "O" for rose) that the player places.
+        """
+        if player.get_color() == "rose":
+            return engine.WHITE
+        return engine.BLACK
 
-    def run(self):
+    def run(self, mode="idle", fps=60, idle_timeout=500, report_interval=None, max_frames=None):
         """
         Represents a method that handles the state of the game Reversi.
-        :return:
+
+        :param mode: "idle" blocks on pygame.event.wait while nothing is changing and
+            only draws a frame when an event or the game state calls for one;
+            "fps" draws a frame on every pass of the loop.
+        :param fps: The highest frame rate to run at, or 0 for no cap.
+        :param idle_timeout: The longest time in milliseconds to block waiting for an
+            event in idle mode.
+        :param report_interval: If given, print the frame rate and CPU usage every
+            this many seconds.
+        :param max_frames: If given, return after drawing this many frames, which
+            is how headless runs finish.
         """
+        clock = pygame.time.Clock()
+        self.frame_stats = FrameStats(report_interval or 1.0)
+        redraw = True
+
+        while True:
+            if mode == "idle" and not redraw:
+                # Sleep until something happens; a timeout returns a NOEVENT event. A
+                # thinking computer player wakes the loop when its move is ready, and
+                # until then the loop wakes up often to show its progress
+                timeout = min(idle_timeout, THINKING_POLL_MS) if self.thinker.busy() else idle_timeout
+                events = [pygame.event.wait(timeout)] + pygame.event.get()
+            else:
+                events = pygame.event.get()
+
+            frame_start = time.perf_counter()
+            for event in events:
+                if self.handle_event(event):
+                    redraw = True
 
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-
-                # Detect any event when clicked
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left mouse button
-                        if self.state == "intro":
-                            if self.intro_start_button.collidepoint(event.pos):
-                                self.state = "grid"
-
-                        elif self.state == "grid":
-                            if self.grid_back_button.collidepoint(event.pos):
-                                self.state = "intro"
-
-                            if self.grid_help_button.collidepoint(event.pos):
-                                self.state = "help"
-
-                            for cell in self.cells:
-                                if cell.collidepoint(event.pos):
-                                    self.cell_clicked = True
-
-                        elif self.state == "help":
-                            if self.grid_back_button.collidepoint(event.pos):
-                                self.state = "grid"
-
-                # Detect any motion for hover state
-                elif event.type == pygame.MOUSEMOTION:
-                    if self.state == "intro":
-                        if self.intro_start_button.collidepoint(event.pos):
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-                        else:
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
-
-                    if self.state == "grid":
-                        if self.grid_back_button.collidepoint(event.pos):
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-                        elif self.grid_help_button.collidepoint(event.pos):
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-                        else:
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
-
-                    if self.state == "help":
-                        if self.grid_back_button.collidepoint(event.pos):
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_HAND)
-                        else:
-                            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+            # play_game polls the thinker for the computer player's move every frame
+            if self.thinker.busy() and self.state == "grid":
+                redraw = True
 
+            drew_frame = False
+            if redraw or mode != "idle":
+                # keep drawing while frames change something, so passes and turn
+                # changes settle before the loop goes back to sleep
+                redraw = self.draw_frame()
+                drew_frame = True
+                self.profiler.end_frame(time.perf_counter() - frame_start)
+
+            if self.profiler.enabled:
+                self.draw_profile_overlay(force=drew_frame and redraw)
+
+            clock.tick(fps)
+            if self.frame_stats.loop(drew_frame) and report_interval:
+                print(self.frame_stats.report())
+
+            if max_frames is not None and self.frame_stats.total_frames >= max_frames:
+                return
+
+    def handle_event(self, event):
+        """
+        Represents a method that responds to a single pygame event.
+
+        Returns -- True if the event changed the screen, the game state or the
+        hovered cell, so a new frame should be drawn.
+        """
+        state = self.state
+        hover_cell = self.hover_cell
+
+        if event.type == pygame.QUIT:
+            if self.frame_stats is not None:
+                print(self.frame_stats.summary())
+            if self.profiler.frames:
+                print("\n".join(self.profiler.report()))
+            self.thinker.close()
+            self.events.close()
+            pygame.quit()
+            sys.exit()
+
+        # Detect any event when clicked
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:  # Left mouse button
+                if self.state == "intro":
+                    if self.intro_start_button.collidepoint(event.pos):
+                        self.state = "grid"
+
+                elif self.state == "grid":
+                    if self.grid_back_button.collidepoint(event.pos):
+                        self.stop_thinking()
+                        self.state = "intro"
+
+                    if self.grid_help_button.collidepoint(event.pos):
+                        self.state = "help"
+
+                    cell = self.geometry.cell_at(event.pos)
+                    if cell is not None:
+                        self.clicked_cell = cell
+                        self.cell_clicked = True
+
+                elif self.state == "help":
+                    if self.grid_back_button.collidepoint(event.pos):
+                        self.state = "grid"
+
+        # Posted by a network client when a message arrives from the server
+        elif event.type == pygame.USEREVENT:
+            return True
+
+        # F3 switches profiling and its overlay on and off, F4 exports the histograms,
+        # Ctrl+Z takes a move back and Ctrl+Y (or Ctrl+Shift+Z) plays it again. Space
+        # makes a thinking computer player move now (or lets a paused one move),
+        # Escape stops it thinking until Space is pressed and H steps through the hints
+        elif event.type == pygame.KEYDOWN:
+            if self.state == "grid" and event.key == pygame.K_SPACE:
+                if self.computer_paused:
+                    self.computer_paused = False
+                    self.message = "Computer resumed."
+                elif self.thinker.busy():
+                    self.thinker.force()
+                    self.events.debug("think", "move forced")
+                return True
+
+            if self.state == "grid" and event.key == pygame.K_h:
+                self.hint_overlay_index = (self.hint_overlay_index + 1) % len(HINT_OVERLAYS)
+                self.message = HINT_OVERLAYS[self.hint_overlay_index][1]
+                return True
+
+            if self.state == "grid" and event.key == pygame.K_ESCAPE and self.current_player.thinks_in_background():
+                self.stop_thinking()
+                self.computer_paused = True
+                return True
+
+            if event.mod & pygame.KMOD_CTRL and self.state == "grid":
+                if event.key == pygame.K_z and not event.mod & pygame.KMOD_SHIFT:
+                    self.undo_move()
+                    return True
+                if event.key == pygame.K_y or event.key == pygame.K_z:
+                    self.redo_move()
+                    return True
+
+            if event.key == pygame.K_F3:
+                if not self.profiler.toggle():
+                    # redraw the whole screen to clear the overlay away
+                    self.drawn_state = None
+                    self.renderer.mark_all()
+                return True
+
+            if event.key == pygame.K_F4 and self.profiler.frames:
+                self.profiler.export(self.profile_path + ".json")
+                self.profiler.export(self.profile_path + ".csv")
+                self.message = "profile saved to %s.json" % self.profile_path
+                return True
+
+        # Detect any motion for hover state
+        elif event.type == pygame.MOUSEMOTION:
             if self.state == "intro":
+                if self.intro_start_button.collidepoint(event.pos):
+                    self.set_cursor(pygame.SYSTEM_CURSOR_HAND)
+                else:
+                    self.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+
+            if self.state == "grid":
+                self.hover_cell = self.geometry.cell_at(event.pos)
+                if self.grid_back_button.collidepoint(event.pos):
+                    self.set_cursor(pygame.SYSTEM_CURSOR_HAND)
+                elif self.grid_help_button.collidepoint(event.pos):
+                    self.set_cursor(pygame.SYSTEM_CURSOR_HAND)
+                elif self.hover_cell is not None and self._board[self.hover_cell[0]][self.hover_cell[1]] != "*":
+                    self.set_cursor(pygame.SYSTEM_CURSOR_HAND)
+                else:
+                    self.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+
+            if self.state == "help":
+                if self.grid_back_button.collidepoint(event.pos):
+                    self.set_cursor(pygame.SYSTEM_CURSOR_HAND)
+                else:
+                    self.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+
+        return self.cell_clicked or state != self.state or hover_cell != self.hover_cell
+
+    def draw_profile_overlay(self, force=False):
+        """
+        Represents a method that draws the profiler's frame rate, frame time
+        percentiles and hot spots in the top right corner, at most four times a
+        second unless force is True (after a frame that may have drawn over it).
+
+        Returns -- the rectangle that was updated, or None if nothing was drawn.
+        """
+        now = time.perf_counter()
+        if not force and now - self._overlay_drawn < 0.25:
+            return None
+        self._overlay_drawn = now
+
+        rect = self.profile_overlay_rect
+        pygame.draw.rect(self.window, (90, 90, 90), rect, border_radius=10)
+
+        # the lines change on every update, so they skip the asset text cache
+        font = self.assets.font(15)
+        y = rect.y + 8
+        for line in self.profiler.report():
+            self.window.blit(font.render(line, True, (255, 255, 255)), (rect.x + 10, y))
+            y += 19
+
+        pygame.display.update(rect)
+        return rect
+
+    def set_cursor(self, cursor):
+        """
+        Represents a method that switches the mouse cursor to one of pygame's system
+        cursors. Drivers without system cursors, such as the SDL dummy driver used
+        for benchmarks, keep whatever cursor they have.
+        """
+        try:
+            pygame.mouse.set_cursor(cursor)
+        except pygame.error:
+            pass
+
+    def draw_frame(self):
+        """
+        Represents a method that draws the current screen.
+
+        Returns -- True if anything on the window changed.
+        """
+        drawn_state = self.drawn_state
+        changed = False
+
+        # The intro and help screens are static, so they are only drawn when shown
+        if self.state == "intro":
+            if drawn_state != "intro":
                 self.draw_intro()
+                changed = True
 
-            elif self.state == "grid":
-                self.draw_grid()
+        elif self.state == "grid":
+            changed = bool(self.draw_grid())
 
-            elif self.state == "help":
+        elif self.state == "help":
+            if drawn_state != "help":
                 self.draw_help()
+                changed = True
 
-            pygame.display.update()
+        self.drawn_state = self.state
+        return changed
 
 
-game = Reversi()
-game.run()
+def main(argv=None):
+    """
+    Represents the command line entry point that opens the game window.
+    """
+    start = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Play Reversi.")
+    parser.add_argument("--headless", action="store_true",
+                        help="draw with SDL's dummy video driver instead of opening a window")
+    parser.add_argument("--state", choices=("intro", "grid", "help"), default="intro",
+                        help="screen to start on (default intro)")
+    parser.add_argument("--frames", type=int, help="quit after drawing this many frames")
+    parser.add_argument("--mode", choices=("idle", "fps"),
+                        help="main loop mode (default idle, or fps when headless so frames keep coming)")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate cap, 0 for none (default 60)")
+    parser.add_argument("--report", type=float, help="print the frame rate and CPU usage every this many seconds")
+    parser.add_argument("--timing", action="store_true", help="print the startup and time-to-first-frame times")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play against someone else over a game server (see server.py)")
+    parser.add_argument("--game", help="with --connect, join the game of this name instead of the next free one")
+    parser.add_argument("--profile", action="store_true",
+                        help="start with the frame profiler and its overlay on (F3 toggles it, F4 exports)")
+    parser.add_argument("--log-level", choices=("debug", "info", "warning", "error"), default="info",
+                        help="lowest level of game events to record (default info)")
+    parser.add_argument("--log-file", help="append game events to this file, written in the background")
+    parser.add_argument("--player1", metavar="SPEC",
+                        help='seat a computer player as player 1, e.g. "alphabeta:time=2" (specs as in arena.py)')
+    parser.add_argument("--player2", metavar="SPEC", help="seat a computer player as player 2")
+    parser.add_argument("--size", type=int, default=8,
+                        help="rows and columns on the board, an even number from 4 up (default 8)")
+    args = parser.parse_args(argv)
+    if args.size < 4 or args.size % 2:
+        parser.error("--size must be an even number of at least 4")
+    if args.connect and args.size != 8:
+        parser.error("games over a server are played on the 8x8 board")
+    if args.connect and (args.player1 or args.player2):
+        parser.error("--player1 and --player2 cannot be used with --connect")
+
+    player1 = player2 = None
+    if args.player1 or args.player2:
+        from arena import make_player, parse_spec
+
+        for spec in (args.player1, args.player2):
+            if not spec:
+                continue
+            try:
+                kind, options = parse_spec(spec)
+            except ValueError as error:
+                parser.error(str(error))
+            # the Monte Carlo search plays out games on the 8x8 bitboards only
+            if kind == "mcts" and args.size != 8:
+                parser.error("mcts players only play on the 8x8 board")
+        player1 = make_player(args.player1, "purple") if args.player1 else None
+        player2 = make_player(args.player2, "rose") if args.player2 else None
+
+    events = EventLog(level_number(args.log_level), path=args.log_file)
+    client = None
+    if args.connect:
+        from client import GameClient, RemotePlayer
+
+        host, _, port = args.connect.rpartition(":")
+        client = GameClient(host or "127.0.0.1", int(port))
+        client.join(args.game)
+        color = client.wait_for("joined")["color"]
+        print("You are player %d; waiting for an opponent..." % (1 if color == engine.BLACK else 2))
+        client.wait_for("start")
+        if color == engine.BLACK:
+            player2 = RemotePlayer("rose", "rose", client, events)
+        else:
+            player1 = RemotePlayer("purple", "purple", client, events)
+
+    game = Reversi(player1, player2, headless=args.headless, board_size=args.size, events=events)
+    game.state = args.state
+    if client is not None:
+        # wake the idle loop whenever the server sends something
+        client.notify = lambda: pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+    if args.profile:
+        game.profiler.enable()
+    created = time.perf_counter()
+
+    if args.timing:
+        game.draw_frame()
+        first_frame = time.perf_counter()
+        print("startup: %.1f ms, first frame: %.1f ms after start" % (
+            1000 * (created - start), 1000 * (first_frame - start)))
+
+    mode = args.mode or ("fps" if args.headless else "idle")
+    game.run(mode, args.fps, report_interval=args.report, max_frames=args.frames)
+    if game.frame_stats is not None and args.frames is not None:
+        print(game.frame_stats.summary())
+        if game.profiler.frames:
+            print("\n".join(game.profiler.report()))
+    game.thinker.close()
+    for player in (player1, player2):
+        close = getattr(player, "close", None)
+        if close is not None:
+            close()
+    if client is not None:
+        client.close()
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
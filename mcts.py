@@ -0,0 +1,382 @@
+# Description: Monte Carlo tree search player for Reversi. The tree is grown with UCT, with an
+#               optional progressive bias from the square weights, and positions are scored by
+#               random playouts on the bitboard engine. The tree is kept between moves, and
+#               several processes can each grow their own tree from the root and pool the results.
+#
+# Example:      python mcts.py --time 2 --workers 4      (reports playouts per second)
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import SQUARE_WEIGHTS
+from engine import Position, move_mask, flip_mask, popcount, square_to_cell, squares
+from player import Player
+
+
+def playout(own, opp, rng):
+    """
+    Represents a function that plays random legal moves from the position (own to
+    move against opp) to the end of the game.
+
+    Returns -- 1 if the player to move wins, 0.5 for a draw and 0 for a loss.
+    """
+    sign = 1
+    passed = False
+    randrange = rng.randrange
+    while True:
+        moves = move_mask(own, opp)
+        if moves:
+            passed = False
+            # drop a random number of low bits, then play the lowest one left
+            for skip in range(randrange(popcount(moves))):
+                moves &= moves - 1
+            square = (moves & -moves).bit_length() - 1
+            flips = flip_mask(own, opp, square)
+            own, opp = opp & ~flips, own | flips | (1 << square)
+        elif passed:
+            break
+        else:
+            passed = True
+            own, opp = opp, own
+        sign = -sign
+
+    difference = sign * (popcount(own) - popcount(opp))
+    return 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+
+
+class Node:
+    """
+    Represents a node of the search tree: the position (own to move against opp),
+    the move that led to it (None for a pass), its parent and children, the moves
+    not expanded yet, and the visits and wins counted for the player who moved
+    into it. prior is the progressive bias term for that move.
+    """
+
+    __slots__ = ("own", "opp", "move", "parent", "children", "untried", "visits", "wins", "prior")
+
+    def __init__(self, own, opp, move=None, parent=None, prior=0.0):
+        self.own = own
+        self.opp = opp
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+        self.prior = prior
+
+        moves = move_mask(own, opp)
+        if moves:
+            # expanded from the end of the list, so the best weighted squares go first
+            self.untried = sorted(squares(moves), key=SQUARE_WEIGHTS.__getitem__)
+        elif move_mask(opp, own):
+            self.untried = [None]  # the only move is a pass
+        else:
+            self.untried = []  # the game is over
+
+    def play(self, move):
+        """
+        Represents a method that returns the (own, opp) bitboards after move (None
+        for a pass), from the point of view of the next player.
+        """
+        if move is None:
+            return self.opp, self.own
+        flips = flip_mask(self.own, self.opp, move)
+        return self.opp & ~flips, self.own | flips | (1 << move)
+
+
+class MCTSResult:
+    """
+    Represents the outcome of a search: the chosen square (or None if there is no
+    legal move), its (row, col) on Reversi's board, the share of playouts through
+    it that the player to move won, the playouts run, the time taken, the
+    playouts per second and the visits and wins of every root move.
+    """
+
+    def __init__(self, move, win_rate, playouts, elapsed, root_stats):
+        self.move = move
+        self.cell = None if move is None else square_to_cell(move)
+        self.win_rate = win_rate
+        self.playouts = playouts
+        self.elapsed = elapsed
+        self.playouts_per_second = playouts / elapsed if elapsed else 0.0
+        self.root_stats = root_stats
+
+    def __repr__(self):
+        return "MCTSResult(move=%r, win_rate=%.3f, playouts=%r, elapsed=%.3f, playouts_per_second=%.0f)" % (
+            self.move, self.win_rate, self.playouts, self.elapsed, self.playouts_per_second)
+
+
+def best_of(root_stats, playouts, elapsed):
+    """
+    Represents a function that builds an MCTSResult from {move: (visits, wins)},
+    choosing the most visited move.
+    """
+    if not root_stats:
+        return MCTSResult(None, 0.0, playouts, elapsed, root_stats)
+    move = max(root_stats, key=lambda square: root_stats[square][0])
+    visits, wins = root_stats[move]
+    return MCTSResult(move, wins / visits if visits else 0.0, playouts, elapsed, root_stats)
+
+
+class MonteCarloSearch:
+    """
+    Represents a UCT search. A child is picked by its win rate plus exploration *
+    sqrt(ln(parent visits) / visits), plus bias * prior / (visits + 1) when
+    progressive bias is on, where prior is the move's square weight / 100. So the
+    bias steers the first visits towards good squares and fades as the playouts
+    come in.
+
+    With reuse on, the subtree for the position reached after both sides move is
+    kept as the root of the next search.
+    """
+
+    def __init__(self, exploration=1.4, bias=0.0, reuse=True, max_nodes=1000000, seed=None):
+        """
+        Represents an init method that takes the UCT exploration constant, the
+        progressive bias weight (0 turns it off), whether to keep the tree between
+        searches, the most nodes to grow and a seed for the playouts.
+        """
+        self.exploration = exploration
+        self.bias = bias
+        self.reuse = reuse
+        self.max_nodes = max_nodes
+        self.rng = random.Random(seed)
+        self.root = None
+        self.nodes = 0
+        self._deadline = 0.0
+
+    def _find_root(self, own, opp):
+        """
+        Represents a method that returns the node for the position from the kept
+        tree (a few plies below the old root, to allow for passes) or a new one.
+        """
+        if self.reuse and self.root is not None:
+            level = [self.root]
+            for ply in range(4):
+                for node in level:
+                    if node.own == own and node.opp == opp:
+                        node.parent = None
+                        # each playout adds at most one node, so this bounds the subtree
+                        self.nodes = node.visits + 1
+                        return node
+                level = [child for node in level for child in node.children]
+
+        self.nodes = 1
+        return Node(own, opp)
+
+    def select(self, node):
+        """
+        Represents a method that returns the child of a fully expanded node with
+        the best UCT score.
+        """
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        bias = self.bias
+        best = None
+        best_score = float("-inf")
+        for child in node.children:
+            visits = child.visits
+            score = child.wins / visits + exploration * math.sqrt(log_visits / visits)
+            if bias:
+                score += bias * child.prior / (visits + 1)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def run_playout(self, root):
+        """
+        Represents a method that runs one selection, expansion, playout and update
+        from root.
+        """
+        node = root
+        while not node.untried and node.children:
+            node = self.select(node)
+
+        if node.untried and self.nodes < self.max_nodes:
+            move = node.untried.pop()
+            own, opp = node.play(move)
+            child = Node(own, opp, move, node, 0.0 if move is None else SQUARE_WEIGHTS[move] / 100)
+            node.children.append(child)
+            self.nodes += 1
+            node = child
+
+        # result for the player to move at node; each node counts wins for the player who moved into it
+        result = playout(node.own, node.opp, self.rng)
+        while node is not None:
+            node.visits += 1
+            node.wins += 1.0 - result
+            result = 1.0 - result
+            node = node.parent
+
+    def search(self, own, opp, time_limit=1.0, playouts=None):
+        """
+        Represents a method that searches the position (own to move against opp)
+        until time_limit seconds have passed or, if given, playouts playouts have
+        run, whichever comes first, and returns an MCTSResult.
+        """
+        start = time.perf_counter()
+        root = self._find_root(own, opp)
+        self.root = root
+
+        if not move_mask(own, opp):
+            return MCTSResult(None, 0.0, 0, time.perf_counter() - start, {})
+
+        self._deadline = start + time_limit
+        count = 0
+        while (playouts is None or count < playouts) and (playouts is not None or time.perf_counter() < self._deadline):
+            self.run_playout(root)
+            count += 1
+            # with a playout budget the clock is still checked, but less often
+            if playouts is not None and not count & 63 and time.perf_counter() >= self._deadline:
+                break
+
+        root_stats = {child.move: (child.visits, child.wins) for child in root.children}
+        return best_of(root_stats, count, time.perf_counter() - start)
+
+    def stop(self):
+        """
+        Represents a method that another thread can call to end the running search,
+        which then returns the most visited move so far.
+        """
+        self._deadline = 0.0
+
+
+# the search object of the current worker process, created by _init_worker
+_worker_search = None
+
+
+def _init_worker(exploration, bias, reuse, max_nodes, seed):
+    """
+    Represents a function that runs once in each worker process and creates the
+    search it keeps between tasks, seeded differently in every process.
+    """
+    global _worker_search
+    _worker_search = MonteCarloSearch(exploration, bias, reuse, max_nodes, None if seed is None else seed + os.getpid())
+
+
+def _search_root(own, opp, time_limit, playouts):
+    """
+    Represents a function that runs in a worker process and returns the root
+    statistics and playout count of one search.
+    """
+    result = _worker_search.search(own, opp, time_limit, playouts)
+    return result.root_stats, result.playouts
+
+
+class MCTSPlayer(Player):
+    """
+    Represents a computer player that picks its moves with Monte Carlo tree
+    search. Reversi can seat it as either player1 or player2.
+
+    With workers above 1, each worker process grows its own tree from the root
+    for the same time (root parallelism) and the visits of each root move are
+    added up before the most visited move is played.
+    """
+
+    def __init__(self, player, color, time_limit=1.0, playouts=None, exploration=1.4, bias=0.0, reuse=True,
+                 workers=1, seed=None):
+        """
+        Represents an init method that takes the player name and color like Player,
+        the time per move in seconds, an optional playout budget per move (per
+        worker), the UCT exploration constant, the progressive bias weight, whether
+        to keep the tree between moves, the number of worker processes and a seed.
+        """
+        super().__init__(player, color)
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.workers = workers
+        self.search = MonteCarloSearch(exploration, bias, reuse, seed=seed)
+        self.last_result = None
+        self._pool = None
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                             initargs=(exploration, bias, reuse, 1000000, seed))
+
+    def is_computer(self):
+        """
+        Represents a method that tells Reversi this player chooses its own moves.
+
+        Returns – True
+        """
+        return True
+
+    def thinks_in_background(self):
+        """
+        Represents a method that tells Reversi to run choose_move off the main
+        thread, since a search takes the whole time budget.
+
+        Returns – True
+        """
+        return True
+
+    def stop_thinking(self):
+        """
+        Represents a method that another thread can call while choose_move runs to
+        make it play the most visited move so far. Worker processes are not
+        stopped, so with workers above 1 the move still comes at the time limit.
+        """
+        self.search.stop()
+
+    def close(self):
+        """
+        Represents a method that shuts down the player's worker processes.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def choose_move(self, position):
+        """
+        Represents a method that takes an engine.Position with this player to move
+        and returns the square to play, or None if there is no legal move.
+        """
+        own, opp = position.bitboards(position.turn)
+        if self._pool is None:
+            self.last_result = self.search.search(own, opp, self.time_limit, self.playouts)
+            return self.last_result.move
+
+        start = time.perf_counter()
+        futures = [self._pool.submit(_search_root, own, opp, self.time_limit, self.playouts)
+                   for worker in range(self.workers)]
+        root_stats = {}
+        total = 0
+        for future in futures:
+            stats, count = future.result()
+            total += count
+            for move, (visits, wins) in stats.items():
+                merged = root_stats.get(move, (0, 0.0))
+                root_stats[move] = (merged[0] + visits, merged[1] + wins)
+
+        self.last_result = best_of(root_stats, total, time.perf_counter() - start)
+        return self.last_result.move
+
+
+def main():
+    """
+    Represents the command line entry point that measures playouts per second
+    from the starting position.
+    """
+    parser = argparse.ArgumentParser(description="Measure Monte Carlo tree search speed on Reversi.")
+    parser.add_argument("--time", type=float, default=2.0, help="seconds to search (default 2)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--exploration", type=float, default=1.4, help="UCT exploration constant (default 1.4)")
+    parser.add_argument("--bias", type=float, default=0.0, help="progressive bias weight (default 0, off)")
+    args = parser.parse_args()
+
+    player = MCTSPlayer("purple", "purple", args.time, exploration=args.exploration, bias=args.bias,
+                        workers=args.workers, seed=1)
+    try:
+        move = player.choose_move(Position())
+    finally:
+        player.close()
+    result = player.last_result
+    print("best move %s after %d playouts in %.2f s: %.0f playouts/s (win rate %.3f)" % (
+        "abcdefgh"[move % 8] + str(move // 8 + 1), result.playouts, result.elapsed,
+        result.playouts_per_second, result.win_rate))
+
+
+if __name__ == "__main__":
+    main()
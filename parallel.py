@@ -0,0 +1,305 @@
+# Description: Multi-core search for Reversi by Lazy SMP. Every worker process runs the whole
+#               iterative deepening search on the same position, each with its own schedule of
+#               depths and order of root moves, and all of them share one transposition table in
+#               shared memory, so each worker starts from what the others have already found.
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import RawArray
+
+from ai import AlphaBetaPlayer, AlphaBetaSearch, SearchResult, ordered_moves
+from engine import STANDARD, popcount
+from transposition import SharedTranspositionTable, TranspositionTable
+
+# the control array holds the stop flag, then (depth, move, score, nodes) per worker
+_STOP = 0
+_FIELDS = 4
+_NO_MOVE = -1
+
+# the depth-skip schedules of the helper workers, as (size, phase): a helper skips
+# the depths d where (d + phase) // size is odd, so that between them the helpers
+# cover the depths around the main worker's in different combinations
+SKIP_SIZES = (1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4)
+SKIP_PHASES = (0, 1, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5, 6, 7)
+
+# the search object and control array of the current worker process, set by _init_worker
+_worker_search = None
+_worker_control = None
+
+
+def _init_worker(max_depth, table_mb, table_name, control):
+    """
+    Represents a function that runs once in each worker process and creates the
+    search the worker reuses for every task, attached to the shared table.
+    """
+    global _worker_search, _worker_control
+    table = SharedTranspositionTable(table_mb, table_name) if table_name else None
+    _worker_search = AlphaBetaSearch(max_depth=max_depth, table=table)
+    _worker_control = control
+
+
+def worker_depths(worker, max_depth):
+    """
+    Represents a function that returns the depths a worker searches: every depth
+    for worker 0, the main worker, and a schedule with gaps for the helpers,
+    which always ends at max_depth.
+    """
+    if worker == 0:
+        return range(1, max_depth + 1)
+    size = SKIP_SIZES[(worker - 1) % len(SKIP_SIZES)]
+    phase = SKIP_PHASES[(worker - 1) % len(SKIP_PHASES)]
+    depths = [depth for depth in range(1, max_depth) if not (depth + phase) // size % 2]
+    return depths + [max_depth]
+
+
+def _report(search, worker, finished):
+    """
+    Represents the thread that runs beside a worker's search. It copies the
+    search's progress into the worker's fields of the control array and stops the
+    search once the stop flag is raised.
+    """
+    control = _worker_control
+    offset = 1 + worker * _FIELDS
+    while True:
+        if control[_STOP]:
+            search.stop()
+        progress = search.progress()
+        control[offset:offset + _FIELDS] = [progress.depth, _NO_MOVE if progress.move is None else progress.move,
+                                            progress.score, progress.nodes]
+        if finished.wait(0.02):
+            return
+
+
+def _search(own, opp, color, worker, deadline):
+    """
+    Represents a function that runs in a worker process and searches the whole
+    position with the worker's depths and its root moves rotated by its number.
+    deadline is a time.time() value, since perf_counter is not shared between
+    processes.
+    """
+    search = _worker_search
+    search.time_limit = deadline - time.time()
+    search.root_shift = worker
+    finished = threading.Event()
+    reporter = threading.Thread(target=_report, args=(search, worker, finished), daemon=True)
+    reporter.start()
+    try:
+        return worker, search.search(own, opp, color, worker_depths(worker, search.max_depth))
+    finally:
+        finished.set()
+        reporter.join()
+
+
+class ParallelSearch:
+    """
+    Represents a search that runs on several worker processes at once by Lazy SMP.
+
+    Every worker searches the whole position with AlphaBetaSearch, so each root
+    move is searched inside the alpha-beta window of the moves before it, and
+    every worker probes and stores in one SharedTranspositionTable. So that they
+    do not all repeat one search, the helpers (every worker but the first) skip
+    depths by their own worker_depths schedule and try the root moves after the
+    best one in their own rotated order. A worker that reaches a position another
+    has already searched takes its score or best move from the table, so the
+    workers spread over the tree and hand each other cutoffs instead of waiting
+    for the slowest root move of a depth. The first worker to finish its last
+    depth stops the others, and the result is that of the deepest completed
+    search, the lowest-numbered worker winning ties.
+
+    Which worker gets where first depends on timing, so with more than one worker
+    results can differ from run to run; with workers=1 the search runs in this
+    process with AlphaBetaSearch itself for reproducible results. Only the 8x8
+    board is searched in parallel.
+
+    progress and stop work from another thread as they do for AlphaBetaSearch;
+    the workers report their progress through a shared array that also carries
+    the stop flag.
+    """
+
+    variant = STANDARD
+
+    def __init__(self, workers=None, time_limit=1.0, max_depth=60, table_mb=16):
+        """
+        Represents an init method that takes the number of worker processes (by
+        default one per CPU), the time budget per search in seconds, the deepest
+        depth to try and the size of the shared transposition table in megabytes.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table_mb = table_mb
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_move = None
+        self.best_score = 0
+        self._start = 0.0
+        self._deadline = 0.0
+        self._pool = None
+        self._table = None
+        self._control = None
+        self._running = False
+        self._serial = None
+
+        if self.workers == 1:
+            table = TranspositionTable(table_mb) if table_mb else None
+            self._serial = AlphaBetaSearch(time_limit, max_depth, table=table)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Represents a method that shuts down the worker processes and frees the
+        shared table, if they were started.
+        """
+        if self._pool is not None:
+            self._control[_STOP] = 1
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+
+    def _get_pool(self):
+        """
+        Represents a method that creates the shared table and starts the worker pool
+        on first use.
+        """
+        if self._pool is None:
+            self._control = RawArray("q", 1 + self.workers * _FIELDS)
+            if self.table_mb:
+                self._table = SharedTranspositionTable(self.table_mb)
+            table_name = self._table.name if self._table is not None else None
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.max_depth, self.table_mb, table_name, self._control))
+        return self._pool
+
+    def _best_report(self):
+        """
+        Represents a method that reads the workers' progress from the control array
+        and returns (depth, move, score, nodes) for the deepest of them, with the
+        nodes of all of them.
+        """
+        control = self._control
+        best = None
+        nodes = 0
+        for worker in range(self.workers):
+            offset = 1 + worker * _FIELDS
+            depth, move, score, worker_nodes = control[offset:offset + _FIELDS]
+            nodes += worker_nodes
+            if move != _NO_MOVE and (best is None or depth > best[0]):
+                best = (depth, move, score)
+        if best is None:
+            return 0, None, 0, nodes
+        return best + (nodes,)
+
+    def search(self, own, opp, color=0):
+        """
+        Represents a method that takes the bitboards of the player to move and the
+        opponent, and the color to move (0 for black, 1 for white), and returns a
+        SearchResult for the best move found.
+        """
+        if self._serial is not None:
+            result = self._serial.search(own, opp, color)
+            self.nodes = result.nodes
+            return result
+
+        start = time.perf_counter()
+        deadline = time.time() + self.time_limit
+        self._start = start
+        self._deadline = deadline
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_move = None
+        self.best_score = 0
+
+        moves = self.variant.move_mask(own, opp)
+        if not moves:
+            return SearchResult(None, 0, 0, 0, time.perf_counter() - start)
+        self.best_move = next(ordered_moves(moves))
+        # a single legal move needs no search
+        if popcount(moves) == 1:
+            return SearchResult(self.best_move, 0, 0, 0, time.perf_counter() - start)
+
+        pool = self._get_pool()
+        control = self._control
+        control[:] = [0] * len(control)
+        self._running = True
+        try:
+            futures = [pool.submit(_search, own, opp, color, worker, deadline) for worker in range(self.workers)]
+
+            # wait in short steps, so that stop is passed on while the workers search;
+            # once one worker has finished, the others are only repeating its work
+            not_done = futures
+            while not_done:
+                if time.time() > self._deadline or len(not_done) < len(futures):
+                    control[_STOP] = 1
+                done, not_done = wait(not_done, timeout=0.1, return_when=FIRST_COMPLETED)
+            results = [future.result() for future in futures]
+        finally:
+            self._running = False
+
+        worker, best = max(results, key=lambda result: (result[1].depth, -result[0]))
+        self.nodes = sum(result.nodes for worker, result in results)
+        self.best_move, self.best_score, self.completed_depth = best.move, best.score, best.depth
+        return SearchResult(best.move, best.score, best.depth, self.nodes, time.perf_counter() - start)
+
+    def progress(self):
+        """
+        Represents a method that returns a SearchResult for the search running now
+        (or the last one), from the deepest depth any worker has completed.
+        """
+        if self._serial is not None:
+            return self._serial.progress()
+        if self._running:
+            depth, move, score, nodes = self._best_report()
+            if move is not None:
+                return SearchResult(move, score, depth, nodes, time.perf_counter() - self._start)
+        return SearchResult(self.best_move, self.best_score, self.completed_depth, self.nodes,
+                            time.perf_counter() - self._start)
+
+    def clear(self):
+        """
+        Represents a method that empties the transposition table, shared or serial,
+        so the next search starts from nothing.
+        """
+        table = self._serial.table if self._serial is not None else self._table
+        if table is not None:
+            table.clear()
+
+    def stop(self):
+        """
+        Represents a method that another thread can call to end the running search,
+        which then returns the best move of the deepest completed depth.
+        """
+        if self._serial is not None:
+            self._serial.stop()
+        self._deadline = 0.0
+
+
+class ParallelAlphaBetaPlayer(AlphaBetaPlayer):
+    """
+    Represents an AlphaBetaPlayer that searches with a ParallelSearch, so it can
+    use every core of the machine. Reversi can seat it as either color.
+    """
+
+    def __init__(self, player, color, time_limit=1.0, max_depth=60, table_mb=16, endgame_empties=10, book=None,
+                 workers=None):
+        """
+        Represents an init method that takes the same arguments as AlphaBetaPlayer,
+        plus the number of worker processes to search with.
+        """
+        super().__init__(player, color, time_limit, max_depth, table_mb=0, endgame_empties=endgame_empties,
+                         book=book)
+        self.parallel = ParallelSearch(workers, time_limit, max_depth, table_mb)
+        self.searcher = self.standard_searcher = self.parallel
+
+    def close(self):
+        """
+        Represents a method that shuts down the player's worker processes.
+        """
+        self.parallel.close()
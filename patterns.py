@@ -0,0 +1,579 @@
+# Description: Pattern-table evaluation for Reversi. The board is read through edge, corner and
+#               diagonal patterns; each pattern's discs form a base-3 index into a table of
+#               weights shared by its symmetric copies, and mobility and parity terms are added
+#               on top. Weights are fitted to self-play results and saved in a compact binary file.
+#
+# Example:      python arena.py alphabeta:depth=3 alphabeta:depth=3 --games 2000 --opening-plies 8
+#               python patterns.py fit arena_results.jsonl patterns.bin
+#               python patterns.py bench --weights patterns.bin      (evaluations per second)
+#               python arena.py alphabeta:weights=patterns.bin alphabeta --games 100
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from operator import getitem
+
+from engine import BLACK, Position, move_mask, popcount, squares
+
+MAGIC = b"OTHPATT1"
+HEADER = struct.Struct(">8sHH")  # magic, number of phases, number of patterns
+
+# Each pattern is given by the (row, col) squares of one copy; its other copies are
+# the images of those squares under the 8 symmetries of the board, in the same order,
+# so that all copies share one table
+PATTERN_SHAPES = (
+    ("edge", ((0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (0, 5), (0, 6), (0, 7))),
+    ("line2", ((1, 0), (1, 1), (1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (1, 7))),
+    ("line3", ((2, 0), (2, 1), (2, 2), (2, 3), (2, 4), (2, 5), (2, 6), (2, 7))),
+    ("line4", ((3, 0), (3, 1), (3, 2), (3, 3), (3, 4), (3, 5), (3, 6), (3, 7))),
+    ("corner3x3", ((0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2))),
+    ("corner2x5", ((0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (1, 0), (1, 1), (1, 2), (1, 3), (1, 4))),
+    ("diag8", tuple((i, i) for i in range(8))),
+    ("diag7", tuple((i, i + 1) for i in range(7))),
+    ("diag6", tuple((i, i + 2) for i in range(6))),
+    ("diag5", tuple((i, i + 3) for i in range(5))),
+    ("diag4", tuple((i, i + 4) for i in range(4))),
+)
+
+
+def symmetries(row, col):
+    """
+    Represents a function that returns the 8 images of a square under the
+    rotations and reflections of the board.
+    """
+    images = []
+    for r, c in ((row, col), (col, row)):
+        images += [(r, c), (r, 7 - c), (7 - r, c), (7 - r, 7 - c)]
+    return images
+
+
+def pattern_copies(shape):
+    """
+    Represents a function that returns the distinct copies of a pattern, as tuples
+    of squares, under the symmetries of the board.
+    """
+    copies = []
+    seen = set()
+    for symmetry in range(8):
+        copy = tuple(r * 8 + c for r, c in (symmetries(row, col)[symmetry] for row, col in shape))
+        if frozenset(copy) not in seen:
+            seen.add(frozenset(copy))
+            copies.append(copy)
+    return copies
+
+
+# (name, number of squares, copies) for every pattern, and the flat list of copies
+# with the pattern each one reads its weights from
+PATTERNS = tuple((name, len(shape), pattern_copies(shape)) for name, shape in PATTERN_SHAPES)
+INSTANCES = tuple((pattern, copy) for pattern, (name, size, copies) in enumerate(PATTERNS) for copy in copies)
+TABLE_SIZES = tuple(3 ** size for name, size, copies in PATTERNS)
+
+# Every copy's index is a 16-bit field of one packed integer (3^10 - 1 fits), so
+# the indexes of all copies are added up at once and read out as an array
+FIELD_BITS = 16
+INDEX_BYTES = FIELD_BITS // 8 * len(INSTANCES)
+
+
+def _square_deltas():
+    """
+    Represents a function that returns, for each square, the packed integer with
+    the base-3 place value of the square in every copy that contains it.
+    """
+    deltas = [0] * 64
+    for instance, (pattern, copy) in enumerate(INSTANCES):
+        for place, square in enumerate(copy):
+            deltas[square] += 3 ** place << (FIELD_BITS * instance)
+    return tuple(deltas)
+
+
+# a disc of the player counted as 1 adds SQUARE_DELTAS[square], one counted as 2 adds twice that
+SQUARE_DELTAS = _square_deltas()
+
+# the packed indexes contributed by the discs of one row, for every byte of that row
+ROW_DELTAS = tuple(
+    tuple(sum(SQUARE_DELTAS[row * 8 + col] for col in range(8) if byte >> col & 1) for byte in range(256))
+    for row in range(8)
+)
+ROW_DELTAS_TWICE = tuple(tuple(2 * delta for delta in deltas) for deltas in ROW_DELTAS)
+
+
+def _swap_table(size):
+    """
+    Represents a function that returns, for each index of a pattern of size squares,
+    the index with the two players' digits (1 and 2) exchanged.
+    """
+    table = [0]
+    place = 1
+    for square in range(size):
+        table = [low + (0, 2, 1)[digit] * place for digit in range(3) for low in table]
+        place *= 3
+    return table
+
+
+def unpack_indexes(packed):
+    """
+    Represents a function that returns the index of every pattern copy held in a
+    packed integer, as an array in INSTANCES order.
+    """
+    indexes = array("H", packed.to_bytes(INDEX_BYTES, "little"))
+    if sys.byteorder == "big":
+        indexes.byteswap()
+    return indexes
+
+
+def pattern_indexes(own, opp):
+    """
+    Represents a function that returns the packed indexes of a position from
+    scratch, counting own's discs as 1 and opp's discs as 2.
+    """
+    packed = 0
+    for own_deltas, opp_deltas, own_byte, opp_byte in zip(ROW_DELTAS, ROW_DELTAS_TWICE, own.to_bytes(8, "little"),
+                                                          opp.to_bytes(8, "little")):
+        packed += own_deltas[own_byte] + opp_deltas[opp_byte]
+    return packed
+
+
+def phase_of(empties, phases):
+    """
+    Represents a function that returns the game phase (0 for the opening up to
+    phases - 1 for the end) for a number of empty squares.
+    """
+    return min(phases - 1, max(0, (60 - empties) * phases // 61))
+
+
+class PatternState:
+    """
+    Represents the pattern indexes of a position kept up to date move by move,
+    counting black's discs as 1 and white's as 2. Playing or taking back a move
+    costs one addition for the placed disc and one per flipped disc, whatever
+    the number of patterns.
+
+    Given the PatternEvaluator it belongs to, it is also the state that
+    ai.AlphaBetaSearch makes and unmakes its moves on (see
+    PatternEvaluator.new_state), and score evaluates the leaves from it.
+    """
+
+    def __init__(self, position=None, evaluator=None):
+        """
+        Represents an init method that takes the engine.Position to start from (the
+        starting position if not given) and the PatternEvaluator that scores it.
+        """
+        position = position or Position()
+        self.packed = pattern_indexes(position.black, position.white)
+        self.evaluator = evaluator
+
+    @staticmethod
+    def _delta(color, square, flips):
+        """
+        Represents a method that returns the change a move makes to the packed
+        indexes, for color 0 (black) or 1 (white).
+        """
+        # a flip turns a 2 into a 1 for black and a 1 into a 2 for white
+        if color == 0:
+            delta = SQUARE_DELTAS[square]
+            for flipped in squares(flips):
+                delta -= SQUARE_DELTAS[flipped]
+        else:
+            delta = 2 * SQUARE_DELTAS[square]
+            for flipped in squares(flips):
+                delta += SQUARE_DELTAS[flipped]
+        return delta
+
+    def make(self, color, square, flips):
+        """
+        Represents a method that updates the indexes for color (0 for black, 1 for
+        white) playing square and flipping the discs in flips.
+        """
+        self.packed += self._delta(color, square, flips)
+
+    def unmake(self, color, square, flips):
+        """
+        Represents a method that undoes make for the same move.
+        """
+        self.packed -= self._delta(color, square, flips)
+
+    def play(self, move):
+        """
+        Represents a method that updates the indexes for an engine.Move.
+        """
+        if move.square is not None:
+            self.make(0 if move.color == BLACK else 1, move.square, move.flips)
+
+    def take_back(self, move):
+        """
+        Represents a method that undoes play for the same engine.Move.
+        """
+        if move.square is not None:
+            self.unmake(0 if move.color == BLACK else 1, move.square, move.flips)
+
+    def score(self, own, opp, color):
+        """
+        Represents a method that scores the position for the player to move, own,
+        whose color is 0 (black) or 1 (white), with the state's evaluator.
+        """
+        return self.evaluator.score_packed(self.packed, own, opp, color)
+
+    def indexes(self):
+        """
+        Represents a method that returns the index of every pattern copy.
+        """
+        return unpack_indexes(self.packed)
+
+
+class PatternEvaluator:
+    """
+    Represents a set of fitted weights: per game phase, one table of weights per
+    pattern plus weights for mobility (moves of the player to move minus moves of
+    the opponent) and parity (1 when an odd number of squares is empty, so the
+    player to move would get the last move, else -1).
+
+    Scores are in hundredths of a disc for the player to move, so a finished game
+    scored by ai.final_score always outweighs them.
+
+    The evaluator can be called like evaluate. Given to ai.AlphaBetaSearch as its
+    evaluation, it hands the search a PatternState through new_state, so the
+    pattern indexes are updated as the search places and flips discs instead of
+    being read from scratch at every leaf.
+    """
+
+    def __init__(self, phases=4, tables=None, mobility=None, parity=None):
+        """
+        Represents an init method that takes the number of phases and, per phase,
+        the list of pattern weight arrays and the mobility and parity weights.
+        Without them every weight is zero.
+        """
+        self.phases = phases
+        self.tables = tables or [[array("h", bytes(2 * size)) for size in TABLE_SIZES] for phase in range(phases)]
+        self.mobility = mobility or [0] * phases
+        self.parity = parity or [0] * phases
+        self._prepare()
+
+    def _prepare(self):
+        """
+        Represents a method that lays out, for each phase, one weight array per
+        pattern copy for each color counted as 1, so evaluation is a single pass
+        over the indexes.
+        """
+        swaps = {size: _swap_table(size) for name, size, copies in PATTERNS}
+        self._own_tables = []
+        self._swapped_tables = []
+        for tables in self.tables:
+            swapped = [array("h", (table[index] for index in swaps[size]))
+                       for table, (name, size, copies) in zip(tables, PATTERNS)]
+            self._own_tables.append([tables[pattern] for pattern, copy in INSTANCES])
+            self._swapped_tables.append([swapped[pattern] for pattern, copy in INSTANCES])
+
+    def _extra_terms(self, own, opp, phase):
+        """
+        Represents a method that returns the mobility and parity terms.
+        """
+        empties = 64 - popcount(own | opp)
+        mobility = popcount(move_mask(own, opp)) - popcount(move_mask(opp, own))
+        return self.mobility[phase] * mobility + self.parity[phase] * (1 if empties & 1 else -1)
+
+    def evaluate(self, own, opp):
+        """
+        Represents a method that scores a position for the player to move, reading
+        the pattern indexes from scratch. It can be passed to ai.AlphaBetaSearch.
+        """
+        phase = phase_of(64 - popcount(own | opp), self.phases)
+        score = sum(map(getitem, self._own_tables[phase], unpack_indexes(pattern_indexes(own, opp))))
+        return score + self._extra_terms(own, opp, phase)
+
+    __call__ = evaluate
+
+    def score_packed(self, packed, own, opp, color):
+        """
+        Represents a method that scores a position for the player to move, own,
+        whose color is 0 (black) or 1 (white), from its packed pattern indexes
+        counting black's discs as 1.
+        """
+        phase = phase_of(64 - popcount(own | opp), self.phases)
+        tables = self._own_tables[phase] if color == 0 else self._swapped_tables[phase]
+        return sum(map(getitem, tables, unpack_indexes(packed))) + self._extra_terms(own, opp, phase)
+
+    def evaluate_state(self, state, black, white, turn):
+        """
+        Represents a method that scores a position for the player to move from its
+        incrementally kept PatternState, with the position's bitboards and the
+        color to move.
+        """
+        if turn == BLACK:
+            return self.score_packed(state.packed, black, white, 0)
+        return self.score_packed(state.packed, white, black, 1)
+
+    def new_state(self, own, opp, color):
+        """
+        Represents a method that ai.AlphaBetaSearch calls at the root of a search:
+        it returns the PatternState of the position where color (0 for black, 1 for
+        white) is to move with own against opp.
+        """
+        black, white = (own, opp) if color == 0 else (opp, own)
+        return PatternState(Position(black, white), self)
+
+    def save(self, path):
+        """
+        Represents a method that writes the weights to path: a header, the size of
+        each pattern, then zlib-compressed big-endian 16-bit weights, phase by
+        phase, pattern by pattern, followed by the mobility and parity weights.
+        """
+        payload = array("h")
+        for phase in range(self.phases):
+            for table in self.tables[phase]:
+                payload.extend(table)
+            payload.extend((self.mobility[phase], self.parity[phase]))
+        if sys.byteorder == "little":
+            payload.byteswap()
+
+        with open(path, "wb") as output:
+            output.write(HEADER.pack(MAGIC, self.phases, len(PATTERNS)))
+            output.write(bytes(size for name, size, copies in PATTERNS))
+            output.write(zlib.compress(payload.tobytes(), 9))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Represents a method that reads weights written by save.
+
+        Raises ValueError if the file is not a weights file for these patterns.
+        """
+        with open(path, "rb") as source:
+            data = source.read()
+        magic, phases, count = HEADER.unpack_from(data)
+        sizes = tuple(data[HEADER.size:HEADER.size + count])
+        if magic != MAGIC or sizes != tuple(size for name, size, copies in PATTERNS):
+            raise ValueError("%s is not a pattern weights file for this version" % path)
+
+        payload = array("h")
+        payload.frombytes(zlib.decompress(data[HEADER.size + count:]))
+        if sys.byteorder == "little":
+            payload.byteswap()
+        if len(payload) != phases * (sum(TABLE_SIZES) + 2):
+            raise ValueError("%s has the wrong number of weights" % path)
+
+        tables, mobility, parity = [], [], []
+        offset = 0
+        for phase in range(phases):
+            phase_tables = []
+            for size in TABLE_SIZES:
+                phase_tables.append(payload[offset:offset + size])
+                offset += size
+            tables.append(phase_tables)
+            mobility.append(payload[offset])
+            parity.append(payload[offset + 1])
+            offset += 2
+        return cls(phases, tables, mobility, parity)
+
+
+def read_records(path):
+    """
+    Represents a generator that yields game records such as "f5d6c3" from a text
+    file with one game per line, or from the "moves" field of a JSON lines file
+    written by arena.py.
+    """
+    with open(path) as source:
+        for line in source:
+            line = line.strip()
+            if line.startswith("{"):
+                line = json.loads(line).get("moves", "")
+            if line:
+                yield line.split()[0]
+
+
+def record_positions(record):
+    """
+    Represents a function that replays a game record, passing where the player
+    to move has none, and returns each position with a move to play as (own, opp)
+    bitboards of the player to move, along with the final disc difference for
+    that player, counted from the discs on the board like ai.final_score.
+
+    Raises ValueError if the record contains an illegal move.
+    """
+    position = Position()
+    seen = []
+    record = record.lower()
+    for i in range(0, len(record), 2):
+        if not position.legal_moves():
+            position.pass_turn()
+        seen.append((position.bitboards(position.turn), position.turn))
+        position.make_move((int(record[i + 1]) - 1) * 8 + ord(record[i]) - ord("a"))
+
+    black, white = position.counts()
+    return [(own, opp, black - white if turn == BLACK else white - black) for (own, opp), turn in seen]
+
+
+def fit(samples, phases=4, epochs=50, regularization=20.0, rate=1.0):
+    """
+    Represents a function that fits a PatternEvaluator by least squares to (own,
+    opp, final disc difference) samples from record_positions, one phase at a
+    time. Each epoch moves every weight by the mean error of the positions it
+    appears in (shrunk by regularization), times rate over the number of terms
+    in a position, since every term of a position moves at once.
+
+    Needs numpy.
+    """
+    import numpy as np
+
+    by_phase = [[] for phase in range(phases)]
+    for own, opp, result in samples:
+        by_phase[phase_of(64 - popcount(own | opp), phases)].append((own, opp, result))
+
+    evaluator = PatternEvaluator(phases)
+    for phase in range(phases):
+        if not by_phase[phase]:
+            continue
+        indexes = np.array([unpack_indexes(pattern_indexes(own, opp)) for own, opp, result in by_phase[phase]],
+                           dtype=np.int64)
+        mobility = np.array([popcount(move_mask(own, opp)) - popcount(move_mask(opp, own))
+                             for own, opp, result in by_phase[phase]], dtype=np.float64)
+        parity = np.array([1.0 if (64 - popcount(own | opp)) & 1 else -1.0 for own, opp, result in by_phase[phase]])
+        target = 100.0 * np.array([result for own, opp, result in by_phase[phase]], dtype=np.float64)
+
+        weights = [np.zeros(size) for size in TABLE_SIZES]
+        counts = [np.zeros(size) for size in TABLE_SIZES]
+        for instance, (pattern, copy) in enumerate(INSTANCES):
+            counts[pattern] += np.bincount(indexes[:, instance], minlength=TABLE_SIZES[pattern])
+        mobility_weight = parity_weight = 0.0
+        step = rate / (len(INSTANCES) + 2)
+
+        for epoch in range(epochs):
+            prediction = mobility_weight * mobility + parity_weight * parity
+            for instance, (pattern, copy) in enumerate(INSTANCES):
+                prediction += weights[pattern][indexes[:, instance]]
+            error = target - prediction
+
+            # the copies of a pattern share the error between them
+            gradients = [np.zeros(size) for size in TABLE_SIZES]
+            for instance, (pattern, copy) in enumerate(INSTANCES):
+                gradients[pattern] += np.bincount(indexes[:, instance], error, TABLE_SIZES[pattern])
+            for pattern, (name, size, copies) in enumerate(PATTERNS):
+                weights[pattern] += step * gradients[pattern] / (counts[pattern] + regularization)
+            mobility_weight += step * float(np.dot(error, mobility) / (np.dot(mobility, mobility) + 1.0))
+            parity_weight += step * float(np.mean(error * parity))
+
+        evaluator.tables[phase] = [array("h", np.clip(np.rint(table), -32768, 32767).astype(np.int16).tolist())
+                                   for table in weights]
+        evaluator.mobility[phase] = int(np.clip(round(mobility_weight), -32768, 32767))
+        evaluator.parity[phase] = int(np.clip(round(parity_weight), -32768, 32767))
+        rms = float(np.sqrt(np.mean(error ** 2))) / 100
+        print("phase %d: %d positions, rms error %.2f discs" % (phase, len(target), rms))
+
+    evaluator._prepare()
+    return evaluator
+
+
+def benchmark(evaluator, count=20000, seed=1):
+    """
+    Represents a function that times the evaluator on positions from random games,
+    from scratch and with incrementally kept indexes, next to ai.evaluate, and
+    the same two ways inside a search, and returns {name: evaluations per second,
+    or nodes per second for the searches}.
+    """
+    from ai import AlphaBetaSearch, evaluate
+
+    rng = random.Random(seed)
+    games = []
+    while sum(len(moves) for moves in games) < count:
+        position = Position()
+        moves = []
+        while not position.is_game_over():
+            legal = list(squares(position.legal_moves()))
+            moves.append(position.make_move(rng.choice(legal)) if legal else position.pass_turn())
+        games.append(moves)
+
+    positions = []
+    colors = []
+    for moves in games:
+        position = Position()
+        for move in moves:
+            if move.square is None:
+                position.pass_turn()
+            else:
+                position.make_move(move.square)
+            positions.append(position.bitboards(position.turn))
+            colors.append(0 if position.turn == BLACK else 1)
+
+    results = {}
+    start = time.perf_counter()
+    for own, opp in positions:
+        evaluate(own, opp)
+    results["square weights (ai.evaluate)"] = len(positions) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for own, opp in positions:
+        evaluator.evaluate(own, opp)
+    results["patterns from scratch"] = len(positions) / (time.perf_counter() - start)
+
+    # replay every game, updating the indexes as each move is played
+    start = time.perf_counter()
+    for moves in games:
+        position = Position()
+        state = PatternState(position)
+        for move in moves:
+            state.play(move)
+            if move.square is None:
+                position.pass_turn()
+            else:
+                position.apply(move.color, move.square, move.flips)
+                position.pass_turn()
+            evaluator.evaluate_state(state, position.black, position.white, position.turn)
+    results["patterns incremental (with move)"] = len(positions) / (time.perf_counter() - start)
+
+    # search a few positions to depth 3, reading the indexes from scratch at the
+    # leaves and then keeping them in a PatternState; the rates are nodes per second
+    step = max(1, len(positions) // 20)
+    searched = [(own, opp, color) for (own, opp), color in zip(positions[20::step], colors[20::step])]
+    for name, evaluation in (("search, patterns from scratch", evaluator.evaluate),
+                             ("search, patterns incremental", evaluator)):
+        nodes = 0
+        start = time.perf_counter()
+        for own, opp, color in searched:
+            nodes += AlphaBetaSearch(float("inf"), 3, evaluation).search(own, opp, color).nodes
+        results[name] = nodes / (time.perf_counter() - start)
+    return results
+
+
+def main():
+    """
+    Represents the command line entry point, with a "fit" command that writes a
+    weights file from game records and a "bench" command that measures
+    evaluations per second.
+    """
+    parser = argparse.ArgumentParser(description="Fit and benchmark the Reversi pattern evaluation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit", help="fit weights to game records")
+    fit_parser.add_argument("games", help="text file with one game per line (e.g. f5d6c3), or arena.py results")
+    fit_parser.add_argument("output", help="path of the weights file to write")
+    fit_parser.add_argument("--phases", type=int, default=4, help="game phases with their own weights (default 4)")
+    fit_parser.add_argument("--epochs", type=int, default=50, help="passes over the positions (default 50)")
+
+    bench_parser = commands.add_parser("bench", help="measure evaluations per second")
+    bench_parser.add_argument("--weights", help="weights file to use (default: all zero, which is just as fast)")
+    bench_parser.add_argument("--positions", type=int, default=20000, help="positions to evaluate (default 20000)")
+    args = parser.parse_args()
+
+    if args.command == "fit":
+        games = skipped = 0
+        samples = []
+        for record in read_records(args.games):
+            try:
+                samples += record_positions(record)
+                games += 1
+            except (ValueError, IndexError):
+                skipped += 1
+        evaluator = fit(samples, args.phases, args.epochs)
+        evaluator.save(args.output)
+        print("wrote weights fitted to %d games to %s (%d games skipped)" % (games, args.output, skipped))
+    else:
+        evaluator = PatternEvaluator.load(args.weights) if args.weights else PatternEvaluator()
+        for name, rate in benchmark(evaluator, args.positions).items():
+            print("%-34s %10.0f %s/s" % (name, rate, "nodes" if name.startswith("search") else "evaluations"))
+
+
+if __name__ == "__main__":
+    main()
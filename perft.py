@@ -0,0 +1,143 @@
+# Description: Perft for the Reversi rules engine. Counts the leaf nodes of the game tree to a
+#               fixed depth, which checks move generation, flipping and pass handling against
+#               known values far more thoroughly than playing a few games by hand.
+#
+# Example:      python perft.py --depth 8
+#               python perft.py --check
+import argparse
+import sys
+import time
+
+from engine import START_BLACK, START_WHITE, move_mask, flip_mask, popcount, squares
+
+# Known leaf counts from the starting position, depth 1 first. A pass counts as a ply,
+# and a finished game counts as one leaf at whatever depth it ends.
+START_PERFT = (4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284, 212258800)
+
+# Reference positions as (name, moves from the start, leaf counts from depth 1).
+# The counts were cross-checked with a square-by-square move generator on the 10x10
+# board. The two endgames run past the end of the game with passes along the way,
+# which exercises the pass and game-end rules.
+REFERENCE_POSITIONS = (
+    ("tiger", "f5d6c3d3c4", (6, 54, 358, 3144, 25039, 239378)),
+    ("rose", "f5f6e6f4", (9, 59, 461, 3487, 28806, 243827)),
+    ("buffalo", "f5f6e6f4g5", (6, 51, 387, 3214, 26956, 240421)),
+    ("endgame1", "e6f6g6c5c4e3d3g7f4c3b4e7b6g5f7c6d2b2d6a5f3f8g4e1f5a6c1c2g8h5c7d7a4h7d8b5e8h3b1e2a3b3a2a1g3"
+                 "c8b8b7a8h2a7h4", (4, 17, 55, 178, 464, 1006, 1679, 1772, 1783, 1787)),
+    ("endgame2", "c4c5e6f5b6e7f7e3f3a7e8d3d2c1e2d6b4f4c3g2d1a4g3f2b5h2b7c6b3c7g6b2b1f8d7g8h8f6a2d8g1e1c8h6"
+                 "h7c2a6a1a3g5h3g7", (7, 32, 164, 531, 1830, 3628, 6549, 6558, 6742, 6742)),
+)
+
+
+def perft(own, opp, depth, passed=False):
+    """
+    Represents a recursive function that returns the number of leaf nodes depth
+    plies below the position (own to move against opp). The last ply is counted
+    straight from the move mask instead of being played out.
+    """
+    if depth == 0:
+        return 1
+
+    moves = move_mask(own, opp)
+    if not moves:
+        if passed:
+            return 1  # neither side can move, so the game is over
+        return perft(opp, own, depth - 1, True)
+
+    if depth == 1:
+        return popcount(moves)
+
+    total = 0
+    for square in squares(moves):
+        flips = flip_mask(own, opp, square)
+        total += perft(opp & ~flips, own | flips | (1 << square), depth - 1)
+    return total
+
+
+def divide(own, opp, depth):
+    """
+    Represents a function that returns a dictionary of the perft count below each
+    legal move of the position, which narrows down where two move generators
+    disagree.
+    """
+    counts = {}
+    for square in squares(move_mask(own, opp)):
+        flips = flip_mask(own, opp, square)
+        counts[square] = perft(opp & ~flips, own | flips | (1 << square), depth - 1)
+    return counts
+
+
+def play_moves(record):
+    """
+    Represents a function that plays a record such as "f5d6c3" from the starting
+    position, passing whenever the player to move has no move, and returns the
+    (own, opp) bitboards of the player to move.
+
+    Raises ValueError if the record contains an illegal move.
+    """
+    own, opp = START_BLACK, START_WHITE
+    record = record.strip().lower()
+    for i in range(0, len(record), 2):
+        square = (int(record[i + 1]) - 1) * 8 + ord(record[i]) - ord("a")
+        if not move_mask(own, opp):
+            own, opp = opp, own
+
+        flips = flip_mask(own, opp, square)
+        if not flips or (own | opp) & (1 << square):
+            raise ValueError("illegal move %r" % record[i:i + 2])
+        own, opp = opp & ~flips, own | flips | (1 << square)
+    return own, opp
+
+
+def check(max_depth=8):
+    """
+    Represents a function that runs perft on the starting position and every
+    reference position up to max_depth, printing each count next to the known
+    value.
+
+    Returns -- the number of counts that did not match.
+    """
+    failures = 0
+    positions = (("start", "", START_PERFT),) + REFERENCE_POSITIONS
+    for name, record, expected in positions:
+        own, opp = play_moves(record)
+        for depth, known in enumerate(expected[:max_depth], 1):
+            start = time.perf_counter()
+            count = perft(own, opp, depth)
+            elapsed = time.perf_counter() - start
+            status = "ok" if count == known else "MISMATCH (expected %d)" % known
+            failures += count != known
+            print("%-9s depth %2d: %12d  %8.3f s  %s" % (name, depth, count, elapsed, status))
+    return failures
+
+
+def main():
+    """
+    Represents the command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Count Reversi game tree leaves to a fixed depth.")
+    parser.add_argument("--depth", type=int, default=6, help="depth to count to (default 6)")
+    parser.add_argument("--moves", default="", help='moves to play from the start first, e.g. "f5d6c3"')
+    parser.add_argument("--divide", action="store_true", help="print the count below each legal move")
+    parser.add_argument("--check", action="store_true",
+                        help="check the start and reference positions against their known values")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check(args.depth)
+        print("all perft counts match" if not failures else "%d perft counts did not match" % failures)
+        sys.exit(1 if failures else 0)
+
+    own, opp = play_moves(args.moves)
+    if args.divide:
+        for square, count in sorted(divide(own, opp, args.depth).items()):
+            print("%s%d: %d" % ("abcdefgh"[square % 8], square // 8 + 1, count))
+
+    start = time.perf_counter()
+    count = perft(own, opp, args.depth)
+    elapsed = time.perf_counter() - start
+    print("perft(%d) = %d in %.3f s (%.0f leaves/s)" % (args.depth, count, elapsed, count / elapsed if elapsed else 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Description: The Player class shared by the Reversi game and the computer players,
+#               kept in its own module so it can be imported without opening a window.
+
+
+class Player:
+    """
+    Represents a Player class that is an implementation of the player name
+    and the player’s color piece. This class will be used in coordination with the
+    Reversi class.
+    """
+
+    def __init__(self, player, color):
+        """
+        Represents an init method or a constructor that initializes private data members
+        player name and the color of the pieces. The player’s name along with the player’s
+        color piece are initialized as private data members.
+        """
+        self._player = player
+        self._color = color
+
+    def get_player(self):
+        """
+        Represents a get method that takes no parameters and is used in
+        conjunction with the Othello class to retrieve the current player name.
+
+        Returns – current value of the player name
+        """
+        return self._player
+
+    def get_color(self):
+        """
+        Represents a get method that takes no parameters and is used in
+        conjunction with the Othello class to retrieve the current player color
+        piece.
+
+        Returns – current value of the color
+        """
+        return self._color
+
+    def is_computer(self):
+        """
+        Represents a method that takes no parameters and tells Reversi whether
+        the player's moves come from clicks or from choose_move.
+
+        Returns – False, since a human player moves by clicking cells
+        """
+        return False
+
+    def observe_move(self, piece, square):
+        """
+        Represents a method that Reversi calls after either player makes a move,
+        with the piece ("X" or "O") and the square (0-63) played. Players that need
+        to follow the game, such as a remote player, override it.
+        """
+        pass
+
+    def report(self):
+        """
+        Represents a method that Reversi calls every frame so that players whose
+        state can change between moves, such as a remote player, can tell the user.
+
+        Returns – None; a remote player returns a (message, left) pair when there is
+        news, where left is True if it has left the game and Reversi should stop
+        waiting for its moves
+        """
+        return None
+
+    def allows_takeback(self):
+        """
+        Represents a method that tells Reversi whether moves may be undone while
+        this player is seated.
+
+        Returns – True; a remote player returns False, since the server cannot take moves back
+        """
+        return True
+
+    def thinks_in_background(self):
+        """
+        Represents a method that tells Reversi whether choose_move can take long
+        enough that it should run on a background thread, so the window keeps
+        responding while the player thinks.
+
+        Returns – False; players that search, such as ai.AlphaBetaPlayer, return True
+        """
+        return False
+
+    def stop_thinking(self):
+        """
+        Represents a method that Reversi may call from another thread while
+        choose_move runs, asking it to return the best move it has found as soon as
+        it can. Players that search override it.
+        """
+        pass
+
+    def thinking_progress(self):
+        """
+        Represents a method that Reversi calls while choose_move runs on a background
+        thread to show how the search is going.
+
+        Returns – None, or an object with depth, nodes and move attributes such as ai.SearchResult
+        """
+        return None
@@ -0,0 +1,229 @@
+# Description: Per-frame profiler for the Reversi main loop. Chosen methods are wrapped with
+#               timers only while profiling is switched on, so there is no cost when it is off,
+#               and the time and call count of each phase is kept for a rolling window of
+#               frames for percentiles, hot spots and histograms.
+import csv
+import json
+import time
+from collections import deque
+
+# upper edges in milliseconds of the histogram buckets; the last bucket is open ended
+BUCKET_EDGES_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 66.7, 100, 250)
+
+
+def percentile(values, fraction):
+    """
+    Represents a function that returns the value below which the given fraction
+    (0 to 1) of values fall, using the nearest rank, or 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def histogram(values_ms):
+    """
+    Represents a function that counts how many values (in milliseconds) fall in
+    each bucket of BUCKET_EDGES_MS, plus one final bucket for anything larger.
+    """
+    counts = [0] * (len(BUCKET_EDGES_MS) + 1)
+    for value in values_ms:
+        bucket = 0
+        while bucket < len(BUCKET_EDGES_MS) and value > BUCKET_EDGES_MS[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+    return counts
+
+
+class FrameProfiler:
+    """
+    Represents a profiler that times named phases of each frame.
+
+    Phases are methods of the objects passed to watch. While the profiler is
+    enabled each of them is shadowed by a timing wrapper on its instance, and
+    disabling it deletes the wrappers again. Times are inclusive, so a phase that
+    calls another counts the time of both.
+    """
+
+    def __init__(self, window=600):
+        """
+        Represents an init method that takes how many recent frames to keep.
+        """
+        self.window = window
+        self.enabled = False
+        self.frames = deque(maxlen=window)  # (frame seconds, {phase: seconds}, {phase: calls})
+        self._frame_ends = deque(maxlen=window)
+        self._watched = []  # (object, method name, phase name)
+        self._times = {}
+        self._calls = {}
+
+    def watch(self, obj, *names, prefix=""):
+        """
+        Represents a method that adds methods of obj, by name, to the phases timed
+        while the profiler is enabled. Each phase is named prefix + method name.
+        """
+        for name in names:
+            self._watched.append((obj, name, prefix + name))
+        if self.enabled:
+            self._install(self._watched[-len(names):])
+
+    def _install(self, watched):
+        """
+        Represents a method that puts a timing wrapper in front of each watched method.
+        """
+        for obj, name, phase in watched:
+            setattr(obj, name, self._wrap(getattr(obj, name), phase))
+
+    def _wrap(self, method, phase):
+        """
+        Represents a method that returns a wrapper timing each call of method.
+        """
+        times = self._times
+        calls = self._calls
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[phase] = times.get(phase, 0.0) + clock() - start
+                calls[phase] = calls.get(phase, 0) + 1
+        return timed
+
+    def enable(self):
+        """
+        Represents a method that starts timing, clearing anything recorded earlier.
+        """
+        if not self.enabled:
+            self.enabled = True
+            self.frames.clear()
+            self._frame_ends.clear()
+            self._times.clear()
+            self._calls.clear()
+            self._install(self._watched)
+
+    def disable(self):
+        """
+        Represents a method that stops timing and removes the wrappers, leaving the
+        recorded frames in place for export.
+        """
+        if self.enabled:
+            self.enabled = False
+            for obj, name, phase in self._watched:
+                if name in vars(obj):
+                    delattr(obj, name)
+
+    def toggle(self):
+        """
+        Represents a method that switches the profiler on or off.
+
+        Returns -- True if it is now enabled.
+        """
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def end_frame(self, frame_time):
+        """
+        Represents a method that records a drawn frame that took frame_time
+        seconds, along with the phase times and calls made during it.
+        """
+        if not self.enabled:
+            return
+        self.frames.append((frame_time, dict(self._times), dict(self._calls)))
+        self._times.clear()
+        self._calls.clear()
+        self._frame_ends.append(time.perf_counter())
+
+    def fps(self):
+        """
+        Represents a method that returns the frames drawn per second over the time
+        the window of frames spans, or 0.0 if there are too few.
+        """
+        if len(self._frame_ends) < 2:
+            return 0.0
+        span = self._frame_ends[-1] - self._frame_ends[0]
+        return (len(self._frame_ends) - 1) / span if span else 0.0
+
+    def frame_percentiles(self, fractions=(0.5, 0.95, 0.99)):
+        """
+        Represents a method that returns the frame time in milliseconds at each of
+        the given fractions of the recorded frames.
+        """
+        values = [1000 * frame_time for frame_time, times, calls in self.frames]
+        return [percentile(values, fraction) for fraction in fractions]
+
+    def hot_spots(self, count=5):
+        """
+        Represents a method that returns up to count (phase, milliseconds per frame,
+        calls per frame) tuples for the phases that took the most time.
+        """
+        frames = len(self.frames) or 1
+        totals = {}
+        calls = {}
+        for frame_time, frame_times, frame_calls in self.frames:
+            for phase, seconds in frame_times.items():
+                totals[phase] = totals.get(phase, 0.0) + seconds
+                calls[phase] = calls.get(phase, 0) + frame_calls[phase]
+
+        ranked = sorted(totals, key=totals.get, reverse=True)[:count]
+        return [(phase, 1000 * totals[phase] / frames, calls[phase] / frames) for phase in ranked]
+
+    def report(self):
+        """
+        Represents a method that returns the overlay lines: frame rate, frame time
+        percentiles and the top hot spots.
+        """
+        p50, p95, p99 = self.frame_percentiles()
+        lines = ["%.0f fps over %d frames" % (self.fps(), len(self.frames)),
+                 "frame ms p50 %.2f  p95 %.2f  p99 %.2f" % (p50, p95, p99)]
+        for phase, milliseconds, calls in self.hot_spots():
+            lines.append("%s %.2f ms  x%.1f" % (phase, milliseconds, calls))
+        return lines
+
+    def histograms(self):
+        """
+        Represents a method that returns a dictionary of histograms over the recorded
+        frames: "frame" for the whole frame and one per phase for the time it took
+        in each frame it ran.
+        """
+        result = {"frame": histogram([1000 * frame_time for frame_time, times, calls in self.frames])}
+        phases = {}
+        for frame_time, times, calls in self.frames:
+            for phase, seconds in times.items():
+                phases.setdefault(phase, []).append(1000 * seconds)
+        for phase, values in phases.items():
+            result[phase] = histogram(values)
+        return result
+
+    def export(self, path):
+        """
+        Represents a method that writes the histograms and summary to path, as CSV
+        (metric, bucket upper edge in ms, count) if it ends in ".csv" and as JSON
+        otherwise.
+        """
+        histograms = self.histograms()
+        edges = [str(edge) for edge in BUCKET_EDGES_MS] + ["inf"]
+
+        with open(path, "w", newline="") as output:
+            if path.endswith(".csv"):
+                writer = csv.writer(output)
+                writer.writerow(("metric", "bucket_ms", "count"))
+                for metric, counts in histograms.items():
+                    for edge, count in zip(edges, counts):
+                        writer.writerow((metric, edge, count))
+            else:
+                p50, p95, p99 = self.frame_percentiles()
+                json.dump({
+                    "frames": len(self.frames),
+                    "fps": self.fps(),
+                    "frame_ms": {"p50": p50, "p95": p95, "p99": p99},
+                    "hot_spots": [{"phase": phase, "ms_per_frame": milliseconds, "calls_per_frame": calls}
+                                  for phase, milliseconds, calls in self.hot_spots(len(histograms))],
+                    "bucket_ms": edges,
+                    "histograms": histograms,
+                }, output, indent=2)
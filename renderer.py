@@ -0,0 +1,136 @@
+# Description: Retained-mode renderer for the Reversi grid screen. The parts of the screen
+#               that never change are baked into a cached surface once, and each frame only
+#               the cells and text regions that changed are redrawn and sent to the display.
+import pygame
+
+
+class BoardRenderer:
+    """
+    Represents a renderer that redraws only what changed on the grid screen.
+
+    The background, buttons, board frame, labels and empty cells are drawn once by
+    Reversi.draw_static_grid and kept as the static layer. Cells are marked dirty by
+    make_move and flip_piece (and by changes in the move hints and hint markers), and
+    the turn indicator, message and piece counts are redrawn only when their values
+    change.
+    Everything that was touched is restored from the static layer first and then
+    pushed to the screen with pygame.display.update(dirty_rects).
+    """
+
+    def __init__(self, game):
+        """
+        Represents an init method that takes the Reversi game to draw.
+        """
+        self.game = game
+        self.static_layer = None
+        self.full_redraw = True
+
+        self._dirty_cells = set()
+        self._hints = set()
+        self._markers = {}
+        self._values = {}
+        self._region_rects = {}
+
+        # the cell rectangles come from the game's fixed geometry table
+        self.cell_rects = game.geometry.rects
+
+    def mark_cell(self, row, col):
+        """
+        Represents a method that flags a single cell to be redrawn on the next frame.
+        """
+        self._dirty_cells.add((row, col))
+
+    def mark_all(self):
+        """
+        Represents a method that forces the next frame to redraw the whole window,
+        for example after coming back from another screen.
+        """
+        self.full_redraw = True
+
+    def build_static_layer(self):
+        """
+        Represents a method that draws the unchanging parts of the grid screen onto
+        the window and keeps a copy of the result as the static layer.
+        """
+        self.game.draw_static_grid()
+        self.static_layer = self.game.window.copy()
+
+    def restore(self, rect):
+        """
+        Represents a method that copies the static layer back over the given area
+        of the window, erasing whatever was drawn there.
+        """
+        self.game.window.blit(self.static_layer, rect, rect)
+
+    def draw(self, available_positions, markers=None):
+        """
+        Represents a method that brings the window up to date with the game state,
+        given the available positions to draw as hints and a dictionary of hint
+        markers by cell (see Reversi.hint_overlay).
+
+        Returns -- the list of rectangles that were updated on the display.
+        """
+        window = self.game.window
+        dirty_rects = []
+
+        if self.static_layer is None:
+            self.build_static_layer()
+
+        if self.full_redraw:
+            window.blit(self.static_layer, (0, 0))
+            self._dirty_cells.update(self.cell_rects)
+            self._values = {}
+            self._region_rects = {}
+
+        # hints that appeared or disappeared need their cells redrawn
+        hints = set(available_positions)
+        self._dirty_cells.update(hints ^ self._hints)
+        self._hints = hints
+
+        # so do cells whose marker changed; an unchanged overlay is the same dictionary
+        markers = markers or {}
+        if markers is not self._markers:
+            old_markers = self._markers
+            self._dirty_cells.update(cell for cell in markers.keys() | old_markers.keys()
+                                     if markers.get(cell) != old_markers.get(cell))
+            self._markers = markers
+
+        for cell in self._dirty_cells:
+            rect = self.cell_rects[cell]
+            self.restore(rect)
+            self.game.draw_cell(cell, rect, cell in hints, markers.get(cell))
+            dirty_rects.append(rect)
+        self._dirty_cells.clear()
+
+        game = self.game
+        self.draw_region(dirty_rects, "turn", game.current_player, game.draw_turn_indicator)
+        self.draw_region(dirty_rects, "message", game.message, game.draw_message)
+        self.draw_region(dirty_rects, "counts", (game.player1_count, game.player2_count), game.draw_counts)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+            return [window.get_rect()]
+
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        return dirty_rects
+
+    def draw_region(self, dirty_rects, name, value, draw):
+        """
+        Represents a method that redraws a named text region when its value has
+        changed since it was last drawn. The draw callback returns the rectangle it
+        covered, which is erased from the static layer before the next redraw.
+        """
+        if name in self._values and self._values[name] == value:
+            return
+
+        old_rect = self._region_rects.get(name)
+        if old_rect is not None:
+            self.restore(old_rect)
+            dirty_rects.append(old_rect)
+
+        new_rect = draw()
+        self._region_rects[name] = new_rect
+        self._values[name] = value
+        dirty_rects.append(new_rect)
@@ -0,0 +1,398 @@
+# Description: Asyncio game server for networked Reversi. Clients connect over TCP and exchange
+#               length-prefixed JSON messages; the server pairs them into matches, keeps each
+#               match as a small engine.Position, validates every move and relays the new state
+#               to both players. One process can host thousands of matches at once.
+#
+# Example:      python server.py --port 8765
+#
+# Protocol:     every message is a 4-byte big-endian length followed by that many bytes of
+#               UTF-8 JSON with a "type" field.
+#               client -> server:  {"type": "join"} or {"type": "join", "game": "name"}
+#                                  {"type": "move", "square": 0-63}
+#                                  {"type": "leave"}
+#               server -> client:  joined, start, state, over and error messages (see GameServer)
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+import time
+
+from engine import BLACK, WHITE, Position
+
+HEADER = struct.Struct(">I")
+MAX_MESSAGE = 4096  # larger messages are a protocol error
+MAX_WRITE_BUFFER = 64 * 1024  # a client that lets this much output pile up is disconnected
+
+
+class ProtocolError(Exception):
+    """
+    Represents the exception raised when a peer sends a message the protocol does
+    not allow.
+    """
+    pass
+
+
+def encode_message(message):
+    """
+    Represents a function that returns a message dictionary as a length-prefixed frame.
+    """
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+def decode_payload(data):
+    """
+    Represents a function that turns the payload of a frame back into a message.
+
+    Raises ProtocolError if it is not a JSON object with a "type" field.
+    """
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except ValueError:
+        raise ProtocolError("message is not valid JSON")
+    if not isinstance(message, dict) or "type" not in message:
+        raise ProtocolError("message has no type")
+    return message
+
+
+async def read_message(reader):
+    """
+    Represents a coroutine that reads one framed message from an asyncio stream.
+
+    Raises asyncio.IncompleteReadError when the peer closes the connection and
+    ProtocolError for an oversized or malformed message.
+    """
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if size > MAX_MESSAGE:
+        raise ProtocolError("message of %d bytes is too large" % size)
+    return decode_payload(await reader.readexactly(size))
+
+
+class Match:
+    """
+    Represents one game on the server: its id, the engine position, the two
+    seated connections (black first), the number of moves played and the last
+    square played. Only this and the two connections are kept per game.
+    """
+
+    __slots__ = ("id", "name", "position", "seats", "plies", "last_move")
+
+    def __init__(self, match_id, name=None):
+        self.id = match_id
+        self.name = name
+        self.position = Position()
+        self.seats = [None, None]
+        self.plies = 0
+        self.last_move = None
+
+    def is_full(self):
+        return self.seats[0] is not None and self.seats[1] is not None
+
+    def state_message(self, mover=None, passed=False):
+        """
+        Represents a method that returns the "state" message sent after every move:
+        both bitboards, who is to move, their legal moves as a bitboard, the square
+        just played and by whom, and whether the next player had to pass.
+        """
+        position = self.position
+        return {
+            "type": "state",
+            "game": self.id,
+            "black": position.black,
+            "white": position.white,
+            "turn": position.turn,
+            "moves": position.legal_moves(),
+            "last": self.last_move,
+            "mover": mover,
+            "passed": passed,
+        }
+
+
+class Connection:
+    """
+    Represents a connected client: its stream writer, the match it is seated in
+    (if any) and the color it plays there.
+    """
+
+    __slots__ = ("writer", "match", "color")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.match = None
+        self.color = None
+
+    def send(self, message):
+        """
+        Represents a method that queues a message for the client. A client that
+        is not reading its messages is disconnected, so its output cannot grow
+        without bound.
+        """
+        if self.writer.is_closing():
+            return
+        self.writer.write(encode_message(message))
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.writer.close()
+
+
+class GameServer:
+    """
+    Represents the game server.
+
+    A client that sends "join" without a game name is paired with the next client
+    to do the same; with a name, it is paired with the other client that joins
+    under that name. Each player receives "joined" with its color ("X" moves
+    first), then "start" and a "state" message once both seats are taken. A move
+    is checked against the engine before it is played, and the player to move
+    passes automatically when they have no legal move. When the game ends both
+    players receive "over" with the disc counts and the winner.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, max_games=10000):
+        """
+        Represents an init method that takes the address to listen on and the most
+        matches to host at once.
+        """
+        self.host = host
+        self.port = port
+        self.max_games = max_games
+        self.matches = {}
+        self.waiting = None  # the public match waiting for a second player
+        self.named = {}  # game name -> match waiting for its second player
+        self.connections = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.moves = 0
+        self._ids = itertools.count(1)
+        self._server = None
+
+    async def start(self):
+        """
+        Represents a coroutine that starts listening. With port 0 the system picks
+        a free port, which is stored back in self.port.
+        """
+        self._server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """
+        Represents a coroutine that starts the server and serves until cancelled.
+        """
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        """
+        Represents a method that stops accepting new connections.
+        """
+        if self._server is not None:
+            self._server.close()
+
+    def stats(self):
+        """
+        Represents a method that returns the server counters as a dictionary.
+        """
+        return {
+            "connections": self.connections,
+            "active_games": len(self.matches),
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "moves": self.moves,
+        }
+
+    async def handle_client(self, reader, writer):
+        """
+        Represents the coroutine that serves one client connection until it closes.
+        """
+        connection = Connection(writer)
+        self.connections += 1
+        try:
+            while not writer.is_closing():
+                message = await read_message(reader)
+                try:
+                    self.dispatch(connection, message)
+                except ProtocolError as error:
+                    connection.send({"type": "error", "message": str(error)})
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ProtocolError as error:
+            connection.send({"type": "error", "message": str(error)})
+        finally:
+            self.connections -= 1
+            self.leave(connection, "opponent left")
+            writer.close()
+
+    def dispatch(self, connection, message):
+        """
+        Represents a method that handles one message from a client.
+
+        Raises ProtocolError for a message the client may not send right now.
+        """
+        kind = message["type"]
+        if kind == "join":
+            self.join(connection, message.get("game"))
+        elif kind == "move":
+            self.move(connection, message.get("square"))
+        elif kind == "leave":
+            self.leave(connection, "opponent left")
+        else:
+            raise ProtocolError("unknown message type %r" % kind)
+
+    def join(self, connection, name=None):
+        """
+        Represents a method that seats a client in a waiting match, or a new one.
+        """
+        if connection.match is not None:
+            raise ProtocolError("already in a game")
+        if name is not None and not isinstance(name, str):
+            raise ProtocolError("game name must be a string")
+
+        match = self.named.get(name) if name is not None else self.waiting
+        if match is None:
+            if len(self.matches) >= self.max_games:
+                raise ProtocolError("server is full")
+            match = Match(next(self._ids), name)
+            self.matches[match.id] = match
+            if name is not None:
+                self.named[name] = match
+            else:
+                self.waiting = match
+
+        seat = 0 if match.seats[0] is None else 1
+        match.seats[seat] = connection
+        connection.match = match
+        connection.color = BLACK if seat == 0 else WHITE
+        connection.send({"type": "joined", "game": match.id, "color": connection.color})
+
+        if match.is_full():
+            if name is not None:
+                del self.named[name]
+            else:
+                self.waiting = None
+            self.games_started += 1
+            for seated in match.seats:
+                seated.send({"type": "start", "game": match.id, "color": seated.color})
+                seated.send(match.state_message())
+
+    def move(self, connection, square):
+        """
+        Represents a method that plays a client's move after checking it.
+        """
+        match = connection.match
+        if match is None or not match.is_full():
+            raise ProtocolError("the game has not started")
+        position = match.position
+        if position.turn != connection.color:
+            raise ProtocolError("it is not your turn")
+        if not isinstance(square, int) or not 0 <= square < 64:
+            raise ProtocolError("square must be a number from 0 to 63")
+
+        try:
+            position.make_move(square)
+        except ValueError:
+            raise ProtocolError("illegal move")
+        match.plies += 1
+        match.last_move = square
+        self.moves += 1
+
+        # the next player passes straight away if they have nothing to play
+        passed = False
+        if not position.legal_moves() and not position.is_game_over():
+            position.pass_turn()
+            passed = True
+
+        state = match.state_message(connection.color, passed)
+        for seated in match.seats:
+            seated.send(state)
+
+        if position.is_game_over():
+            black, white = position.counts()
+            winner = BLACK if black > white else WHITE if white > black else None
+            self.finish(match, {"type": "over", "game": match.id, "black_discs": black, "white_discs": white,
+                                "winner": winner})
+
+    def leave(self, connection, reason):
+        """
+        Represents a method that takes a client out of its match, ending the match
+        for the other player if it had started.
+        """
+        match = connection.match
+        if match is None:
+            return
+        connection.match = None
+
+        if not match.is_full():
+            # nobody else was seated yet, so the match just goes away
+            if self.waiting is match:
+                self.waiting = None
+            if match.name is not None and self.named.get(match.name) is match:
+                del self.named[match.name]
+            del self.matches[match.id]
+            return
+
+        self.finish(match, {"type": "over", "game": match.id, "reason": reason})
+
+    def finish(self, match, message):
+        """
+        Represents a method that sends a final message to the players still seated
+        in a match and removes it.
+        """
+        for seated in match.seats:
+            if seated is not None and seated.match is match:
+                seated.send(message)
+                seated.match = None
+        if self.matches.pop(match.id, None) is not None:
+            self.games_finished += 1
+
+
+async def report(server, interval):
+    """
+    Represents a coroutine that prints the server counters every interval seconds.
+    """
+    last_moves = 0
+    last_time = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        stats = server.stats()
+        print("%d connections, %d active games, %d started, %d finished, %.0f moves/s" % (
+            stats["connections"], stats["active_games"], stats["games_started"], stats["games_finished"],
+            (stats["moves"] - last_moves) / (now - last_time)))
+        last_moves, last_time = stats["moves"], now
+
+
+async def serve(args):
+    """
+    Represents the coroutine run by main.
+    """
+    server = GameServer(args.host, args.port, args.max_games)
+    await server.start()
+    print("serving Reversi on %s:%d" % (server.host, server.port))
+    if args.report:
+        asyncio.ensure_future(report(server, args.report))
+    await server.serve_forever()
+
+
+def main():
+    """
+    Represents the command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Host networked Reversi games.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default 8765)")
+    parser.add_argument("--max-games", type=int, default=10000, help="most games at once (default 10000)")
+    parser.add_argument("--report", type=float, default=5.0,
+                        help="print the counters every this many seconds, 0 for never (default 5)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
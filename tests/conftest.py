@@ -0,0 +1,6 @@
+# Description: Test setup: puts the repository root on the import path, since the game's
+#               modules live there rather than in a package.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,111 @@
+# Description: Tests for the rules engine: perft counts against the known reference values,
+#               and the invariants of making and taking back moves, on 8x8 and larger boards.
+import random
+
+import pytest
+
+from engine import BLACK, WHITE, MoveHistory, Position, STANDARD, flip_mask, move_mask, popcount, squares, variant
+from perft import REFERENCE_POSITIONS, START_PERFT, perft, play_moves
+
+
+def random_game(rng, board_variant=STANDARD):
+    """
+    Represents a function that plays a random game to the end and returns the
+    position and the moves made, passes included.
+    """
+    position = Position(variant=board_variant)
+    moves = []
+    while not position.is_game_over():
+        legal = list(squares(position.legal_moves()))
+        moves.append(position.make_move(rng.choice(legal)) if legal else position.pass_turn())
+    return position, moves
+
+
+@pytest.mark.parametrize("depth", range(1, 7))
+def test_perft_start(depth):
+    own, opp = play_moves("")
+    assert perft(own, opp, depth) == START_PERFT[depth - 1]
+
+
+@pytest.mark.parametrize("name, record, expected", REFERENCE_POSITIONS, ids=[name for name, *rest in REFERENCE_POSITIONS])
+def test_perft_reference_positions(name, record, expected):
+    own, opp = play_moves(record)
+    for depth, known in enumerate(expected[:5], 1):
+        assert perft(own, opp, depth) == known, "depth %d" % depth
+
+
+def test_play_moves_rejects_illegal_move():
+    with pytest.raises(ValueError):
+        play_moves("a1")
+
+
+def test_variant_agrees_with_8x8_generator():
+    rng = random.Random(1)
+    for game in range(20):
+        position = Position()
+        while not position.is_game_over():
+            own, opp = position.bitboards(position.turn)
+            moves = move_mask(own, opp)
+            assert STANDARD.move_mask(own, opp) == moves
+            for square in squares(moves):
+                assert STANDARD.flip_mask(own, opp, square) == flip_mask(own, opp, square)
+            if moves:
+                position.make_move(rng.choice(list(squares(moves))))
+            else:
+                position.pass_turn()
+
+
+@pytest.mark.parametrize("size", [8, 10])
+def test_unmake_restores_every_position(size):
+    rng = random.Random(size)
+    position, moves = random_game(rng, variant(size))
+    cells = position.variant.cells
+    black, white = position.counts()
+    assert black + white <= cells
+    assert not position.black & position.white
+
+    for move in reversed(moves):
+        before = (position.black, position.white)
+        position.unmake_move(move)
+        if move.square is None:
+            assert (position.black, position.white) == before
+        else:
+            # the moved square is empty again and every flipped disc is back
+            assert not (position.black | position.white) >> move.square & 1
+            own, opp = position.bitboards(move.color)
+            assert position.variant.flip_mask(own, opp, move.square) == move.flips
+        assert position.turn == move.color
+
+    start = Position(variant=variant(size))
+    assert (position.black, position.white, position.turn) == (start.black, start.white, start.turn)
+
+
+def test_make_move_flips_and_counts():
+    position = Position()
+    move = position.make_move(19)  # d3
+    assert move.color == BLACK and popcount(move.flips) == 1
+    assert position.counts() == (4, 1)
+    assert position.turn == WHITE
+    with pytest.raises(ValueError):
+        position.make_move(19)
+    with pytest.raises(ValueError):
+        position.make_move(0)
+
+
+def test_history_encode_replay_round_trip():
+    rng = random.Random(7)
+    for size in (8, 10):
+        position, moves = random_game(rng, variant(size))
+        history = MoveHistory(position.variant)
+        for move in moves:
+            history.push(move)
+        replayed, replayed_history = MoveHistory.replay(history.encode())
+        assert (replayed.black, replayed.white) == (position.black, position.white)
+        assert [square for square in replayed_history.squares() if square is not None] == \
+            [square for square in history.squares() if square is not None]
+
+
+def test_text_round_trip():
+    position = Position()
+    position.make_move(37)
+    assert Position.from_text(position.to_text()).bitboards(BLACK) == position.bitboards(BLACK)
@@ -0,0 +1,149 @@
+# Description: Tests for the search support code: transposition table store and probe, the
+#               opening book's symmetric lookups and the endgame solver against a plain
+#               minimax of the same positions.
+import random
+
+import pytest
+
+from ai import DISC_SCORE, AlphaBetaSearch
+from book import BookBuilder, OpeningBook, canonical, parse_moves
+from endgame import EndgameSolver
+from engine import Position, START_BLACK, START_WHITE, flip_mask, move_mask, popcount, squares, variant
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, ZobristHasher
+
+
+def minimax(own, opp, passed=False):
+    """
+    Represents a function that returns the exact final disc difference for the
+    player to move by searching every line, with no pruning.
+    """
+    moves = move_mask(own, opp)
+    if not moves:
+        if passed:
+            return popcount(own) - popcount(opp)
+        return -minimax(opp, own, True)
+    best = -65
+    for square in squares(moves):
+        flips = flip_mask(own, opp, square)
+        best = max(best, -minimax(opp & ~flips, own | flips | (1 << square)))
+    return best
+
+
+def endgame_positions(count, empties, seed=3):
+    """
+    Represents a function that returns (own, opp) pairs from random games with the
+    given number of empty squares left and a move to play.
+    """
+    rng = random.Random(seed)
+    found = []
+    while len(found) < count:
+        position = Position()
+        while not position.is_game_over() and 64 - sum(position.counts()) > empties:
+            legal = list(squares(position.legal_moves()))
+            if legal:
+                position.make_move(rng.choice(legal))
+            else:
+                position.pass_turn()
+        if not position.is_game_over() and position.legal_moves():
+            found.append(position.bitboards(position.turn))
+    return found
+
+
+def test_table_store_and_probe():
+    table = TranspositionTable(1)
+    table.store(12345, 7, LOWER, -42, 19)
+    table.store(67890, 3, EXACT, 5, None)
+    assert table.probe(12345) == (7, LOWER, -42, 19)
+    assert table.probe(67890) == (3, EXACT, 5, None)
+    assert table.probe(11111) is None
+    assert table.hits == 2 and table.probes == 3
+
+
+def test_table_keeps_deepest_and_newest_in_a_bucket():
+    table = TranspositionTable(1)
+    colliding = [1 + table.buckets * index for index in range(3)]
+    table.store(colliding[0], 9, UPPER, 1, 2)
+    table.store(colliding[1], 2, EXACT, 3, 4)
+    table.store(colliding[2], 1, EXACT, 5, 6)
+    assert table.probe(colliding[0]) == (9, UPPER, 1, 2)
+    assert table.probe(colliding[1]) is None
+    assert table.probe(colliding[2]) == (1, EXACT, 5, 6)
+
+
+def test_hash_updates_match_hashing_from_scratch():
+    hasher = ZobristHasher()
+    rng = random.Random(5)
+    position = Position()
+    key = hasher.hash_position(position)
+    while not position.is_game_over():
+        legal = list(squares(position.legal_moves()))
+        color = 0 if position.turn == "X" else 1
+        if legal:
+            move = position.make_move(rng.choice(legal))
+            key = hasher.update(key, color, move.square, move.flips)
+        else:
+            position.pass_turn()
+            key = hasher.pass_turn(key)
+        assert key == hasher.hash_position(position)
+
+
+def test_canonical_is_the_same_for_every_symmetry():
+    # the four openings are images of one another under the symmetries of the board
+    forms = set()
+    for record in ("f5", "d3", "c4", "e6"):
+        position = Position()
+        position.make_move(parse_moves(record)[0])
+        forms.add(canonical(*position.bitboards(position.turn))[:2])
+    assert len(forms) == 1
+
+
+def test_book_lookup_in_every_orientation(tmp_path):
+    builder = BookBuilder(max_plies=4)
+    builder.add_game("f5d6c3d3c4")
+    builder.add_game("f5f6e6f4")
+    path = tmp_path / "book.bin"
+    builder.write(str(path))
+
+    with OpeningBook(str(path)) as book:
+        assert len(book) == len(builder)
+        # every first move of the starting position is the same move up to symmetry
+        moves = {move for move, score, count in book.lookup(START_BLACK, START_WHITE)}
+        assert moves <= set(squares(move_mask(START_BLACK, START_WHITE)))
+        assert sum(count for move, score, count in book.lookup(START_BLACK, START_WHITE)) == 2
+
+        position = Position()
+        position.make_move(parse_moves("f5")[0])
+        replies = {move for move, score, count in book.lookup(*position.bitboards(position.turn))}
+        assert replies == set(parse_moves("d6f6"))
+        assert book.best_move(*position.bitboards(position.turn)) in replies
+
+
+def test_endgame_solver_matches_minimax():
+    solver = EndgameSolver()
+    for own, opp in endgame_positions(6, 7):
+        exact = minimax(own, opp)
+        result = solver.solve(own, opp)
+        assert result.score == exact
+        flips = flip_mask(own, opp, result.move)
+        assert -minimax(opp & ~flips, own | flips | (1 << result.move)) == exact
+        assert solver.solve(own, opp, wld=True).score == (exact > 0) - (exact < 0)
+
+
+def test_alphabeta_finds_the_exact_score_to_the_end():
+    search = AlphaBetaSearch(float("inf"), 10, table=TranspositionTable(1))
+    for own, opp in endgame_positions(4, 6, seed=11):
+        assert search.search(own, opp).score == minimax(own, opp) * DISC_SCORE
+
+
+def test_table_refuses_boards_too_large_for_its_moves():
+    table = TranspositionTable(1)
+    AlphaBetaSearch(table=table, variant=variant(44))
+    with pytest.raises(ValueError):
+        AlphaBetaSearch(table=table, variant=variant(46))
+
+
+def test_parse_moves_rejects_malformed_records():
+    assert parse_moves("F5d6") == [37, 43]
+    for record in ("f5d", "f5z9", "f5dx"):
+        with pytest.raises(ValueError):
+            parse_moves(record)
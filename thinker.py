@@ -0,0 +1,182 @@
+# Description: Background move requests for Reversi's computer players. A Thinker runs each
+#               player's choose_move on a worker thread and hands the answers back through a
+#               queue that the game polls once a frame, so the window keeps drawing and handling
+#               events while a search runs, and a search can be followed, cut short or dropped.
+import itertools
+import queue
+import threading
+import time
+
+
+class MoveRequest:
+    """
+    Represents one request for a move: the player asked, the engine.Position it
+    was asked about and, once answered, the square chosen (None if the player had
+    no move) or the exception choose_move raised. forced and cancelled record
+    whether the UI asked for the move early or no longer wants it.
+    """
+
+    def __init__(self, number, player, position):
+        self.number = number
+        self.player = player
+        self.position = position
+        self.move = None
+        self.error = None
+        self.done = False
+        self.forced = False
+        self.cancelled = False
+        self.started = None
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return "MoveRequest(number=%r, player=%r, move=%r, done=%r, forced=%r, cancelled=%r)" % (
+            self.number, self.player.get_player(), self.move, self.done, self.forced, self.cancelled)
+
+
+class Thinker:
+    """
+    Represents a worker thread that asks computer players for their moves.
+
+    request queues a MoveRequest, and poll returns it once its answer is in.
+    Requests are answered one at a time in the order they were made, so a player
+    is never asked for two moves at once, even when a cancelled search is still
+    winding down. force asks the running search for its best move so far and
+    cancel drops the request; both go through the player's stop_thinking, which
+    poll keeps calling until the search ends, in case the first call came before
+    the search had started.
+
+    The search shares the interpreter with the window, which still gets the
+    processor every few milliseconds since the search thread gives up the GIL at
+    Python's switch interval. notify, if set, is called from the worker thread
+    whenever an answer is ready, for example to wake up a loop that is waiting
+    for events.
+    """
+
+    def __init__(self, notify=None):
+        """
+        Represents an init method that takes an optional function to call when an
+        answer is ready. The worker thread is started with the first request.
+        """
+        self.notify = notify
+        self.active = None  # the request the game is waiting on
+        self._running = None  # the request the worker thread is answering
+        self._running_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._answers = queue.Queue()
+        self._numbers = itertools.count(1)
+        self._thread = None
+
+    def busy(self):
+        """
+        Represents a method that returns True while the game is waiting on a move.
+        """
+        return self.active is not None
+
+    def request(self, player, position):
+        """
+        Represents a method that asks player for its move in position (an
+        engine.Position, which should not be changed afterwards) on the worker
+        thread, dropping any request that is still waiting.
+
+        Returns -- the new MoveRequest.
+        """
+        self.cancel()
+        request = MoveRequest(next(self._numbers), player, position)
+        self.active = request
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, name="thinker", daemon=True)
+            self._thread.start()
+        self._requests.put(request)
+        return request
+
+    def force(self):
+        """
+        Represents a method that asks the player being waited on to move now, with
+        the best move it has found so far.
+        """
+        request = self.active
+        if request is not None and not request.forced:
+            request.forced = True
+            request.player.stop_thinking()
+
+    def cancel(self):
+        """
+        Represents a method that stops waiting on the current request. Its search
+        is stopped and its answer thrown away when it comes.
+        """
+        request = self.active
+        if request is not None:
+            request.cancelled = True
+            request.player.stop_thinking()
+            self.active = None
+
+    def progress(self):
+        """
+        Represents a method that returns the thinking_progress of the player being
+        waited on, or None.
+        """
+        request = self.active
+        if request is None or request.started is None:
+            return None
+        return request.player.thinking_progress()
+
+    def poll(self):
+        """
+        Represents a method that the game calls once a frame. It never blocks.
+
+        Returns -- the request being waited on once it has been answered, or None.
+        An exception raised by choose_move is raised again here.
+        """
+        # the lock keeps a late stop from reaching the search of the next request
+        with self._running_lock:
+            running = self._running
+            if running is not None and (running.forced or running.cancelled):
+                running.player.stop_thinking()
+
+        while True:
+            try:
+                request = self._answers.get_nowait()
+            except queue.Empty:
+                return None
+            if request is self.active:
+                self.active = None
+                if request.error is not None:
+                    raise request.error
+                return request
+
+    def close(self):
+        """
+        Represents a method that drops the current request and stops the worker
+        thread once it is done with it.
+        """
+        self.cancel()
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread = None
+
+    def _work(self):
+        """
+        Represents the worker thread, which answers requests until it is closed.
+        """
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            if request.cancelled:
+                continue
+
+            with self._running_lock:
+                self._running = request
+                request.started = time.perf_counter()
+            try:
+                request.move = request.player.choose_move(request.position)
+            except Exception as error:
+                request.error = error
+            with self._running_lock:
+                self._running = None
+            request.elapsed = time.perf_counter() - request.started
+            request.done = True
+
+            self._answers.put(request)
+            if self.notify is not None:
+                self.notify()
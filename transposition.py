@@ -0,0 +1,319 @@
+# Description: Zobrist hashing of Othello positions and a fixed-size transposition table.
+#               Hashes are updated incrementally as discs are placed and flipped, and the
+#               table keeps its entries in flat arrays under a configurable memory cap, in
+#               process memory or in shared memory for searches that run in several processes.
+import random
+from array import array
+
+from engine import BLACK, squares
+
+# bound types stored with each score
+EXACT = 0
+LOWER = 1  # the search failed high, so the true score is at least this
+UPPER = 2  # the search failed low, so the true score is at most this
+
+_SCORE_OFFSET = 1 << 31
+_SLOT_BYTES = 16  # one 64-bit key and one 64-bit packed entry
+_NO_MOVE = 0x7FF  # moves are stored in 11 bits, enough for boards up to 44x44
+MAX_SQUARES = _NO_MOVE  # the most squares a board can have for its moves to fit in an entry
+
+
+class ZobristHasher:
+    """
+    Represents a set of random 64-bit keys, one per (color, square) plus one for
+    the side to move. A position's hash is the XOR of the keys of its discs, so
+    a move changes it by XORing in the placed disc, both color keys of every
+    flipped disc and the side key.
+    """
+
+    def __init__(self, seed=20230621, squares=64):
+        """
+        Represents an init method that takes the seed used to generate the keys, so
+        that hashes are the same from one run (or process) to the next, and the
+        number of squares on the board.
+        """
+        rng = random.Random(seed)
+        self.piece_keys = (
+            tuple(rng.getrandbits(64) for square in range(squares)),  # black ("X")
+            tuple(rng.getrandbits(64) for square in range(squares)),  # white ("O")
+        )
+        # flipping a disc removes one color's key and adds the other's
+        self.flip_keys = tuple(black ^ white for black, white in zip(*self.piece_keys))
+        self.side_key = rng.getrandbits(64)
+
+    def hash_bitboards(self, own, opp, color):
+        """
+        Represents a method that hashes the position where color (0 for black, 1 for
+        white) is to move with the own bitboard, against the opp bitboard.
+        """
+        keys = self.piece_keys[color]
+        other_keys = self.piece_keys[1 - color]
+        key = self.side_key if color else 0
+        for square in squares(own):
+            key ^= keys[square]
+        for square in squares(opp):
+            key ^= other_keys[square]
+        return key
+
+    def hash_position(self, position):
+        """
+        Represents a method that hashes an engine.Position.
+        """
+        color = 0 if position.turn == BLACK else 1
+        own, opp = position.bitboards(position.turn)
+        return self.hash_bitboards(own, opp, color)
+
+    def update(self, key, color, square, flips):
+        """
+        Represents a method that returns the hash after color plays square and flips
+        the discs in the flips bitboard, handing the turn to the other color.
+        """
+        key ^= self.piece_keys[color][square] ^ self.side_key
+        flip_keys = self.flip_keys
+        for flipped in squares(flips):
+            key ^= flip_keys[flipped]
+        return key
+
+    def pass_turn(self, key):
+        """
+        Represents a method that returns the hash after the side to move passes.
+        """
+        return key ^ self.side_key
+
+
+def _bucket_count(memory_mb):
+    """
+    Represents a function that returns the number of two-slot buckets that fit in
+    memory_mb megabytes, rounded down to a power of two.
+    """
+    buckets = 1
+    while buckets * 4 * _SLOT_BYTES <= memory_mb * 1024 * 1024:
+        buckets *= 2
+    return buckets
+
+
+class TranspositionTable:
+    """
+    Represents a fixed-size table of search results keyed by Zobrist hash.
+
+    The table is split into two-slot buckets stored in flat arrays. The first slot
+    of each bucket keeps the deepest result seen, and the second slot always takes
+    the newest result that could not replace the first. Each entry stores the
+    depth, bound type, score and best move packed into one 64-bit word.
+    """
+
+    def __init__(self, memory_mb=16):
+        """
+        Represents an init method that takes the most memory in megabytes the table
+        may use. The number of buckets is rounded down to a power of two.
+        """
+        buckets = _bucket_count(memory_mb)
+        self.buckets = buckets
+        self.size = 2 * buckets
+        self._mask = buckets - 1
+        self._keys = array("Q", bytes(8 * self.size))
+        self._entries = array("Q", bytes(8 * self.size))
+        self.clear_stats()
+        self.used = 0
+
+    def memory_bytes(self):
+        """
+        Represents a method that returns the number of bytes held by the table arrays.
+        """
+        return self._keys.itemsize * len(self._keys) + self._entries.itemsize * len(self._entries)
+
+    def clear(self):
+        """
+        Represents a method that empties every slot and resets the counters.
+        """
+        self._keys = array("Q", bytes(8 * self.size))
+        self._entries = array("Q", bytes(8 * self.size))
+        self.used = 0
+        self.clear_stats()
+
+    def clear_stats(self):
+        """
+        Represents a method that resets the probe, hit and store counters.
+        """
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def probe(self, key):
+        """
+        Represents a method that looks up a hash.
+
+        Returns -- (depth, bound, score, move) for a matching entry, where move is
+        None if no best move was stored, or None if the hash is not in the table.
+        """
+        self.probes += 1
+        slot = (key & self._mask) << 1
+        keys = self._keys
+
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+
+        self.hits += 1
+        entry = self._entries[slot]
+        move = entry & _NO_MOVE
+        return (entry >> 11) & 0xFF, (entry >> 19) & 0x3, (entry >> 21) - _SCORE_OFFSET, \
+            None if move == _NO_MOVE else move
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Represents a method that records a search result for a hash, replacing the
+        bucket's depth-preferred slot if this result is at least as deep, and the
+        always-replace slot otherwise.
+        """
+        self.stores += 1
+        slot = (key & self._mask) << 1
+        keys = self._keys
+
+        stored_key = keys[slot]
+        if stored_key and stored_key != key and (self._entries[slot] >> 11) & 0xFF > depth:
+            slot += 1
+            stored_key = keys[slot]
+
+        if not stored_key:
+            self.used += 1
+        elif stored_key != key:
+            self.replacements += 1
+
+        keys[slot] = key
+        self._entries[slot] = (_NO_MOVE if move is None else move) | (depth << 11) | (bound << 19) | \
+            ((score + _SCORE_OFFSET) << 21)
+
+    def hit_rate(self):
+        """
+        Represents a method that returns the fraction of probes that found an entry.
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self):
+        """
+        Represents a method that returns the fraction of slots that hold an entry.
+        """
+        return self.used / self.size
+
+    def stats(self):
+        """
+        Represents a method that returns the table counters as a dictionary.
+        """
+        return {
+            "slots": self.size,
+            "memory_bytes": self.memory_bytes(),
+            "used": self.used,
+            "occupancy": self.occupancy(),
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Represents a TranspositionTable whose slots live in shared memory, so several
+    processes can search with one table. One process creates it and the others
+    attach to it by name, with the same size.
+
+    Slots are written without a lock, so a reader can see one process's key next
+    to another process's entry. Each slot therefore holds its key XORed with its
+    entry, and probe only takes an entry whose slot XORs back to the key asked
+    for; a slot caught halfway through a write reads as a miss. The counters are
+    kept per process.
+    """
+
+    def __init__(self, memory_mb=16, name=None):
+        """
+        Represents an init method that takes the most memory in megabytes the table
+        may use and, to attach to a table another process created, its name.
+        """
+        from multiprocessing import shared_memory
+
+        buckets = _bucket_count(memory_mb)
+        self.buckets = buckets
+        self.size = 2 * buckets
+        self._mask = buckets - 1
+        self._owner = name is None
+        self._memory = shared_memory.SharedMemory(name, create=self._owner, size=2 * 8 * self.size)
+        self.name = self._memory.name
+        self._keys = self._memory.buf[:8 * self.size].cast("Q")
+        self._entries = self._memory.buf[8 * self.size:16 * self.size].cast("Q")
+        if self._owner:
+            self._memory.buf[:16 * self.size] = bytes(16 * self.size)
+        self.clear_stats()
+        self.used = 0
+
+    def clear(self):
+        """
+        Represents a method that empties every slot, for every process attached,
+        and resets this process's counters.
+        """
+        self._memory.buf[:16 * self.size] = bytes(16 * self.size)
+        self.used = 0
+        self.clear_stats()
+
+    def close(self):
+        """
+        Represents a method that detaches from the shared memory, and frees it if
+        this process created it.
+        """
+        if self._memory is None:
+            return
+        self._keys.release()
+        self._entries.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+        self._memory = None
+
+    def probe(self, key):
+        """
+        Represents a method that looks up a hash, like TranspositionTable.probe.
+        """
+        self.probes += 1
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        entries = self._entries
+
+        entry = entries[slot]
+        if keys[slot] ^ entry != key:
+            slot += 1
+            entry = entries[slot]
+            if keys[slot] ^ entry != key:
+                return None
+
+        self.hits += 1
+        move = entry & _NO_MOVE
+        return (entry >> 11) & 0xFF, (entry >> 19) & 0x3, (entry >> 21) - _SCORE_OFFSET, \
+            None if move == _NO_MOVE else move
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Represents a method that records a search result for a hash, like
+        TranspositionTable.store.
+        """
+        self.stores += 1
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        entries = self._entries
+
+        stored_key = keys[slot] ^ entries[slot]
+        if stored_key and stored_key != key and (entries[slot] >> 11) & 0xFF > depth:
+            slot += 1
+            stored_key = keys[slot] ^ entries[slot]
+
+        if not stored_key:
+            self.used += 1
+        elif stored_key != key:
+            self.replacements += 1
+
+        entry = (_NO_MOVE if move is None else move) | (depth << 11) | (bound << 19) | \
+            ((score + _SCORE_OFFSET) << 21)
+        entries[slot] = entry
+        keys[slot] = key ^ entry